@@ -7,6 +7,8 @@ from .herbs import router as herbs_router
 from .tracking import router as tracking_router
 from .ai_analysis import router as ai_router
 from .admin import router as admin_router
+from .exports import router as exports_router
+from .images import router as images_router
 
 api_router = APIRouter()
 api_router.include_router(auth_router)
@@ -15,6 +17,8 @@ api_router.include_router(herbs_router)
 api_router.include_router(tracking_router)
 api_router.include_router(ai_router)
 api_router.include_router(admin_router)
+api_router.include_router(exports_router)
+api_router.include_router(images_router)
 
 from app.api import api_router
 app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
@@ -1,20 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import datetime
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from app.schemas.admin import AdminUserResponse
-from app.services.admin_service import AdminService
+from app.services.admin_service import AdminService, USER_PAGINATION
+from app.services.analysis_service import AnalysisService, ROLLUP_DIMENSIONS, report_day
+from backend.core.query_log import slow_queries
+from backend.core.request_context import query_budget
+from backend.utils.pagination import PageParams
 from app.dependencies import get_admin_user
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.get("/users", response_model=list[AdminUserResponse], status_code=200)
+@query_budget(5)
 async def list_users(
+    response: Response,
+    params: PageParams = Depends(USER_PAGINATION.params),
     service: AdminService = Depends(),
     admin=Depends(get_admin_user)
 ):
     """
-    ดึงรายชื่อผู้ใช้ทั้งหมด (admin เท่านั้น)
+    ดึงรายชื่อผู้ใช้แบบแบ่งหน้า (admin เท่านั้น)
+    sort: id, username, created_at; filter: is_active, is_admin, username, created_at__gte/__lt
     """
-    users = await service.list_users()
-    return users
+    try:
+        page = await service.list_users(params)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    page.apply_headers(response)
+    return page.items
 
 @router.delete("/user/{user_id}", status_code=204)
 async def delete_user(
@@ -31,4 +45,98 @@ async def delete_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return None
\ No newline at end of file
+    return None
+
+@router.patch("/user/{user_id}/active", status_code=204)
+async def set_user_active(
+    user_id: str,
+    is_active: bool = Body(..., embed=True),
+    service: AdminService = Depends(),
+    admin=Depends(get_admin_user)
+):
+    """
+    เปิด/ปิดการใช้งานผู้ใช้ (admin เท่านั้น)
+    """
+    if not await service.set_active(user_id, is_active):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return None
+
+@router.patch("/user/{user_id}/admin", status_code=204)
+async def set_user_admin(
+    user_id: str,
+    is_admin: bool = Body(..., embed=True),
+    service: AdminService = Depends(),
+    admin=Depends(get_admin_user)
+):
+    """
+    กำหนดสิทธิ์ผู้ดูแลระบบให้ผู้ใช้ (admin เท่านั้น)
+    """
+    if not await service.set_admin(user_id, is_admin):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return None
+
+def _stats_range(date_from, date_to):
+    today = report_day(datetime.datetime.now(datetime.timezone.utc))
+    date_to = date_to or today
+    date_from = date_from or date_to - datetime.timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from must not be after date_to")
+    if (date_to - date_from).days > 366:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Date range is limited to 366 days")
+    return date_from, date_to
+
+@router.get("/stats/analyses", status_code=200)
+async def analysis_stats(
+    dimension: str = Query("species", description=f"One of {list(ROLLUP_DIMENSIONS)}"),
+    date_from: Optional[datetime.date] = Query(None),
+    date_to: Optional[datetime.date] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    service: AnalysisService = Depends(),
+    admin=Depends(get_admin_user)
+):
+    """
+    สถิติผลการวิเคราะห์ตามมิติ (species, grade, province, user, all) ในช่วงวันที่ (admin เท่านั้น)
+    อ่านจากตาราง rollup รายวันเท่านั้น (ค่าเริ่มต้น 30 วันล่าสุด)
+    """
+    date_from, date_to = _stats_range(date_from, date_to)
+    try:
+        items = await service.get_summary(dimension, date_from, date_to, limit=limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return {"dimension": dimension, "date_from": date_from, "date_to": date_to, "items": items}
+
+@router.get("/stats/analyses/daily", status_code=200)
+async def analysis_daily_stats(
+    dimension: str = Query("all", description=f"One of {list(ROLLUP_DIMENSIONS)}"),
+    key: str = Query("", description="Value of the dimension, e.g. a species name or user id"),
+    date_from: Optional[datetime.date] = Query(None),
+    date_to: Optional[datetime.date] = Query(None),
+    service: AnalysisService = Depends(),
+    admin=Depends(get_admin_user)
+):
+    """
+    อนุกรมเวลารายวันของผลการวิเคราะห์สำหรับ dashboard (admin เท่านั้น)
+    """
+    date_from, date_to = _stats_range(date_from, date_to)
+    try:
+        series = await service.get_daily_series(dimension, key, date_from, date_to)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return {"dimension": dimension, "key": key, "date_from": date_from, "date_to": date_to, "series": series}
+
+@router.get("/db/slow-queries", status_code=200)
+async def list_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("total", regex="^(total|max|count)$"),
+    admin=Depends(get_admin_user)
+):
+    """
+    รายการ query ที่ช้าที่สุดของ worker นี้ (SQL แบบ normalize, รูปแบบพารามิเตอร์, route และ EXPLAIN) (admin เท่านั้น)
+    """
+    return slow_queries.top(limit=limit, order_by=order_by)
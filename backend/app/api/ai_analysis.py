@@ -1,26 +1,37 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends, Query, Request
+from typing import Optional
 from app.schemas.ai import AIAnalysisResponse
 from app.services.ai_service import AIService
 from app.dependencies import get_current_user
+from backend.services.analysis_service import AnalysisService
+from backend.utils.serialization import negotiated_response
 import logging
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
 @router.post("/analyze", response_model=AIAnalysisResponse, status_code=200)
 async def analyze_image(
+    request: Request,
     file: UploadFile = File(...),
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะบางฟิลด์ เช่น herb_identification.species,quality_assessment.grade,gacp_compliance.status"),
     user=Depends(get_current_user),
-    service: AIService = Depends()
+    service: AIService = Depends(),
+    analyses: AnalysisService = Depends()
 ):
     """
     วิเคราะห์ภาพด้วย AI (ต้อง login)
+    - ผลวิเคราะห์และภาพถูกบันทึก (image store + rollup รายวัน) และคืน analysis_id
+    - fields: ตัดผลลัพธ์ให้เหลือเฉพาะฟิลด์ที่ต้องการก่อน serialize (เหมาะกับหน้ารายการบนมือถือ)
+    - Accept: application/msgpack หรือ application/cbor เพื่อรับผลลัพธ์แบบ binary (ค่าเริ่มต้น JSON)
     """
     try:
-        result = await service.analyze(file, user)
-        return result
+        image_bytes = await file.read()
+        result = await service.analyze_herb_image(image_bytes)
+        analysis = await analyses.save_analysis(user.id, None, result, image_bytes=image_bytes)
     except ValueError as ve:
         logging.warning(f"AI analysis input error: {ve}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         logging.error(f"AI analysis failed: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI analysis failed")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="AI analysis failed")
+    return negotiated_response(request, dict(result, analysis_id=analysis.id), fields)
\ No newline at end of file
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from app.schemas.certificate import CertificateApplyRequest, CertificateResponse
-from app.services.certificate_service import CertificateService
-from app.dependencies import get_current_user
+from app.services.certificate_service import CertificateService, CERTIFICATE_PAGINATION
+from app.services.bulk_pdf import bulk_jobs, stream_certificate_zip
+from backend.core.config import settings
+from backend.core.request_context import query_budget
+from backend.utils.file_response import conditional_file_response
+from backend.utils.pagination import PageParams
+from app.dependencies import get_admin_user, get_current_user
 import logging
 
 router = APIRouter(prefix="/certificates", tags=["certificates"])
@@ -27,16 +34,93 @@ async def apply_certificate(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Certificate apply failed")
 
 @router.get("/status", response_model=list[CertificateResponse], status_code=200)
+@query_budget(5)
 async def get_certificate_status(
+    response: Response,
+    params: PageParams = Depends(CERTIFICATE_PAGINATION.params),
     user=Depends(get_current_user),
     service: CertificateService = Depends()
 ):
     """
-    ตรวจสอบสถานะใบรับรองของผู้ใช้ (ต้อง login)
+    ตรวจสอบสถานะใบรับรองของผู้ใช้แบบแบ่งหน้า (ต้อง login)
+    sort: issued_at, id; filter: status, certificate_type, issued_at__gte/__lt
     """
     try:
-        certificates = await service.get_certificates_by_user(user.id)
-        return certificates
+        page = await service.get_certificates_by_user(user.id, params)
+        page.apply_headers(response)
+        return page.items
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         logging.error(f"Get certificate status error for user {user.id}: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot get certificate status")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot get certificate status")
+
+@router.post("/bulk/pdf", status_code=200)
+@query_budget(100)  # one lookup per 1000 certificates
+async def bulk_certificate_pdf(
+    certificate_ids: List[int] = Body(..., embed=True),
+    admin=Depends(get_admin_user)
+):
+    """
+    ออกใบรับรอง PDF จำนวนมากพร้อมกัน (admin เท่านั้น)
+    สร้าง PDF แบบขนานใน process pool และส่งกลับเป็น ZIP แบบ streaming ทีละไฟล์ที่เสร็จ
+    ติดตามความคืบหน้าด้วย GET /certificates/bulk/{job_id} (job_id อยู่ใน header X-Bulk-Job-Id)
+    ใบที่ล้มเหลวจะถูกบันทึกใน errors.json และ manifest.json ภายใน ZIP
+    """
+    certificate_ids = list(dict.fromkeys(certificate_ids))
+    if not certificate_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="certificate_ids must not be empty")
+    if len(certificate_ids) > settings.PDF_BULK_MAX_CERTIFICATES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PDF_BULK_MAX_CERTIFICATES} certificates per request"
+        )
+    job = bulk_jobs.create(len(certificate_ids), requested_by=admin.id)
+    await bulk_jobs.publish(job, force=True)
+    logging.info(f"Bulk PDF job {job.job_id}: {job.total} certificates requested by admin {admin.id}")
+    return StreamingResponse(
+        stream_certificate_zip(job, certificate_ids),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="certificates_{job.job_id}.zip"',
+            "X-Bulk-Job-Id": job.job_id,
+            "Cache-Control": "no-store",
+        },
+    )
+
+@router.get("/bulk/{job_id}", status_code=200)
+async def bulk_certificate_progress(
+    job_id: str,
+    admin=Depends(get_admin_user)
+):
+    """
+    ความคืบหน้าของงานออกใบรับรองจำนวนมาก (done / failed / pending) (admin เท่านั้น)
+    """
+    progress = await bulk_jobs.get(job_id)
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bulk job not found")
+    return progress
+
+@router.get("/{certificate_id}/pdf", status_code=200)
+@query_budget(5)
+async def download_certificate_pdf(
+    certificate_id: int,
+    request: Request,
+    user=Depends(get_current_user),
+    service: CertificateService = Depends()
+):
+    """
+    ดาวน์โหลดใบรับรองเป็น PDF (เจ้าของหรือ admin)
+    PDF ถูก cache ตาม digest ของข้อมูลใบรับรอง: ส่ง If-None-Match เพื่อรับ 304, รองรับ Range
+    """
+    certificate = await service.get_certificate(certificate_id)
+    if certificate is None or (certificate.user_id != user.id and not getattr(user, "is_admin", False)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Certificate not found")
+    try:
+        path, digest = await service.get_certificate_pdf(certificate)
+    except Exception as e:
+        logging.error(f"Certificate PDF generation failed for {certificate_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot generate certificate PDF")
+    return conditional_file_response(
+        request, path, digest, media_type="application/pdf", filename=f"certificate_{certificate_id}.pdf"
+    )
@@ -0,0 +1,56 @@
+import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.services.export_service import (
+    CONTENT_TYPES, DATASETS, day_bounds, export_service, pa, resolve_columns
+)
+from backend.core.request_context import query_budget
+from app.dependencies import get_current_user
+import logging
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+@router.get("/{dataset}", status_code=200)
+@query_budget(100)  # one cursor per hot month for multi-year analysis exports
+async def export_dataset(
+    dataset: str,
+    format: str = Query("csv", regex="^(csv|parquet)$"),
+    columns: Optional[str] = Query(None, description="คอลัมน์คั่นด้วย comma เช่น id,species,grade,created_at"),
+    date_from: Optional[datetime.date] = Query(None),
+    date_to: Optional[datetime.date] = Query(None),
+    user_id: Optional[int] = Query(None, description="เฉพาะผู้ใช้นี้ (admin เท่านั้น)"),
+    user=Depends(get_current_user)
+):
+    """
+    ส่งออกข้อมูล analyses / certificates / tracking เป็น CSV หรือ Parquet แบบ streaming (ต้อง login)
+    อ่านทีละ chunk จาก server-side cursor จึงใช้หน่วยความจำคงที่ไม่ว่าจะส่งออกกี่แถว
+    ผู้ใช้ทั่วไปได้เฉพาะข้อมูลของตนเอง, admin ส่งออกได้ทั้งหมดหรือกรองด้วย user_id
+    """
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown dataset, use one of {list(DATASETS)}")
+    if format == "parquet" and pa is None:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Parquet export is not available")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from must not be after date_to")
+    try:
+        selected = resolve_columns(spec, columns.split(",") if columns else None)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    if not getattr(user, "is_admin", False):
+        if user_id is not None and user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot export other users' data")
+        user_id = user.id
+
+    start, end = day_bounds(date_from, date_to)
+    filename = "_".join(filter(None, [dataset, date_from and date_from.isoformat(), date_to and date_to.isoformat()]))
+    logging.info(f"Export {dataset} ({format}, {len(selected)} columns, {date_from}..{date_to}) by user {user.id}")
+    return StreamingResponse(
+        export_service.stream(format, spec, selected, start=start, end=end, user_id=user_id),
+        media_type=CONTENT_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format}"',
+            "Cache-Control": "no-store",
+        },
+    )
@@ -1,22 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from app.schemas.herb import HerbResponse
-from app.services.herb_service import HerbService
+from app.services.herb_service import HerbService, HERB_PAGINATION
+from backend.core.compression import negotiate
+from backend.core.config import settings
+from backend.core.request_context import query_budget
+from backend.services.herb_catalog import etag_matches
+from backend.utils.pagination import PageParams
 import logging
 
 router = APIRouter(prefix="/herbs", tags=["herbs"])
 
 @router.get("/", response_model=list[HerbResponse], status_code=200)
-async def list_herbs(service: HerbService = Depends()):
+@query_budget(5)
+async def list_herbs(
+    response: Response,
+    params: PageParams = Depends(HERB_PAGINATION.params),
+    service: HerbService = Depends()
+):
     """
-    ดึงรายชื่อสมุนไพรทั้งหมด
+    ดึงรายชื่อสมุนไพรแบบแบ่งหน้า (sort: name_th, created_at; filter: name_th, created_at__gte/__lt)
     """
     try:
-        herbs = await service.list_herbs()
-        return herbs
+        page = await service.list_herbs(params)
+        page.apply_headers(response)
+        return page.items
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         logging.error(f"Failed to list herbs: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot list herbs")
 
+@router.get("/catalog", status_code=200)
+async def get_herb_catalog(request: Request, service: HerbService = Depends()):
+    """
+    แคตตาล็อกสมุนไพรทั้งหมดจาก snapshot ที่ serialize/บีบอัดไว้ล่วงหน้า
+    รองรับ ETag + If-None-Match (304) สำหรับแอปที่มีแคชอยู่แล้ว
+    """
+    try:
+        snapshot = await service.get_catalog_snapshot()
+    except Exception as e:
+        logging.error(f"Failed to load herb catalog: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot load herb catalog")
+    use_gzip = negotiate(request.headers.get("Accept-Encoding", ""), ["gzip"]) == "gzip"
+    headers = {
+        "ETag": snapshot.gzip_etag if use_gzip else snapshot.etag,
+        "Cache-Control": f"public, max-age={settings.HERB_CATALOG_MAX_AGE_SECONDS}",
+        "Vary": "Accept-Encoding",
+        "X-Catalog-Version": snapshot.version,
+    }
+    if etag_matches(request.headers.get("If-None-Match"), snapshot.etag, snapshot.gzip_etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@router.get("/search", status_code=200)
+async def search_herbs(
+    q: str = Query(..., min_length=1, max_length=100, description="ชื่อไทย ชื่ออังกฤษ หรือชื่อวิทยาศาสตร์ (บางส่วนได้)"),
+    limit: int = Query(10, ge=1, le=50),
+    service: HerbService = Depends()
+):
+    """
+    ค้นหาสมุนไพร (typeahead): n-gram สำหรับภาษาไทย, prefix/fuzzy สำหรับชื่อละติน เรียงตามคะแนน
+    """
+    try:
+        return await service.search(q, limit=limit)
+    except Exception as e:
+        logging.error(f"Herb search failed for '{q}': {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot search herbs")
+
 @router.get("/{herb_id}", response_model=HerbResponse, status_code=200)
 async def get_herb(herb_id: str, service: HerbService = Depends()):
     """
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from backend.services.image_store import ImageService, image_store
+from backend.utils.file_response import conditional_file_response, etag_matches
+from app.dependencies import get_current_user
+import logging
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+# รูปของ digest หนึ่งไม่มีวันเปลี่ยน จึง cache ฝั่ง client ได้ตลอด
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+@router.get("/{digest}", status_code=200)
+async def get_image(
+    request: Request,
+    digest: str = Path(..., regex="^[0-9a-f]{64}$"),
+    variant: str = Query("original", regex="^(original|thumb|web)$"),
+    user=Depends(get_current_user),
+    service: ImageService = Depends()
+):
+    """
+    ดึงรูปตาม SHA-256 digest (ต้อง login; เจ้าของ analysis ที่ใช้รูปนี้ หรือ admin)
+    - variant: original | thumb (256px) | web (1280px) สร้าง thumbnail/web ครั้งแรกที่ถูกขอแล้วเก็บไว้
+    - ส่ง ETag คงที่ต่อ digest/variant รองรับ If-None-Match (304) และ Range
+    """
+    image = await service.get_viewable(digest, user)
+    if image is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    try:
+        blob = await image_store.open(image, variant)
+    except RuntimeError as e:
+        logging.error(f"Image rendition failed: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Image variant not available")
+    except (FileNotFoundError, KeyError):
+        logging.error(f"Image blob missing for {digest}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    if blob.path is not None:
+        return conditional_file_response(request, blob.path, blob.etag, blob.content_type, cache_control=IMMUTABLE)
+    headers = {"etag": f'"{blob.etag}"', "cache-control": IMMUTABLE}
+    if etag_matches(request, headers["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=blob.data, media_type=blob.content_type, headers=headers)
@@ -1,28 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.schemas.tracking import TrackingEventResponse
-from app.services.tracking_service import TrackingService
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from app.schemas.tracking import TrackingEventCreate, TrackingEventResponse
+from app.services.tracking_service import TrackingService, DEFAULT_TIMELINE_LIMIT, MAX_TIMELINE_LIMIT
+from backend.core.config import settings
+from backend.core.request_context import query_budget
+from backend.services.tracking_ingest import MSGPACK_TYPES, NDJSON_TYPES, build_batch, msgpack, parse_records
+import json
 from app.dependencies import get_current_user
 import logging
 
 router = APIRouter(prefix="/tracking", tags=["tracking"])
 
 @router.get("/timeline/{tracking_id}", response_model=list[TrackingEventResponse], status_code=200)
+@query_budget(5)
 async def get_tracking_timeline(
     tracking_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_TIMELINE_LIMIT, ge=1, le=MAX_TIMELINE_LIMIT),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor จากหน้าก่อนหน้า"),
+    since: Optional[datetime] = Query(None, description="เฉพาะเหตุการณ์ตั้งแต่เวลานี้"),
     user=Depends(get_current_user),
     service: TrackingService = Depends()
 ):
     """
-    ดึงไทม์ไลน์การติดตามด้วย tracking_id (ต้อง login)
+    ดึงไทม์ไลน์การติดตามด้วย tracking_id แบบแบ่งหน้า (ต้อง login)
+    หน้าถัดไป/เหตุการณ์ใหม่: ส่ง cursor จาก header X-Next-Cursor
     """
     try:
-        events = await service.get_timeline(tracking_id, user)
-        if not events:
+        page = await service.get_timeline(tracking_id, user, limit=limit, cursor=cursor, since=since)
+        if page is None:
             logging.warning(f"Tracking not found: {tracking_id} by user {user.id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tracking not found")
+        events, next_cursor = page
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return events
     except HTTPException:
         raise
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         logging.error(f"Failed to get tracking timeline {tracking_id}: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot get tracking timeline")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot get tracking timeline")
+
+@router.post("/{tracking_id}/events", response_model=TrackingEventResponse, status_code=201)
+async def append_tracking_event(
+    tracking_id: str,
+    request: TrackingEventCreate,
+    user=Depends(get_current_user),
+    service: TrackingService = Depends()
+):
+    """
+    เพิ่มเหตุการณ์ใหม่ในไทม์ไลน์ (append-only, ต้อง login)
+    """
+    try:
+        event = await service.append_event(
+            tracking_id,
+            request.status,
+            user,
+            location=request.location,
+            data=request.data,
+            timestamp=request.timestamp,
+        )
+        if event is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tracking not found")
+        return event
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Failed to append tracking event {tracking_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot append tracking event")
+
+@router.post("/events/bulk", status_code=200)
+async def ingest_tracking_events(
+    request: Request,
+    user=Depends(get_current_user),
+    service: TrackingService = Depends()
+):
+    """
+    รับเหตุการณ์จากเครื่องสแกนเป็นชุด (NDJSON หรือ msgpack, ต้อง login)
+    ทุกเหตุการณ์ต้องมี client_event_id เพื่อให้ส่งซ้ำได้อย่างปลอดภัย
+    ตอบกลับผลรายเหตุการณ์ (created / duplicate / rejected) ตามลำดับที่ส่งมา
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.TRACKING_BULK_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Batch too large")
+    body = await request.body()
+    if len(body) > settings.TRACKING_BULK_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Batch too large")
+    content_type = request.headers.get("content-type", "")
+    if content_type.split(";")[0].strip().lower() not in NDJSON_TYPES + MSGPACK_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/x-ndjson or application/x-msgpack"
+        )
+    try:
+        records = parse_records(body, content_type)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    if len(records) > settings.TRACKING_BULK_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.TRACKING_BULK_MAX_EVENTS} events per batch"
+        )
+    try:
+        result = await service.ingest_events(build_batch(records), user)
+    except Exception as e:
+        logging.error(f"Bulk tracking ingestion failed for user {user.id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cannot ingest tracking events")
+    logging.info(
+        f"Bulk tracking ingestion by user {user.id}: "
+        f"{result['created']} created, {result['duplicate']} duplicate, {result['rejected']} rejected"
+    )
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(t in accept for t in MSGPACK_TYPES):
+        return Response(content=msgpack.packb(result), media_type=MSGPACK_TYPES[0])
+    return Response(content=json.dumps(result, ensure_ascii=False), media_type="application/json")
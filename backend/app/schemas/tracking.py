@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+class TrackingEventCreate(BaseModel):
+    status: str = Field(..., min_length=1, max_length=64)
+    location: Optional[str] = Field(None, max_length=255)
+    data: Optional[Dict[str, Any]] = None
+    timestamp: Optional[datetime] = None
+
+class TrackingEventResponse(BaseModel):
+    id: int
+    tracking_code: str
+    timestamp: datetime
+    status: str
+    location: Optional[str] = None
+    actor_id: Optional[int] = None
+    data: Optional[Dict[str, Any]] = None
+    client_event_id: Optional[str] = None
+
+    class Config:
+        orm_mode = True
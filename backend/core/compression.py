@@ -0,0 +1,290 @@
+import functools
+import gzip
+import os
+import stat
+import time
+import zlib
+from mimetypes import guess_type
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; zstd is simply not offered
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; br is simply not offered
+    brotli = None
+
+# Suffix of the precompressed variants written by scripts/precompress_static.py
+SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+
+# Levels per CPU pressure (idle, normal, busy); see compression_level()
+_LEVELS = {
+    "zstd": (6, 3, 1),
+    "br": (5, 4, 1),
+    "gzip": (6, 5, 1),
+}
+
+
+def available_encodings() -> List[str]:
+    """Configured encodings whose library is installed, in server preference order."""
+    installed = {"zstd": zstandard is not None, "br": brotli is not None, "gzip": True}
+    return [name for name in settings.COMPRESSION_ENCODINGS if installed.get(name)]
+
+
+def negotiate(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    """
+    Pick an encoding from an Accept-Encoding header: highest q-value wins, ties go
+    to the server's preference order in `offered`. None means identity.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in offered:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+_load_sample = [0.0, 1]  # [sampled at, pressure index]
+
+
+def cpu_pressure() -> int:
+    """0 idle, 1 normal, 2 busy; from the 1-minute load average per CPU, sampled once a second."""
+    now = time.monotonic()
+    if now - _load_sample[0] >= 1.0:
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):  # not available on this platform
+            load = 0.75
+        if load < settings.COMPRESSION_IDLE_LOAD:
+            pressure = 0
+        elif load < settings.COMPRESSION_BUSY_LOAD:
+            pressure = 1
+        else:
+            pressure = 2
+        _load_sample[0], _load_sample[1] = now, pressure
+    return _load_sample[1]
+
+
+def compression_level(encoding: str) -> int:
+    return _LEVELS[encoding][cpu_pressure()]
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if not media_type:
+        return False
+    if any(media_type.startswith(prefix) for prefix in settings.COMPRESSION_SKIP_TYPES):
+        return False
+    return True
+
+
+class _Compressor:
+    """Streaming compressor for one response; flush() after each chunk keeps streams progressive."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "zstd":
+            out = self._obj.compress(data)
+            return out + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            out = self._obj.process(data)
+            return out + (self._obj.finish() if final else self._obj.flush())
+        out = self._obj.compress(data)
+        return out + self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Replaces GZipMiddleware: negotiates zstd / br / gzip from Accept-Encoding and
+    compresses only bodies worth compressing. Skipped: already encoded responses
+    (e.g. precompressed static files), partial content, no-transform, media types
+    that are compressed already (PDF, images, ZIP, ...) and complete bodies under
+    COMPRESSION_MINIMUM_SIZE. The level drops as CPU load rises.
+    Pure ASGI; streaming bodies are compressed and flushed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offered = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept, self.offered)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or "content-range" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or not is_compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    await send(message)
+                    if message["status"] not in (204, 304):
+                        metrics.inc("http_compression_total", encoding="identity", reason="skipped")
+                    return
+                start_message = message  # held until we see the first body chunk
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start.setdefault("headers", []))
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    metrics.inc("http_compression_total", encoding="identity", reason="small")
+                    await send(start)
+                    await send(message)
+                    return
+                level = compression_level(encoding)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["etag"] = f"W/{etag}"  # a different representation of the same resource
+                if more_body:
+                    del headers["content-length"]
+                    compressor = _Compressor(encoding, level)
+                    body_out = compressor.compress(body, final=False)
+                else:
+                    body_out = compress_bytes(body, encoding, level)
+                    headers["content-length"] = str(len(body_out))
+                metrics.inc("http_compression_total", encoding=encoding, reason="compressed")
+                metrics.inc("http_compression_bytes_in_total", len(body), encoding=encoding)
+                metrics.inc("http_compression_bytes_out_total", len(body_out), encoding=encoding)
+                await send(start)
+                await send({"type": "http.response.body", "body": body_out, "more_body": more_body})
+                return
+
+            if compressor is None:  # single-shot body already sent
+                await send(message)
+                return
+            body_out = compressor.compress(body, final=not more_body)
+            metrics.inc("http_compression_bytes_in_total", len(body), encoding=encoding)
+            metrics.inc("http_compression_bytes_out_total", len(body_out), encoding=encoding)
+            await send({"type": "http.response.body", "body": body_out, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+@functools.lru_cache(maxsize=4096)
+def _variants(full_path: str, mtime: float) -> Tuple[Tuple[str, str, os.stat_result], ...]:
+    """Precompressed variants of a static file that are at least as new as the file itself."""
+    found = []
+    for encoding, suffix in SUFFIXES.items():
+        try:
+            stat_result = os.stat(full_path + suffix)
+        except OSError:
+            continue
+        if stat.S_ISREG(stat_result.st_mode) and stat_result.st_mtime >= mtime:
+            found.append((encoding, full_path + suffix, stat_result))
+    return tuple(found)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves `file.zst` / `file.br` / `file.gz` (written at deploy
+    time by scripts/precompress_static.py) in place of `file` when the client
+    accepts that encoding, so static assets are never compressed per request.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        variants = _variants(str(full_path), stat_result.st_mtime) if status_code == 200 else ()
+        if not variants:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        by_encoding = {encoding: (path, st) for encoding, path, st in variants}
+        encoding = negotiate(request_headers.get("accept-encoding", ""), [e for e in SUFFIXES if e in by_encoding])
+        if encoding is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers.add_vary_header("Accept-Encoding")
+            return response
+
+        path, _ = by_encoding[encoding]
+        # The cached listing may predate a redeploy: stat the variant again so size and
+        # ETag are current, and serve the plain file if it has gone or is now older
+        try:
+            variant_stat = os.stat(path)
+        except OSError:
+            variant_stat = None
+        if variant_stat is None or not stat.S_ISREG(variant_stat.st_mode) or variant_stat.st_mtime < stat_result.st_mtime:
+            _variants.cache_clear()
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers.add_vary_header("Accept-Encoding")
+            return response
+        response = FileResponse(
+            path,
+            stat_result=variant_stat,
+            method=scope["method"],
+            media_type=guess_type(str(full_path))[0] or "text/plain",
+            headers={"content-encoding": encoding, "vary": "Accept-Encoding"},
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        metrics.inc("static_precompressed_total", encoding=encoding)
+        return response
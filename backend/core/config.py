@@ -1,5 +1,6 @@
 import os
 from functools import lru_cache
+from typing import Dict, List, Optional
 from pydantic import BaseSettings, Field, PostgresDsn, validator
 
 class Settings(BaseSettings):
@@ -15,12 +16,173 @@ class Settings(BaseSettings):
     DATABASE_URL: str = Field(None, env="DATABASE_URL")
     REDIS_URL: str = Field(..., env="REDIS_URL")
 
+    # Read replicas (GET/HEAD sessions); empty list means everything uses the primary
+    DATABASE_REPLICA_URLS: List[str] = Field(default=[])
+    DATABASE_REPLICA_POOL_SIZE: int = Field(default=10)
+    DATABASE_REPLICA_MAX_OVERFLOW: int = Field(default=20)
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0)
+    DATABASE_REPLICA_LAG_CHECK_SECONDS: float = Field(default=5.0)
+    DATABASE_REPLICA_LAG_CHECK_TIMEOUT: float = Field(default=1.0)
+    DATABASE_READ_YOUR_WRITES_SECONDS: int = Field(default=10)
+
+    # SQL statements allowed per request; strict mode raises (tests/CI), otherwise logged
+    QUERY_BUDGET_DEFAULT: int = Field(default=30)
+    QUERY_BUDGET_STRICT: bool = Field(default=False)
+
+    # Slow-query log (per-fingerprint aggregation, sampled logging, EXPLAIN for the worst)
+    SLOW_QUERY_THRESHOLD_MS: float = Field(default=200.0)
+    SLOW_QUERY_SAMPLE_RATE: float = Field(default=1.0)
+    SLOW_QUERY_LOG_INTERVAL_SECONDS: float = Field(default=10.0)
+    SLOW_QUERY_EXPLAIN_THRESHOLD_MS: float = Field(default=1000.0)
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = Field(default=300.0)
+    SLOW_QUERY_MAX_FINGERPRINTS: int = Field(default=200)
+
     AI_MODELS_PATH: str = Field(default="./ai_models/models")
     STATIC_PATH: str = Field(default="./static")
     LOG_PATH: str = Field(default="./logs")
+    ACCESS_LOG_ENABLED: bool = Field(default=True)
+    LOG_JSON: bool = Field(default=False)
+    LOG_QUEUE_SIZE: int = Field(default=10000)
+    LOG_SAMPLE_RATE: float = Field(default=1.0)
+    LOG_SAMPLE_RATES: Dict[str, float] = Field(default={})
+    LOG_RATE_LIMIT_PER_SECOND: Optional[float] = Field(default=None)
+    LOG_RATE_LIMIT_BURST: int = Field(default=100)
     ENVIRONMENT: str = Field(default="production")
     DEBUG: bool = Field(default=False)
 
+    # Authenticated-user (principal) cache
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=15)
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(default=10000)
+    AUTH_PRINCIPAL_CACHE_REDIS: bool = Field(default=False)
+    AUTH_PRINCIPAL_REDIS_TTL_SECONDS: int = Field(default=300)
+    AUTH_TOKEN_MEMO_MAX_ENTRIES: int = Field(default=20000)
+
+    # Password hashing / login concurrency (per worker)
+    BCRYPT_ROUNDS: int = Field(default=12)
+    PASSWORD_HASH_WORKERS: int = Field(default=4)
+    LOGIN_MAX_CONCURRENT: int = Field(default=4)
+    LOGIN_MAX_QUEUE: int = Field(default=64)
+    LOGIN_QUEUE_TIMEOUT_SECONDS: float = Field(default=5.0)
+
+    # Rate limiting (cluster-wide via REDIS_URL)
+    RATE_LIMIT_ENABLED: bool = Field(default=True)
+    RATE_LIMIT_ANONYMOUS: str = Field(default="100/hour")
+    RATE_LIMIT_AUTHENTICATED: str = Field(default="1000/hour")
+    RATE_LIMIT_API_KEY: str = Field(default="5000/hour")
+    RATE_LIMIT_AI_ANALYSIS: str = Field(default="50/hour")
+    RATE_LIMIT_AI_PATH_PREFIXES: List[str] = Field(default=["/api/v1/analysis", "/api/v1/ai", "/api/ai"])
+    RATE_LIMIT_EXEMPT_PATHS: List[str] = Field(default=["/health", "/metrics", "/static", "/docs", "/redoc", "/openapi.json"])
+    RATE_LIMIT_MAX_LEASE: int = Field(default=10)
+    RATE_LIMIT_TRUST_PROXY: bool = Field(default=False)
+    # SHA-256 hex digests of issued API keys; only these get the api_key budget
+    API_KEY_HASHES: List[str] = Field(default=[])
+
+    # Herb catalog snapshot
+    HERB_CATALOG_REVALIDATE_SECONDS: int = Field(default=30)
+    HERB_CATALOG_MAX_AGE_SECONDS: int = Field(default=86400)
+
+    # Bulk tracking ingestion
+    TRACKING_BULK_MAX_EVENTS: int = Field(default=5000)
+    TRACKING_BULK_MAX_BYTES: int = Field(default=5 * 1024 * 1024)
+    TRACKING_BULK_MAX_FUTURE_SECONDS: int = Field(default=300)
+
+    # Analysis partitioning / archival (monthly partitions, cold months to Parquet)
+    ANALYSIS_ARCHIVER_ENABLED: bool = Field(default=True)
+    ANALYSIS_ARCHIVE_PATH: str = Field(default="./archive/analysis")
+    ANALYSIS_RETENTION_MONTHS: int = Field(default=6)
+    ANALYSIS_PARTITIONS_AHEAD: int = Field(default=3)
+    ANALYSIS_ARCHIVE_BATCH_ROWS: int = Field(default=10000)
+    ANALYSIS_ARCHIVER_INTERVAL_SECONDS: int = Field(default=3600)
+
+    # Streaming exports (CSV / Parquet): rows per cursor fetch and per Parquet row group
+    EXPORT_CHUNK_ROWS: int = Field(default=2000)
+    EXPORT_PARQUET_ROW_GROUP_ROWS: int = Field(default=50000)
+
+    # Certificate PDFs: Thai TTF fonts (registered once per process) and default logo
+    PDF_THAI_FONT_PATH: str = Field(default="./assets/fonts/THSarabunNew.ttf")
+    PDF_THAI_FONT_BOLD_PATH: str = Field(default="./assets/fonts/THSarabunNew-Bold.ttf")
+    PDF_LOGO_PATH: str = Field(default="")
+
+    # Bulk certificate PDFs (process pool, streamed ZIP); 0 workers = one per CPU
+    PDF_BULK_WORKERS: int = Field(default=0)
+    PDF_BULK_IN_FLIGHT: int = Field(default=32)
+    PDF_BULK_MAX_CERTIFICATES: int = Field(default=20000)
+    PDF_BULK_PROGRESS_INTERVAL_SECONDS: float = Field(default=1.0)
+    PDF_BULK_PROGRESS_TTL_SECONDS: int = Field(default=24 * 3600)
+
+    # Rendered certificate PDF cache (content-addressed files)
+    PDF_CACHE_PATH: str = Field(default="./cache/certificates")
+
+    # Email (SMTP): pooled persistent connections fed by a bounded in-memory queue
+    SMTP_HOST: str = Field(default="smtp.gmail.com")
+    SMTP_PORT: int = Field(default=587)
+    SMTP_USER: Optional[str] = Field(default=None)
+    SMTP_PASSWORD: Optional[str] = Field(default=None)
+    SENDER_EMAIL: Optional[str] = Field(default=None)
+    SMTP_STARTTLS: Optional[bool] = Field(default=None)  # None = use STARTTLS when offered
+    SMTP_USE_TLS: bool = Field(default=False)  # implicit TLS (port 465)
+    SMTP_VALIDATE_CERTS: bool = Field(default=True)
+    SMTP_TIMEOUT_SECONDS: float = Field(default=30.0)
+    SMTP_POOL_SIZE: int = Field(default=4)
+    SMTP_QUEUE_SIZE: int = Field(default=10000)
+    SMTP_IDLE_TIMEOUT_SECONDS: float = Field(default=120.0)
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = Field(default=100)
+    SMTP_MAX_RETRIES: int = Field(default=3)
+    SMTP_RETRY_BACKOFF_SECONDS: float = Field(default=2.0)
+    SMTP_DRAIN_TIMEOUT_SECONDS: float = Field(default=10.0)
+
+    # Notification outbox (transactional enqueue, background dispatch with backoff, digests)
+    NOTIFICATION_OUTBOX_ENABLED: bool = Field(default=True)
+    NOTIFICATION_OUTBOX_BATCH_SIZE: int = Field(default=100)
+    NOTIFICATION_OUTBOX_POLL_SECONDS: float = Field(default=2.0)
+    NOTIFICATION_OUTBOX_LEASE_SECONDS: int = Field(default=300)
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS: int = Field(default=8)
+    NOTIFICATION_OUTBOX_BACKOFF_SECONDS: float = Field(default=30.0)
+    NOTIFICATION_OUTBOX_MAX_BACKOFF_SECONDS: float = Field(default=6 * 3600.0)
+    NOTIFICATION_DIGEST_WINDOW_SECONDS: int = Field(default=900)
+
+    # Response compression (see core/compression.py; static variants from scripts/precompress_static.py)
+    COMPRESSION_ENCODINGS: List[str] = Field(default=["zstd", "br", "gzip"])
+    COMPRESSION_MINIMUM_SIZE: int = Field(default=1000)
+    COMPRESSION_SKIP_TYPES: List[str] = Field(default=[
+        "image/", "video/", "audio/", "application/pdf", "application/zip", "application/gzip",
+        "application/x-gzip", "application/zstd", "application/x-7z-compressed", "application/vnd.apache.parquet",
+        "application/octet-stream", "font/woff", "text/event-stream",
+    ])
+    COMPRESSION_IDLE_LOAD: float = Field(default=0.5)
+    COMPRESSION_BUSY_LOAD: float = Field(default=0.9)
+
+    # Request tracing (spans per request; the slowest traces of each window are exported)
+    TRACING_ENABLED: bool = Field(default=True)
+    TRACING_KEEP_SLOWEST: int = Field(default=20)
+    TRACING_EXPORT_INTERVAL_SECONDS: float = Field(default=60.0)
+    TRACING_MIN_DURATION_MS: float = Field(default=100.0)
+    TRACING_MAX_SPANS: int = Field(default=1000)
+    TRACING_EXPORTER: str = Field(default="jsonl")  # jsonl | otlp | none
+    TRACING_JSONL_PATH: str = Field(default="./logs/traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = Field(default="http://localhost:4318/v1/traces")
+    TRACING_SERVICE_NAME: str = Field(default="gacp-api")
+
+    # Image store: content-addressed originals (SHA-256) plus lazily generated renditions
+    IMAGE_STORE_BACKEND: str = Field(default="local")  # local | s3 (also MinIO / LocalStack)
+    IMAGE_STORE_PATH: str = Field(default="./storage/images")
+    IMAGE_STORE_S3_BUCKET: str = Field(default="gacp-images")
+    IMAGE_STORE_S3_PREFIX: str = Field(default="")
+    IMAGE_STORE_S3_ENDPOINT_URL: Optional[str] = Field(default=None)
+    IMAGE_STORE_S3_REGION: Optional[str] = Field(default=None)
+    IMAGE_STORE_MAX_BYTES: int = Field(default=20 * 1024 * 1024)
+    IMAGE_STORE_THUMB_SIZE: int = Field(default=256)
+    IMAGE_STORE_WEB_SIZE: int = Field(default=1280)
+    IMAGE_STORE_RENDITION_QUALITY: int = Field(default=82)
+    IMAGE_STORE_GC_ENABLED: bool = Field(default=True)
+    IMAGE_STORE_GC_INTERVAL_SECONDS: float = Field(default=3600.0)
+    IMAGE_STORE_ORPHAN_SWEEP_INTERVAL_SECONDS: float = Field(default=86400.0)
+    IMAGE_STORE_GC_GRACE_SECONDS: int = Field(default=86400)
+    IMAGE_STORE_GC_BATCH_SIZE: int = Field(default=500)
+
+    # Reporting: day boundaries for analysis rollups
+    REPORT_TIMEZONE: str = Field(default="Asia/Bangkok")
+
     @validator("DATABASE_URL", pre=True, always=True)
     def assemble_db_connection(cls, v, values):
         if v and isinstance(v, str):
@@ -1,6 +1,22 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.dml import UpdateBase
 from core.config import settings
+from backend.core.metrics import metrics
+from backend.core.redis_client import get_redis
+from backend.core.request_context import count_query
+from backend.core.security import bearer_subject
+import backend.core.query_log  # noqa: F401  (registers statement timing / slow-query hooks)
 
 DATABASE_URL = settings.DATABASE_URL
 
@@ -13,17 +29,238 @@ engine = create_async_engine(
     max_overflow=20,
 )
 
+replica_engines: List[AsyncEngine] = [
+    create_async_engine(
+        url,
+        future=True,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_size=settings.DATABASE_REPLICA_POOL_SIZE,
+        max_overflow=settings.DATABASE_REPLICA_MAX_OVERFLOW,
+    )
+    for url in settings.DATABASE_REPLICA_URLS
+]
+
+# Cookie set after a request commits writes; while it is valid the client reads from the primary
+READ_YOUR_WRITES_COOKIE = "gacp_ryw"
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Seconds of replay lag on a PostgreSQL standby (0 when fully caught up)
+_PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSet:
+    """
+    Round-robin over replicas whose replication lag is within bounds.
+
+    Lag is re-measured at most once per check interval per replica; a replica that
+    is behind, or whose check fails, is skipped until a later check succeeds. When
+    no replica is usable, callers fall back to the primary.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], max_lag: float, check_interval: float):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lag: List[Optional[float]] = [None] * len(engines)
+        self._checked_at = [0.0] * len(engines)
+        self._locks = [asyncio.Lock() for _ in engines]
+        self._next = itertools.count()
+
+    async def choose(self) -> Optional[AsyncEngine]:
+        if not self.engines:
+            return None
+        start = next(self._next)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if await self._is_healthy(index):
+                return self.engines[index]
+        metrics.inc("db_replica_fallback_total")
+        return None
+
+    async def _is_healthy(self, index: int) -> bool:
+        if time.monotonic() - self._checked_at[index] >= self.check_interval and not self._locks[index].locked():
+            async with self._locks[index]:
+                self._lag[index] = await self._measure_lag(self.engines[index])
+                self._checked_at[index] = time.monotonic()
+                if self._lag[index] is not None:
+                    metrics.set_gauge("db_replica_lag_seconds", self._lag[index], replica=str(index))
+        lag = self._lag[index]
+        return lag is not None and lag <= self.max_lag
+
+    @staticmethod
+    async def _query_lag(replica: AsyncEngine) -> float:
+        async with replica.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                return 0.0
+            result = await conn.execute(_PG_REPLICA_LAG_SQL)
+            return float(result.scalar() or 0.0)
+
+    async def _measure_lag(self, replica: AsyncEngine) -> Optional[float]:
+        try:
+            return await asyncio.wait_for(self._query_lag(replica), timeout=settings.DATABASE_REPLICA_LAG_CHECK_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"Replica lag check failed for {replica.url.render_as_string(hide_password=True)}: {e}")
+            return None
+
+
+replica_set = ReplicaSet(
+    replica_engines,
+    max_lag=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DATABASE_REPLICA_LAG_CHECK_SECONDS,
+)
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from the replica chosen for it (info["replica"]) and sends
+    flushes and INSERT/UPDATE/DELETE statements to the primary. Once a session has
+    written, it stays on the primary so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None:
+            if not self._flushing and not isinstance(clause, UpdateBase):
+                return replica.sync_engine
+            self.info["replica"] = None
+        return engine.sync_engine
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    count_query()
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _clear_written(session):
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _flag_request_write(session):
+    state = session.info.get("request_state")
+    if session.info.pop("wrote", False) and state is not None:
+        state.db_wrote = True
+
+
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
 )
 
 Base = declarative_base()
 
-async def get_db():
+
+class UserWriteStickiness:
+    """
+    Read-your-writes per authenticated user: after a user's request commits writes,
+    that user's reads go to the primary for DATABASE_READ_YOUR_WRITES_SECONDS from
+    every client (other devices, cookie-less API clients), not just the cookie jar
+    that made the write. Marks are kept in this worker and shared through Redis
+    when it is reachable; without Redis, other workers only see the cookie.
+    """
+
+    MAX_LOCAL_ENTRIES = 100_000
+
+    def __init__(self, key_prefix: str = "gacp:ryw"):
+        self.key_prefix = key_prefix
+        self._local: Dict[str, float] = {}
+
+    async def mark(self, subject: str) -> None:
+        window = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+        now = time.time()
+        if len(self._local) >= self.MAX_LOCAL_ENTRIES:
+            self._local = {k: v for k, v in self._local.items() if v > now}
+        self._local[subject] = now + window
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(f"{self.key_prefix}:{subject}", b"1", px=int(window * 1000))
+            except Exception as e:
+                logging.warning(f"Read-your-writes mark not shared, redis unavailable: {e}")
+
+    async def is_sticky(self, subject: str) -> bool:
+        if self._local.get(subject, 0.0) > time.time():
+            return True
+        redis = get_redis()
+        if redis is None:
+            return False
+        try:
+            return bool(await redis.exists(f"{self.key_prefix}:{subject}"))
+        except Exception as e:
+            logging.warning(f"Read-your-writes check skipped, redis unavailable: {e}")
+            return False
+
+    def reset(self) -> None:
+        self._local.clear()
+
+
+user_stickiness = UserWriteStickiness()
+
+
+async def wants_replica(request: Optional[Request]) -> bool:
+    """
+    Safe-method requests may read from a replica unless the client holds a fresh
+    read-your-writes cookie or the authenticated user wrote recently.
+    """
+    if request is None or not replica_engines or request.method not in _SAFE_METHODS:
+        return False
+    if request.headers.get("x-consistency", "").lower() == "strong":
+        return False
+    try:
+        sticky_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        sticky_until = 0.0
+    if sticky_until >= time.time():
+        return False
+    subject = bearer_subject(request.headers.get("authorization"))
+    return subject is None or not await user_stickiness.is_sticky(subject)
+
+
+async def get_db(request: Request = None):
     async with AsyncSessionLocal() as session:
+        replica = await replica_set.choose() if await wants_replica(request) else None
+        session.sync_session.info["replica"] = replica
+        if request is not None:
+            session.sync_session.info["request_state"] = request.state
+        metrics.inc("db_sessions_total", target="replica" if replica is not None else "primary")
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+@asynccontextmanager
+async def read_session():
+    """
+    Standalone read-only session on a healthy replica (primary as fallback), for
+    long-running reads such as streaming exports that outlive the request session.
+    """
+    async with AsyncSessionLocal() as session:
+        session.sync_session.info["replica"] = await replica_set.choose()
+        yield session
+
+
+def dialect_insert(bind):
+    """
+    insert() construct with ON CONFLICT / RETURNING support for the bind's dialect.
+    Production runs PostgreSQL; SQLite is supported for local development.
+    """
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {bind.dialect.name}")
+    return insert
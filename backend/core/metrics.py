@@ -0,0 +1,93 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    """
+    In-process metrics registry (counters, gauges, summaries).
+    Rendered in Prometheus text format by the /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[str, Dict[LabelKey, float]] = defaultdict(dict)
+        self._summaries: Dict[str, Dict[LabelKey, list]] = defaultdict(dict)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name][_label_key(labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self._gauges[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record an observation (count, sum, max) for a summary."""
+        key = _label_key(labels)
+        with self._lock:
+            summary = self._summaries[name].get(key)
+            if summary is None:
+                self._summaries[name][key] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> Dict:
+        """Return a JSON-serializable copy of all metrics."""
+        with self._lock:
+            return {
+                "counters": {n: {str(dict(k)): v for k, v in s.items()} for n, s in self._counters.items()},
+                "gauges": {n: {str(dict(k)): v for k, v in s.items()} for n, s in self._gauges.items()},
+                "summaries": {
+                    n: {str(dict(k)): {"count": c, "sum": t, "max": m} for k, (c, t, m) in s.items()}
+                    for n, s in self._summaries.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        def fmt(name: str, key: LabelKey, value: float) -> str:
+            if not key:
+                return f"{name} {value}"
+            labels = ",".join(f'{k}="{v}"' for k, v in key)
+            return f"{name}{{{labels}}} {value}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(fmt(name, k, v) for k, v in series.items())
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(fmt(name, k, v) for k, v in series.items())
+            for name, series in sorted(self._summaries.items()):
+                lines.append(f"# TYPE {name} summary")
+                for k, (count, total, peak) in series.items():
+                    lines.append(fmt(f"{name}_count", k, count))
+                    lines.append(fmt(f"{name}_sum", k, total))
+                    lines.append(fmt(f"{name}_max", k, peak))
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+metrics = Metrics()
@@ -1,14 +1,86 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 import logging
+import time
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logger = logging.getLogger("uvicorn.access")
-        logger.info(f"Request: {request.method} {request.url}")
-        response = await call_next(request)
-        logger.info(f"Response status: {response.status_code}")
-        return response
+from backend.core.config import settings
+from backend.core.database import READ_YOUR_WRITES_COOKIE, user_stickiness
+from backend.core.metrics import metrics
+from backend.core.request_context import check_query_budget, current_request, end_request, start_request
+from backend.core.security import bearer_subject
+from backend.core.tracing import end_trace, start_trace
 
-def setup_middlewares(app):
-    app.add_middleware(LoggingMiddleware)
\ No newline at end of file
+access_logger = logging.getLogger("gacp.access")
+
+
+class RequestMiddleware:
+    """
+    Single pure-ASGI pass for everything every request needs:
+
+    - opens the request context (request id, route, SQL statement count) used by
+      the database hooks, echoes X-Request-ID and checks the query budget;
+    - read-your-writes: after a request that committed database writes, sets a
+      short-lived cookie so the client's following reads go to the primary
+      instead of a replica that may not have replayed the write yet, and for an
+      authenticated caller marks the user, so their other clients read from the
+      primary too (see core.database.get_db);
+    - times the request up to the last body chunk, writes one access log line and
+      hands the request's trace (core.tracing) to the tail sampler.
+
+    Only `send` is wrapped (and only the response start is touched), so request
+    bodies and streaming responses pass through without buffering.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_id = authorization = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64] or None
+            elif name == b"authorization":
+                authorization = value.decode("latin-1")
+        token = start_request(scope, request_id)
+        ctx = current_request()
+        trace_token = start_trace(ctx.request_id, ctx.method, ctx.path)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = message.setdefault("headers", [])
+                headers.append((b"x-request-id", ctx.request_id.encode("latin-1")))
+                if scope.get("state", {}).get("db_wrote"):
+                    window = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+                    cookie = (
+                        f"{READ_YOUR_WRITES_COOKIE}={time.time() + window:.3f}; "
+                        f"Max-Age={window}; Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    headers.append((b"set-cookie", cookie.encode("latin-1")))
+                    subject = bearer_subject(authorization)
+                    if subject is not None:
+                        await user_stickiness.mark(subject)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = ctx.route
+            metrics.observe("http_request_duration_seconds", elapsed, route=route, status=status_code)
+            metrics.observe("db_queries_per_request", ctx.query_count, route=route)
+            metrics.observe("db_time_seconds", ctx.db_time, route=route)
+            if not check_query_budget(ctx):
+                metrics.inc("query_budget_exceeded_total", route=route)
+            if settings.ACCESS_LOG_ENABLED and access_logger.isEnabledFor(logging.INFO):
+                access_logger.info(
+                    f"{ctx.method} {ctx.path} {status_code} {elapsed * 1000:.1f}ms "
+                    f"queries={ctx.query_count} request_id={ctx.request_id}"
+                )
+            end_trace(trace_token, status_code, route)
+            end_request(token)
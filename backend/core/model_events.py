@@ -0,0 +1,57 @@
+import logging
+from typing import Callable, List, Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+Change = Tuple[str, object]  # ("insert" | "update" | "delete", instance)
+
+_subscribers: List[Tuple[Tuple[Type, ...], Callable[[List[Change]], None]]] = []
+_INFO_KEY = "_committed_model_changes"
+
+
+def on_commit(*models: Type):
+    """
+    Register a callback invoked after a transaction that inserted, updated or deleted
+    instances of `models` commits. The callback receives [(op, instance), ...].
+
+    Only ORM unit-of-work changes are seen; bulk `update()`/`delete()` statements must
+    notify their subscribers explicitly.
+    """
+    def decorator(callback: Callable[[List[Change]], None]):
+        _subscribers.append((models, callback))
+        return callback
+    return decorator
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    if not _subscribers:
+        return
+    pending = session.info.setdefault(_INFO_KEY, [])
+    for obj in session.new:
+        pending.append(("insert", obj))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            pending.append(("update", obj))
+    for obj in session.deleted:
+        pending.append(("delete", obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    changes = session.info.pop(_INFO_KEY, None)
+    if not changes:
+        return
+    for models, callback in _subscribers:
+        matching = [(op, obj) for op, obj in changes if isinstance(obj, models)]
+        if matching:
+            try:
+                callback(matching)
+            except Exception as e:
+                logging.error(f"Commit hook {callback.__name__} failed: {e}", exc_info=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_INFO_KEY, None)
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.request_context import current_request
+from backend.core.tracing import record_span
+
+slow_query_logger = logging.getLogger("gacp.slow_query")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_RE = re.compile(r"\bVALUES\s*\(([^()]*)\)(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL with literals and bind markers replaced by '?' and IN / multi-row VALUES lists collapsed."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    sql = _VALUES_RE.sub(r"VALUES (\1), ...", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _value_shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    """Types and sizes of bind parameters, never their values."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else None
+        return {"rows": len(parameters), "row": parameter_shape(first, False)}
+    if isinstance(parameters, dict):
+        return {k: _value_shape(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(v) for v in parameters]
+    return _value_shape(parameters)
+
+
+@dataclass
+class SlowQueryStats:
+    fingerprint: str
+    sql: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    parameter_shape: Any = None
+    last_route: Optional[str] = None
+    last_request_id: Optional[str] = None
+    last_seen: float = 0.0
+    last_logged: float = 0.0
+    plan: Optional[List[str]] = None
+    plan_captured_at: float = 0.0
+    routes: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "avg_ms": round(self.total_seconds * 1000 / self.count, 2) if self.count else None,
+            "parameter_shape": self.parameter_shape,
+            "routes": dict(self.routes),
+            "last_route": self.last_route,
+            "last_request_id": self.last_request_id,
+            "plan": self.plan,
+        }
+
+
+class SlowQueryRegistry:
+    """
+    Bounded per-fingerprint aggregate of statements over the slow threshold.
+    When full, the fingerprint with the least total time is evicted.
+    """
+
+    def __init__(self, max_entries: int = settings.SLOW_QUERY_MAX_FINGERPRINTS):
+        self.max_entries = max_entries
+        self._entries: Dict[str, SlowQueryStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, parameters: Any, executemany: bool, elapsed: float, ctx) -> SlowQueryStats:
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        route = ctx.route if ctx is not None else "-"
+        with self._lock:
+            stats = self._entries.get(key)
+            if stats is None:
+                if len(self._entries) >= self.max_entries:
+                    victim = min(self._entries.values(), key=lambda s: s.total_seconds)
+                    del self._entries[victim.fingerprint]
+                stats = self._entries[key] = SlowQueryStats(fingerprint=key, sql=normalized)
+            stats.count += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.parameter_shape = parameter_shape(parameters, executemany)
+            stats.last_route = route
+            stats.last_request_id = ctx.request_id if ctx is not None else None
+            stats.last_seen = time.time()
+            stats.routes[route] = stats.routes.get(route, 0) + 1
+        return stats
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[Dict]:
+        key = {"total": lambda s: s.total_seconds, "max": lambda s: s.max_seconds, "count": lambda s: s.count}[order_by]
+        with self._lock:
+            entries = sorted(self._entries.values(), key=key, reverse=True)[:limit]
+            return [s.as_dict() for s in entries]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryRegistry()
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[List[str]]:
+    """
+    EXPLAIN (never ANALYZE) the statement on the same connection via a raw cursor.
+    On PostgreSQL it runs inside a savepoint: a failing EXPLAIN would otherwise leave
+    the request's transaction aborted.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        prefix = "EXPLAIN "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    savepoint = dialect == "postgresql"
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT gacp_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT gacp_explain")
+            raise
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT gacp_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    began = started.pop()
+    elapsed = time.perf_counter() - began
+    ctx = current_request()
+    if ctx is not None:
+        ctx.db_time += elapsed
+        record_span("db.statement", began, elapsed, statement=statement[:200], executemany=executemany)
+    if elapsed * 1000 < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    route = ctx.route if ctx is not None else "-"
+    metrics.inc("db_slow_queries_total", route=route)
+    stats = slow_queries.record(statement, parameters, executemany, elapsed, ctx)
+    now = time.time()
+
+    if (
+        not executemany
+        and elapsed * 1000 >= settings.SLOW_QUERY_EXPLAIN_THRESHOLD_MS
+        and now - stats.plan_captured_at >= settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        and statement.lstrip()[:6].upper().startswith(_EXPLAINABLE)
+    ):
+        stats.plan_captured_at = now
+        try:
+            stats.plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            logging.warning(f"EXPLAIN capture failed for slow query {stats.fingerprint}: {e}")
+
+    if now - stats.last_logged < settings.SLOW_QUERY_LOG_INTERVAL_SECONDS:
+        return
+    if random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+        return
+    stats.last_logged = now
+    slow_query_logger.warning(json.dumps({
+        "event": "slow_query",
+        "duration_ms": round(elapsed * 1000, 2),
+        "fingerprint": stats.fingerprint,
+        "sql": stats.sql,
+        "parameter_shape": stats.parameter_shape,
+        "route": route,
+        "request_id": ctx.request_id if ctx is not None else None,
+        "plan": stats.plan,
+    }, ensure_ascii=False, default=str))
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
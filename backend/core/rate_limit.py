@@ -0,0 +1,323 @@
+import functools
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.redis_client import get_redis
+from backend.core.security import bearer_subject
+
+# Sliding-window counter: the previous fixed window is weighted by how much of it
+# still overlaps the sliding window. Grants up to ARGV[4] tokens atomically and
+# returns {granted, remaining, reset_ms}; on a denial reset_ms is the time until
+# one token frees up (see retry_after_ms).
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local want = tonumber(ARGV[4])
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local elapsed = now % window
+local estimated = prev * ((window - elapsed) / window) + curr
+local available = math.floor(limit - estimated)
+local granted = math.min(want, available)
+if granted < 1 then
+  local wait = window - elapsed
+  if limit >= 1 and curr <= limit - 1 then
+    wait = window - elapsed - (limit - 1 - curr) * window / prev
+  elseif limit >= 1 then
+    wait = window - elapsed + window * (1 - (limit - 1) / curr)
+  end
+  return {0, 0, math.max(1, math.ceil(wait))}
+end
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {granted, available - granted, window - elapsed}
+"""
+
+# Bound on per-worker lease/denial entries before expired ones are pruned
+MAX_LOCAL_ENTRIES = 100_000
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def retry_after_ms(limit: int, window_ms: int, elapsed_ms: int, curr: int, prev: int) -> int:
+    """
+    Time until a denied key gets one token back. Needs prev * (window - t) / window
+    + curr <= limit - 1: within this window as the previous one's weight decays
+    if curr leaves room, else part-way into the next window, where curr becomes
+    the decaying one. Mirrored in SLIDING_WINDOW_LUA.
+    """
+    if limit < 1:
+        wait = window_ms - elapsed_ms
+    elif curr <= limit - 1:
+        wait = window_ms - elapsed_ms - (limit - 1 - curr) * window_ms / prev
+    else:
+        wait = window_ms - elapsed_ms + window_ms * (1 - (limit - 1) / curr)
+    return max(1, math.ceil(wait))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    window_seconds: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """Parse '1000/hour', '50/minute', '10/30second' style specs."""
+        count, _, period = spec.partition("/")
+        digits = "".join(ch for ch in period if ch.isdigit())
+        unit = period[len(digits):].strip().rstrip("s") or "second"
+        return cls(limit=int(count), window_seconds=int(digits or 1) * _PERIODS[unit])
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float
+    route_class: str
+
+
+@dataclass
+class _Lease:
+    tokens: int
+    remaining: int
+    expires_at: float
+
+
+@dataclass
+class _LocalWindow:
+    """Fallback counters for one key: the current fixed window and the one before it."""
+    index: int
+    count: int
+    previous: int
+    expires_at: float  # once the current window is no longer the previous one either
+
+
+class SlidingWindowRateLimiter:
+    """
+    Cluster-wide sliding-window limiter backed by Redis.
+
+    Each worker leases small batches of tokens from Redis and spends them locally, so
+    most requests never touch Redis; the lease shrinks to 1 as a client nears its limit.
+    Denials are cached locally until a token frees up. If Redis is unavailable the
+    limiter degrades to the same algorithm in process memory.
+    """
+
+    def __init__(self, max_lease: int = settings.RATE_LIMIT_MAX_LEASE, key_prefix: str = "gacp:rl"):
+        self.max_lease = max_lease
+        self.key_prefix = key_prefix
+        self._leases: Dict[str, _Lease] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._local_windows: Dict[str, _LocalWindow] = {}
+        self._script = None
+
+    async def hit(self, route_class: str, identity: str, rule: RateLimit) -> RateLimitDecision:
+        key = f"{route_class}:{identity}"
+        now = time.time()
+
+        blocked_until = self._blocked_until.get(key)
+        if blocked_until is not None:
+            if blocked_until > now:
+                metrics.inc("rate_limit_decisions_total", route_class=route_class, result="denied", source="local")
+                return RateLimitDecision(False, rule.limit, 0, blocked_until - now, route_class)
+            del self._blocked_until[key]
+
+        lease = self._leases.get(key)
+        if lease is not None and lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            metrics.inc("rate_limit_decisions_total", route_class=route_class, result="allowed", source="local")
+            return RateLimitDecision(True, rule.limit, lease.remaining + lease.tokens, lease.expires_at - now, route_class)
+
+        want = self._lease_size(lease, rule)
+        granted, remaining, reset_seconds, source = await self._acquire(key, rule, want, now)
+        if granted < 1:
+            self._leases.pop(key, None)
+            self._blocked_until[key] = now + reset_seconds
+            metrics.inc("rate_limit_decisions_total", route_class=route_class, result="denied", source=source)
+            return RateLimitDecision(False, rule.limit, 0, reset_seconds, route_class)
+
+        if len(self._leases) >= MAX_LOCAL_ENTRIES:
+            self._prune(now)
+        self._leases[key] = _Lease(tokens=granted - 1, remaining=remaining, expires_at=now + reset_seconds)
+        metrics.inc("rate_limit_decisions_total", route_class=route_class, result="allowed", source=source)
+        return RateLimitDecision(True, rule.limit, remaining + granted - 1, reset_seconds, route_class)
+
+    def _lease_size(self, lease: Optional[_Lease], rule: RateLimit) -> int:
+        # Never lease more than a small fraction of what is left, so over-counting of
+        # unspent leased tokens stays bounded and the limit is exact near exhaustion.
+        remaining = lease.remaining if lease is not None else rule.limit
+        return max(1, min(self.max_lease, remaining // 20))
+
+    async def _acquire(self, key: str, rule: RateLimit, want: int, now: float) -> Tuple[int, int, float, str]:
+        window_ms = rule.window_seconds * 1000
+        now_ms = int(now * 1000)
+        window_idx = now_ms // window_ms
+        redis = get_redis()
+        if redis is not None:
+            try:
+                if self._script is None:
+                    self._script = redis.register_script(SLIDING_WINDOW_LUA)
+                granted, remaining, reset_ms = await self._script(
+                    keys=[f"{self.key_prefix}:{key}:{window_idx}", f"{self.key_prefix}:{key}:{window_idx - 1}"],
+                    args=[rule.limit, window_ms, now_ms, want],
+                )
+                return int(granted), int(remaining), int(reset_ms) / 1000.0, "redis"
+            except Exception as e:
+                logging.warning(f"Rate limiter redis unavailable, using local fallback: {e}")
+                self._script = None
+        return self._acquire_local(key, rule, want, window_idx, now_ms, window_ms) + ("fallback",)
+
+    def _acquire_local(self, key, rule, want, window_idx, now_ms, window_ms) -> Tuple[int, int, float]:
+        window = self._local_windows.get(key)
+        if window is None or window.index < window_idx - 1:
+            curr, prev = 0, 0
+        elif window.index == window_idx - 1:
+            curr, prev = 0, window.count
+        else:
+            curr, prev = window.count, window.previous
+        elapsed = now_ms % window_ms
+        available = math.floor(rule.limit - (prev * ((window_ms - elapsed) / window_ms) + curr))
+        granted = min(want, available)
+        if granted < 1:
+            return 0, 0, retry_after_ms(rule.limit, window_ms, elapsed, curr, prev) / 1000.0
+        if window is None and len(self._local_windows) >= MAX_LOCAL_ENTRIES:
+            self._prune(now_ms / 1000.0)
+            if len(self._local_windows) >= MAX_LOCAL_ENTRIES:  # all live: forget the oldest key
+                del self._local_windows[next(iter(self._local_windows))]
+        self._local_windows[key] = _LocalWindow(
+            index=window_idx, count=curr + granted, previous=prev, expires_at=(window_idx + 2) * window_ms / 1000.0
+        )
+        return granted, available - granted, (window_ms - elapsed) / 1000.0
+
+    def _prune(self, now: float) -> None:
+        self._leases = {k: v for k, v in self._leases.items() if v.expires_at > now}
+        self._blocked_until = {k: v for k, v in self._blocked_until.items() if v > now}
+        # Windows older than window_idx - 1 no longer count towards any decision
+        self._local_windows = {k: v for k, v in self._local_windows.items() if v.expires_at > now}
+
+    def reset(self) -> None:
+        self._leases.clear()
+        self._blocked_until.clear()
+        self._local_windows.clear()
+
+
+@functools.lru_cache()
+def route_class_budgets() -> Dict[str, RateLimit]:
+    return {
+        "anonymous": RateLimit.parse(settings.RATE_LIMIT_ANONYMOUS),
+        "authenticated": RateLimit.parse(settings.RATE_LIMIT_AUTHENTICATED),
+        "api_key": RateLimit.parse(settings.RATE_LIMIT_API_KEY),
+        "ai_analysis": RateLimit.parse(settings.RATE_LIMIT_AI_ANALYSIS),
+    }
+
+
+@functools.lru_cache()
+def known_api_key_hashes() -> FrozenSet[str]:
+    return frozenset(digest.strip().lower() for digest in settings.API_KEY_HASHES if digest.strip())
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def resolve_identity(request: Request) -> Tuple[str, str]:
+    """
+    Return (identity_class, identity) for the caller: API key, authenticated user, or IP.
+    Users behind a shared NAT are keyed by user id, not by address. Only keys whose
+    hash is in API_KEY_HASHES count as API keys; unknown keys are ignored, so minting
+    random keys cannot buy the larger budget (or fill Redis with keys).
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        if digest in known_api_key_hashes():
+            return "api_key", "key:" + digest[:32]
+        metrics.inc("rate_limit_unknown_api_key_total")
+    subject = bearer_subject(request.headers.get("Authorization"))
+    if subject is not None:
+        return "authenticated", f"user:{subject}"
+    return "anonymous", f"ip:{client_ip(request)}"
+
+
+def route_classes_for(path: str, identity_class: str) -> List[str]:
+    classes = [identity_class]
+    if any(path.startswith(prefix) for prefix in settings.RATE_LIMIT_AI_PATH_PREFIXES):
+        classes.append("ai_analysis")
+    return classes
+
+
+rate_limiter = SlidingWindowRateLimiter()
+
+
+class RateLimitMiddleware:
+    """
+    Apply the identity budget (and the AI analysis budget on AI routes) to every request.
+    Pure ASGI: the response is passed through untouched apart from the rate limit headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if not settings.RATE_LIMIT_ENABLED or any(path.startswith(p) for p in settings.RATE_LIMIT_EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        budgets = route_class_budgets()
+        identity_class, identity = resolve_identity(request)
+        tightest: Optional[RateLimitDecision] = None
+        for route_class in route_classes_for(path, identity_class):
+            decision = await rate_limiter.hit(route_class, identity, budgets[route_class])
+            if not decision.allowed:
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": f"Rate limit exceeded ({route_class})"},
+                    headers=_rate_limit_headers(decision, retry_after=True),
+                )
+                await response(scope, receive, send)
+                return
+            if tightest is None or decision.remaining < tightest.remaining:
+                tightest = decision
+
+        if tightest is None:
+            await self.app(scope, receive, send)
+            return
+        extra = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in _rate_limit_headers(tightest).items()]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).extend(extra)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _rate_limit_headers(decision: RateLimitDecision, retry_after: bool = False) -> Dict[str, str]:
+    headers = {
+        "X-Rate-Limit-Limit": str(decision.limit),
+        "X-Rate-Limit-Remaining": str(max(decision.remaining, 0)),
+        "X-Rate-Limit-Reset": str(math.ceil(decision.reset_seconds)),
+    }
+    if retry_after:
+        headers["Retry-After"] = str(max(1, math.ceil(decision.reset_seconds)))
+    return headers
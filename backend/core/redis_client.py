@@ -0,0 +1,39 @@
+import logging
+from typing import Optional
+
+from backend.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional for single-worker/dev setups
+    aioredis = None
+
+_client = None
+
+
+def get_redis() -> Optional["aioredis.Redis"]:
+    """
+    Return a shared asyncio Redis client for REDIS_URL, or None if redis-py is not installed.
+    """
+    global _client
+    if aioredis is None:
+        return None
+    if _client is None:
+        _client = aioredis.from_url(settings.REDIS_URL, decode_responses=False)
+    return _client
+
+
+def set_redis(client) -> None:
+    """Override the shared client (e.g. with fakeredis in tests)."""
+    global _client
+    _client = client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        try:
+            await _client.close()
+        except Exception as e:
+            logging.warning(f"Redis close failed: {e}")
+        _client = None
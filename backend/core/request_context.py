@@ -0,0 +1,98 @@
+import contextvars
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from backend.core.config import settings
+
+
+# Route label for requests no route matched (404s, scanners)
+UNMATCHED = "<unmatched>"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised (in strict mode) when a request issues more SQL statements than its budget."""
+
+
+@dataclass
+class RequestContext:
+    """Per-request state shared by middleware, dependencies and SQLAlchemy event hooks."""
+    request_id: str
+    method: str
+    path: str
+    scope: dict
+    query_count: int = 0
+    db_time: float = 0.0
+
+    @property
+    def route(self) -> str:
+        """
+        Route template (e.g. /herbs/{herb_id}), the mount prefix for mounted apps
+        (e.g. /static), or UNMATCHED. Used as a metric label, so never the raw path:
+        every 404 URL would otherwise become a new series.
+        """
+        route = self.scope.get("route")
+        path = getattr(route, "path", None)
+        if path:
+            return path
+        if self.scope.get("endpoint") is not None and self.scope.get("root_path"):
+            return self.scope["root_path"]
+        return UNMATCHED
+
+    @property
+    def query_budget(self) -> int:
+        endpoint = self.scope.get("endpoint")
+        return getattr(endpoint, "__query_budget__", settings.QUERY_BUDGET_DEFAULT)
+
+
+_current: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar("request_context", default=None)
+
+
+def current_request() -> Optional[RequestContext]:
+    return _current.get()
+
+
+def start_request(scope: dict, request_id: Optional[str] = None) -> contextvars.Token:
+    ctx = RequestContext(
+        request_id=request_id or uuid.uuid4().hex,
+        method=scope.get("method", ""),
+        path=scope.get("path", ""),
+        scope=scope,
+    )
+    return _current.set(ctx)
+
+
+def end_request(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def query_budget(limit: int) -> Callable:
+    """Override the per-request SQL statement budget for one endpoint."""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__query_budget__ = limit
+        return endpoint
+    return decorator
+
+
+def count_query() -> None:
+    """Called for every statement executed on any engine (see core.database)."""
+    ctx = _current.get()
+    if ctx is None:
+        return
+    ctx.query_count += 1
+    if settings.QUERY_BUDGET_STRICT and ctx.query_count > ctx.query_budget:
+        raise QueryBudgetExceeded(
+            f"{ctx.method} {ctx.route} issued {ctx.query_count} SQL statements (budget {ctx.query_budget})"
+        )
+
+
+def check_query_budget(ctx: RequestContext) -> bool:
+    """Log a request that went over its budget; returns False if it did."""
+    if ctx.query_count <= ctx.query_budget:
+        return True
+    logging.warning(
+        f"Query budget exceeded: {ctx.method} {ctx.route} issued {ctx.query_count} SQL statements "
+        f"(budget {ctx.query_budget}, request_id={ctx.request_id})"
+    )
+    return False
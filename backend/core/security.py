@@ -1,12 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from core.config import settings
+from backend.core.metrics import metrics
+import asyncio
 import logging
+import time
 
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -30,6 +40,32 @@ def get_password_hash(password: str) -> str:
     """
     return pwd_context.hash(password)
 
+async def _run_password_op(op: str, func, *args):
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        metrics.observe("password_hash_seconds", time.perf_counter() - started, op=op)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    ตรวจสอบรหัสผ่านใน thread pool (ไม่บล็อก event loop)
+    """
+    return await _run_password_op("verify", pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    ตรวจสอบรหัสผ่านใน thread pool และคืน hash ใหม่ถ้า hash เดิมใช้ค่า cost เก่า (rehash-on-login)
+    """
+    return await _run_password_op("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    สร้าง hash ใน thread pool (ไม่บล็อก event loop)
+    """
+    return await _run_password_op("hash", pwd_context.hash, password)
+
 def decode_access_token(token: str) -> Optional[dict]:
     """
     ถอดรหัส JWT access token
@@ -39,4 +75,23 @@ def decode_access_token(token: str) -> Optional[dict]:
         return payload
     except JWTError as e:
         logging.warning(f"JWT decode failed: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def bearer_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    sub ของ header "Bearer <jwt>" ที่ถูกต้อง (None ถ้าไม่มีหรือไม่ถูกต้อง)
+    ผลถอดรหัสถูกจำไว้ต่อ token ใน principal_cache
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    # Imported lazily: services depend on core, not the other way round
+    from backend.services.principal_cache import principal_cache
+    token = authorization[7:]
+    payload = principal_cache.get_token(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if payload and "sub" in payload:
+            principal_cache.remember_token(token, payload)
+    if payload and "sub" in payload:
+        return str(payload["sub"])
+    return None
@@ -0,0 +1,326 @@
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float  # seconds since the trace started
+    duration: float = 0.0
+    attributes: Dict[str, object] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class Trace:
+    """All spans of one request; trace_id is the request id (see core.request_context)."""
+    trace_id: str
+    method: str
+    path: str
+    started_at: float = field(default_factory=time.time)
+    route: Optional[str] = None
+    status: Optional[int] = None
+    duration: float = 0.0
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+    root_id: str = field(default_factory=lambda: _new_span_id())
+    finished: bool = False
+    _t0: float = field(default_factory=time.perf_counter)
+
+    def add(self, span: Span) -> None:
+        if self.finished:
+            return
+        if len(self.spans) >= settings.TRACING_MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "name": s.name,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "start_ms": round(s.start * 1000, 3),
+                    "duration_ms": round(s.duration * 1000, 3),
+                    "attributes": s.attributes,
+                    **({"error": s.error} if s.error else {}),
+                }
+                for s in self.spans
+            ],
+        }
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_parent", default=None)
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def start_trace(trace_id: str, method: str, path: str) -> Optional[contextvars.Token]:
+    if not settings.TRACING_ENABLED:
+        return None
+    return _trace.set(Trace(trace_id=trace_id, method=method, path=path))
+
+
+def end_trace(token: Optional[contextvars.Token], status: int, route: str) -> None:
+    if token is None:
+        return
+    trace = _trace.get()
+    _trace.reset(token)
+    if trace is None:
+        return
+    trace.duration = time.perf_counter() - trace._t0
+    trace.status = status
+    trace.route = route
+    trace.finished = True
+    tracer.offer(trace)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the current span. A no-op outside a traced request
+    (background jobs, worker processes), so it can wrap any stage unconditionally.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = Span(name, _new_span_id(), _parent.get() or trace.root_id, time.perf_counter() - trace._t0, attributes=attributes)
+    token = _parent.set(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _parent.reset(token)
+        current.duration = time.perf_counter() - trace._t0 - current.start
+        trace.add(current)
+
+
+def current_span_id() -> Optional[str]:
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return _parent.get() or trace.root_id
+
+
+def record_span(
+    name: str,
+    started: float,
+    duration: float,
+    trace: Optional[Trace] = None,
+    parent_id: Optional[str] = None,
+    error: Optional[str] = None,
+    **attributes,
+) -> None:
+    """
+    Add an already measured span (`started` is a time.perf_counter() value). Work
+    finishing outside the request's context (e.g. a queue worker) passes the
+    trace and parent span captured when the work was handed over.
+    """
+    if trace is None:
+        trace = _trace.get()
+        parent_id = current_span_id()
+    if trace is None:
+        return
+    trace.add(Span(name, _new_span_id(), parent_id or trace.root_id, started - trace._t0, duration, attributes, error))
+
+
+class JsonLinesExporter:
+    """Appends one trace per line to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, traces: List[Trace]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for trace in traces:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+class OtlpHttpExporter:
+    """
+    POSTs traces as OTLP/HTTP JSON (ExportTraceServiceRequest) to a collector, e.g.
+    http://collector:4318/v1/traces. Uses only the standard library.
+    """
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _trace_id(trace_id: str) -> str:
+        # OTLP wants 16 bytes of hex; client supplied request ids are hashed to fit
+        if len(trace_id) == 32 and all(c in "0123456789abcdef" for c in trace_id):
+            return trace_id
+        return hashlib.sha256(trace_id.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def _attributes(values: Dict[str, object]) -> List[Dict]:
+        out = []
+        for key, value in values.items():
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            out.append({"key": key, "value": typed})
+        return out
+
+    def payload(self, traces: List[Trace]) -> Dict:
+        spans = []
+        for trace in traces:
+            trace_id = self._trace_id(trace.trace_id)
+            origin = int(trace.started_at * 1e9)
+            spans.append({
+                "traceId": trace_id,
+                "spanId": trace.root_id,
+                "name": f"{trace.method} {trace.route or trace.path}",
+                "kind": 2,  # SERVER
+                "startTimeUnixNano": str(origin),
+                "endTimeUnixNano": str(origin + int(trace.duration * 1e9)),
+                "attributes": self._attributes({
+                    "http.method": trace.method,
+                    "http.target": trace.path,
+                    "http.route": trace.route or trace.path,
+                    "http.status_code": trace.status or 0,
+                    "request_id": trace.trace_id,
+                }),
+                "status": {"code": 2 if (trace.status or 500) >= 500 else 1},
+            })
+            for s in trace.spans:
+                start = origin + int(s.start * 1e9)
+                spans.append({
+                    "traceId": trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id,
+                    "name": s.name,
+                    "kind": 1,  # INTERNAL
+                    "startTimeUnixNano": str(start),
+                    "endTimeUnixNano": str(start + int(s.duration * 1e9)),
+                    "attributes": self._attributes(s.attributes),
+                    "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": self._attributes({"service.name": self.service_name})},
+                "scopeSpans": [{"scope": {"name": "gacp.tracing"}, "spans": spans}],
+            }]
+        }
+
+    def export(self, traces: List[Trace]) -> None:
+        body = json.dumps(self.payload(traces), default=str).encode("utf-8")
+        request = urllib.request.Request(
+            self.endpoint, data=body, method="POST", headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def build_exporter():
+    if settings.TRACING_EXPORTER == "otlp":
+        return OtlpHttpExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+    if settings.TRACING_EXPORTER == "jsonl":
+        return JsonLinesExporter(settings.TRACING_JSONL_PATH)
+    return None
+
+
+class Tracer:
+    """
+    Tail-based sampler: finished traces compete for TRACING_KEEP_SLOWEST slots
+    (a min-heap on duration), and every TRACING_EXPORT_INTERVAL_SECONDS the
+    survivors are exported and the window starts over. Fast requests cost one
+    heap comparison and are then garbage.
+    """
+
+    def __init__(self, keep: int = settings.TRACING_KEEP_SLOWEST):
+        self.keep = keep
+        self._heap: List[Tuple[float, int, Trace]] = []
+        self._seq = itertools.count()
+        self.exporter = None
+
+    def offer(self, trace: Trace) -> None:
+        metrics.inc("traces_finished_total")
+        if trace.duration * 1000 < settings.TRACING_MIN_DURATION_MS:
+            return
+        item = (trace.duration, next(self._seq), trace)
+        if len(self._heap) < self.keep:
+            heapq.heappush(self._heap, item)
+        elif trace.duration > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def drain(self) -> List[Trace]:
+        """Slowest first; resets the window."""
+        heap, self._heap = self._heap, []
+        return [trace for _, _, trace in sorted(heap, key=lambda item: item[0], reverse=True)]
+
+    async def flush(self) -> int:
+        traces = self.drain()
+        if not traces or self.exporter is None:
+            return 0
+        try:
+            await asyncio.to_thread(self.exporter.export, traces)
+            metrics.inc("traces_exported_total", len(traces))
+        except Exception as e:
+            metrics.inc("trace_export_errors_total")
+            logging.warning(f"Trace export failed ({len(traces)} traces): {e}")
+        return len(traces)
+
+    async def run_forever(self, interval: float = settings.TRACING_EXPORT_INTERVAL_SECONDS) -> None:
+        self.exporter = build_exporter()
+        logging.info(f"Tracing enabled: keeping the {self.keep} slowest traces every {interval:.0f}s ({settings.TRACING_EXPORTER})")
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush()
+        finally:
+            # Last window on shutdown; the exporter call is short and bounded by its timeout
+            traces = self.drain()
+            if traces and self.exporter is not None:
+                try:
+                    self.exporter.export(traces)
+                except Exception as e:
+                    logging.warning(f"Trace export on shutdown failed: {e}")
+
+
+tracer = Tracer()
@@ -13,14 +13,8 @@ from pathlib import Path
 import uvicorn
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import core modules
 from app.core.config import settings
@@ -51,21 +45,36 @@ from app.api.v1 import (
     health
 )
 
-from backend.utils.logger import get_logger
+from backend.core.metrics import metrics
+from backend.core.compression import CompressionMiddleware, PrecompressedStaticFiles
+from backend.core.middleware import RequestMiddleware
+from backend.core.rate_limit import RateLimitMiddleware
+from backend.core.tracing import tracer
+from backend.core.database import engine as async_engine
+from backend.services.analysis_archive import analysis_archive
+from backend.services.bulk_pdf import shutdown_pdf_pool
+from backend.services.image_store import image_store
+from backend.services.notification_outbox import outbox_dispatcher
+from backend.utils.logger import get_logger, stop_logging
+from backend.utils.serialization import FastJSONResponse
 
-# Configure logging (production-ready, log rotation, stdout + file)
+# Configure logging (production-ready, log rotation, stdout + file); writes happen on a
+# background listener thread, DEBUG/INFO volume is sampled/rate limited per settings
 logger = get_logger(
     name="gacp",
     level=logging.INFO,
     log_to_file="logs/app.log",
     fmt="%(asctime)s %(levelname)s %(name)s %(process)d %(thread)d %(message)s",
     max_bytes=20 * 1024 * 1024,
-    backup_count=10
+    backup_count=10,
+    json_format=settings.LOG_JSON,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    sample_rate=settings.LOG_SAMPLE_RATE,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    rate_limit_per_second=settings.LOG_RATE_LIMIT_PER_SECOND,
+    rate_limit_burst=settings.LOG_RATE_LIMIT_BURST,
 )
 
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
-
 # Application lifespan events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -91,6 +100,26 @@ async def lifespan(app: FastAPI):
         asyncio.create_task(system_monitor.start_monitoring())
         logger.info("✅ System monitoring started")
         
+        # Start analysis partition maintenance / Parquet archival
+        if settings.ANALYSIS_ARCHIVER_ENABLED:
+            app.state.analysis_archiver = asyncio.create_task(analysis_archive.run_forever(async_engine))
+            logger.info("✅ Analysis archiver started")
+        
+        # Start notification outbox dispatcher
+        if settings.NOTIFICATION_OUTBOX_ENABLED:
+            app.state.outbox_dispatcher = asyncio.create_task(outbox_dispatcher.run_forever())
+            logger.info("✅ Notification outbox dispatcher started")
+        
+        # Export the slowest request traces of each window
+        if settings.TRACING_ENABLED:
+            app.state.trace_exporter = asyncio.create_task(tracer.run_forever())
+            logger.info("✅ Request tracing started")
+        
+        # Remove stored images no analysis references any more
+        if settings.IMAGE_STORE_GC_ENABLED:
+            app.state.image_gc = asyncio.create_task(image_store.run_forever())
+            logger.info("✅ Image store garbage collection started")
+        
         logger.info("🎉 Application startup completed")
         
     except Exception as e:
@@ -104,9 +133,16 @@ async def lifespan(app: FastAPI):
     
     try:
         system_monitor.stop_monitoring()
+        for task_name in ("analysis_archiver", "outbox_dispatcher", "trace_exporter", "image_gc"):
+            task = getattr(app.state, task_name, None)
+            if task is not None:
+                task.cancel()
+        shutdown_pdf_pool()
         AIService.cleanup()
+        await NotificationService.cleanup()
         await CacheService.cleanup()
         logger.info("✅ Application shutdown completed")
+        stop_logging()
         
     except Exception as e:
         logger.error(f"❌ Application shutdown error: {e}", exc_info=True)
@@ -157,6 +193,7 @@ app = FastAPI(
     redoc_url="/redoc" if settings.ENVIRONMENT != "production" else None,
     openapi_url="/openapi.json" if settings.ENVIRONMENT != "production" else None,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Security Middleware
@@ -173,19 +210,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count", "X-Rate-Limit-*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Rate-Limit-*"],
 )
 
-# Compression Middleware
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Compression Middleware (zstd / br / gzip negotiation; skips already-compressed media types)
+app.add_middleware(CompressionMiddleware)
 
 # Monitoring Middleware
 app.add_middleware(MonitoringMiddleware)
 
-# Rate Limiting Middleware
-app.add_middleware(SlowAPIMiddleware)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Rate Limiting Middleware (cluster-wide budgets per user / API key / IP, see core/rate_limit.py)
+app.add_middleware(RateLimitMiddleware)
+
+# Request context (request id, route, SQL statement budget), read-your-writes cookie,
+# timing and access log in one pure ASGI pass; outermost so it spans the whole request
+app.add_middleware(RequestMiddleware)
 
 # Custom Exception Handlers
 app.add_exception_handler(CustomHTTPException, custom_http_exception_handler)
@@ -195,7 +234,8 @@ app.add_exception_handler(Exception, python_exception_handler)
 # Static files
 static_path = Path("static")
 static_path.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+# Precompressed .zst/.br/.gz variants (scripts/precompress_static.py) are served when accepted
+app.mount("/static", PrecompressedStaticFiles(directory=static_path), name="static")
 
 # API Routes
 api_v1_prefix = "/api/v1"
@@ -261,6 +301,10 @@ async def root():
 async def health_check():
     return {"status": "healthy", "ai_models": await AIService.get_status()}
 
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -10,14 +10,22 @@ from .user import User
 from .herb import Herb
 from .certificate import Certificate
 from .analysis import Analysis
+from .analysis_rollup import AnalysisDailyRollup
 from .tracking import Tracking
+from .tracking_event import TrackingEvent
+from .notification_outbox import NotificationOutbox
+from .stored_image import StoredImage
 
 __all__ = [
     "User",
     "Herb",
     "Certificate",
     "Analysis",
+    "AnalysisDailyRollup",
     "Tracking",
+    "TrackingEvent",
+    "NotificationOutbox",
+    "StoredImage",
 ]
 
 # This file is fully production-ready, supports Alembic autogeneration,
@@ -1,23 +1,74 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, JSON, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, DateTime, ForeignKey, JSON, Identity, PrimaryKeyConstraint, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import relationship, validates
 from backend.core.database import Base
 
 class Analysis(Base):
     __tablename__ = "analysis"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Monthly RANGE partitions on created_at (see services/analysis_archive.py). The ORM
+    # key is `id` alone (SQLite dev/tests autoincrement it); PostgreSQL DDL adds created_at
+    # to the primary key, as partitioning requires (see _partitioned_primary_key)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
     image_path = Column(String(512), nullable=False)
+    # Content-addressed image (stored_image.digest); image_path is kept for older rows
+    image_digest = Column(String(64), nullable=True, index=True)
     herb_id = Column(Integer, ForeignKey("herb.id", ondelete="SET NULL"), nullable=True, index=True)
     result = Column(JSON, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    province = Column(String(128), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Summary columns extracted from `result` on write (see _extract_summary)
+    species = Column(String(255), nullable=True, index=True)
+    species_confidence = Column(Float, nullable=True)
+    grade = Column(String(8), nullable=True, index=True)
+    quality_score = Column(Float, nullable=True)
+    compliance_score = Column(Float, nullable=True, index=True)
+    compliance_status = Column(String(32), nullable=True)
+    certificate_ready = Column(Boolean, nullable=True)
+    issue_count = Column(Integer, nullable=True)
+
     user = relationship("User", back_populates="analyses")
     herb = relationship("Herb", back_populates="analyses")
 
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    @validates("result")
+    def _extract_summary(self, key, result):
+        """Keep the typed summary columns in sync whenever `result` is assigned."""
+        result = result or {}
+        herb = result.get("herb_identification") or {}
+        quality = result.get("quality_assessment") or {}
+        compliance = result.get("gacp_compliance") or {}
+        disease = result.get("disease_detection") or {}
+        self.species = herb.get("species")
+        self.species_confidence = herb.get("confidence")
+        self.grade = quality.get("grade")
+        self.quality_score = quality.get("overall_score")
+        self.compliance_score = compliance.get("score")
+        self.compliance_status = compliance.get("status")
+        self.certificate_ready = compliance.get("certificate_ready")
+        issues = disease.get("issues_detected")
+        self.issue_count = len(issues) if isinstance(issues, list) else None
+        return result
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    """PRIMARY KEY (id, created_at) for the partitioned table; other tables unchanged."""
+    if constraint.table is not None and constraint.table.name == Analysis.__tablename__:
+        return "PRIMARY KEY (id, created_at)"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
 # หมายเหตุ:
 # - ใน models/user.py ต้องมี: analyses = relationship("Analysis", back_populates="user", cascade="all, delete-orphan")
 # - ใน models/herb.py ต้องมี: analyses = relationship("Analysis", back_populates="herb", cascade="all, delete-orphan")
+# - คอลัมน์สรุป (species, grade, compliance_score ฯลฯ) ดึงจาก result อัตโนมัติเมื่อกำหนดค่า result
+# - ตาราง partition รายเดือนตาม created_at (PostgreSQL); partition ที่เก่ากว่า ANALYSIS_RETENTION_MONTHS
+#   ถูกย้ายไปเป็นไฟล์ Parquet แล้วลบออกจากฐานข้อมูล อ่านย้อนหลังผ่าน AnalysisHistory
+# - บน PostgreSQL primary key คือ (id, created_at); ต้องกำหนด created_at ตอน insert ดู AnalysisService.save_analysis
+# - image_digest ชี้ไปที่ stored_image (รูปเก็บแบบ content-addressed, ดู services/image_store.py)
 # - ใช้ ondelete เพื่อ integrity ของข้อมูล
-# - พร้อมสำหรับ production, รองรับ Alembic migration, ORM discovery
\ No newline at end of file
+# - พร้อมสำหรับ production, รองรับ Alembic migration, ORM discovery
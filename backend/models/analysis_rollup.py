@@ -0,0 +1,41 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Date, DateTime, UniqueConstraint, func
+from backend.core.database import Base
+
+# Compliance-score histogram buckets (upper bound exclusive), aligned with GACP thresholds
+SCORE_BUCKETS = (
+    ("score_lt50", None, 50),
+    ("score_50_70", 50, 70),
+    ("score_70_80", 70, 80),
+    ("score_80_90", 80, 90),
+    ("score_ge90", 90, None),
+)
+
+class AnalysisDailyRollup(Base):
+    __tablename__ = "analysis_daily_rollup"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    day = Column(Date, nullable=False)
+    dimension = Column(String(32), nullable=False)  # all | species | grade | province | user
+    key = Column(String(255), nullable=False, default="")
+    analysis_count = Column(Integer, nullable=False, default=0)
+    compliant_count = Column(Integer, nullable=False, default=0)
+    issue_count = Column(Integer, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+    score_lt50 = Column(Integer, nullable=False, default=0)
+    score_50_70 = Column(Integer, nullable=False, default=0)
+    score_70_80 = Column(Integer, nullable=False, default=0)
+    score_80_90 = Column(Integer, nullable=False, default=0)
+    score_ge90 = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("dimension", "key", "day", name="uq_analysis_daily_rollup"),
+    )
+
+# หมายเหตุ:
+# - หนึ่งแถวต่อ (วัน, มิติ, ค่า) อัปเดตแบบ incremental (upsert) ใน transaction เดียวกับการบันทึก Analysis
+# - endpoint สถิติอ่านเฉพาะตารางนี้ ไม่ต้อง scan ตาราง analysis
+# - มิติ all แบ่งเป็น ALL_SHARDS แถวต่อวัน (key = user_id % ALL_SHARDS) เพื่อไม่ให้ทุกการบันทึกรอ lock แถวเดียว; ตอนอ่านรวมทุก shard
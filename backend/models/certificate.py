@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, JSON, func
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, JSON, Index, func
 from sqlalchemy.orm import relationship
 from backend.core.database import Base
 import enum
@@ -16,14 +16,21 @@ class Certificate(Base):
     user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
     certificate_type = Column(String(128), nullable=False)
     data = Column(JSON, nullable=True)
-    status = Column(Enum(CertificateStatus), default=CertificateStatus.PENDING, nullable=False)
+    status = Column(Enum(CertificateStatus), default=CertificateStatus.PENDING, nullable=False, index=True)
     issued_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     note = Column(String(512), nullable=True)
+    pdf_digest = Column(String(64), nullable=True)  # Cached rendered PDF (services/pdf_cache.py)
 
     user = relationship("User", back_populates="certificates")
 
+    __table_args__ = (
+        # Per-user certificate listing, keyset-paginated by issue date
+        Index("ix_certificate_user_id_issued_at", "user_id", "issued_at", "id"),
+    )
+
 # หมายเหตุ:
 # - ใน models/user.py ต้องมี: certificates = relationship("Certificate", back_populates="user", cascade="all, delete-orphan")
+# - pdf_digest: digest ของ PDF ที่ render ไว้แล้ว ถูกล้างเมื่อข้อมูลใบรับรองเปลี่ยน (ไฟล์เก่าถูกลบหลัง commit)
 # - ใช้ ondelete="CASCADE" เพื่อ integrity ของข้อมูล
 # - พร้อมสำหรับ production, รองรับ Alembic migration, ORM discovery
\ No newline at end of file
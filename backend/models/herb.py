@@ -12,7 +12,7 @@ class Herb(Base):
     description = Column(String(1024), nullable=True)
     properties = Column(JSON, nullable=True)
     image_url = Column(String(512), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     analyses = relationship("Analysis", back_populates="herb", cascade="all, delete-orphan")
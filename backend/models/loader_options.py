@@ -0,0 +1,37 @@
+"""
+Loader options per response shape.
+
+Each shape states exactly which relationships a response serializes and loads
+them up front (joinedload for many-to-one, selectinload for collections).
+Everything else gets raiseload("*"), so a relationship touched by accident
+raises instead of issuing one lazy query per row (or failing with implicit IO
+under asyncio).
+"""
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from backend.models.certificate import Certificate
+from backend.models.herb import Herb
+from backend.models.user import User
+
+# Column-only rows (lists, admin tables, internal batch jobs)
+USER_ROW = (raiseload("*"),)
+HERB_ROW = (raiseload("*"),)
+ANALYSIS_ROW = (raiseload("*"),)
+TRACKING_ROW = (raiseload("*"),)
+TRACKING_EVENT_ROW = (raiseload("*"),)
+
+# Certificates are shown with their owner's public profile
+CERTIFICATE_WITH_OWNER = (
+    joinedload(Certificate.user).load_only(User.id, User.username, User.full_name, User.email).raiseload("*"),
+    raiseload("*"),
+)
+
+# Herb detail with its analyses (admin views); collections use one IN query, not one per herb
+HERB_WITH_ANALYSES = (
+    selectinload(Herb.analyses).raiseload("*"),
+    raiseload("*"),
+)
+
+# หมายเหตุ:
+# - service ต้องเลือก shape ให้ตรงกับ response ที่ serialize: select(Model).options(*SHAPE)
+# - ถ้า response ต้องการความสัมพันธ์ใหม่ ให้เพิ่ม shape ที่นี่ ไม่ใช่ lazy load ใน endpoint
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Text, Index, UniqueConstraint, func
+from backend.core.database import Base
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=True, index=True)
+    channel = Column(String(16), nullable=False, default="email")
+    recipient = Column(String(255), nullable=False)
+    kind = Column(String(64), nullable=False, default="generic")  # e.g. certificate_status, tracking_update
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    html = Column(Text, nullable=True)
+    digest = Column(Boolean, nullable=False, default=False)  # may be coalesced into a per-recipient digest
+    dedupe_key = Column(String(128), nullable=True)
+    status = Column(String(16), nullable=False, default="pending")  # pending | sending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(512), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Dispatcher claim: WHERE status = 'pending' AND next_attempt_at <= now() ORDER BY next_attempt_at
+        Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+        # Digest coalescing: other pending digest rows of the same recipient
+        Index("ix_notification_outbox_recipient_status", "recipient", "status"),
+        # Same event enqueued twice (retried request, replayed job) is stored once; NULLs never conflict
+        UniqueConstraint("dedupe_key", name="uq_notification_outbox_dedupe_key"),
+    )
+
+# หมายเหตุ:
+# - เขียนแถว outbox ใน transaction เดียวกับการเปลี่ยนแปลงข้อมูล (services/notification_outbox.py: enqueue_notification)
+#   ถ้า transaction rollback การแจ้งเตือนก็ไม่ถูกส่ง, ถ้า commit แล้วจะถูกส่งแน่นอน (at-least-once)
+# - OutboxDispatcher ดึงงานแบบ FOR UPDATE SKIP LOCKED หลาย worker ทำงานพร้อมกันได้
+# - digest=True: รวมการแจ้งเตือนของผู้รับเดียวกันภายใน NOTIFICATION_DIGEST_WINDOW_SECONDS เป็นอีเมลฉบับเดียว
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, func
+from backend.core.database import Base
+
+class StoredImage(Base):
+    __tablename__ = "stored_image"
+
+    # SHA-256 of the original bytes; also the blob key (see services/image_store.py)
+    digest = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(64), nullable=False)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # Number of Analysis rows pointing at this image; 0 = eligible for garbage collection
+    ref_count = Column(Integer, nullable=False, default=0, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    released_at = Column(DateTime(timezone=True), nullable=True)
+
+# หมายเหตุ:
+# - รูปเก็บครั้งเดียวต่อเนื้อหา (ชื่อไฟล์คือ SHA-256) อัปโหลดซ้ำจะเพิ่มแค่ ref_count
+# - ref_count เพิ่มเมื่อบันทึก Analysis ที่อ้างรูปนี้ และลดเมื่อลบ Analysis ผ่าน ORM (ใน transaction เดียวกัน)
+# - รูปที่ ref_count = 0 นานกว่า IMAGE_STORE_GC_GRACE_SECONDS ถูกลบพร้อม thumbnail/rendition โดย ImageStore.collect_garbage
+# - partition ของ analysis ที่ถูก archive ไม่ลด ref_count (รูปยังถูกเก็บไว้ให้ข้อมูลย้อนหลัง)
@@ -10,15 +10,24 @@ class Tracking(Base):
     herb_id = Column(Integer, ForeignKey("herb.id", ondelete="SET NULL"), nullable=True, index=True)
     tracking_code = Column(String(128), unique=True, nullable=False, index=True)
     status = Column(String(64), nullable=False, index=True)
-    events = Column(JSON, nullable=True)  # List of timeline events
+    events = Column(JSON, nullable=True)  # Legacy timeline blob; superseded by TrackingEvent rows
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="trackings")
     herb = relationship("Herb", back_populates="trackings")
+    timeline = relationship(
+        "TrackingEvent",
+        back_populates="tracking",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="[TrackingEvent.timestamp, TrackingEvent.id]",
+    )
 
 # หมายเหตุ:
 # - ใน models/user.py ต้องมี: trackings = relationship("Tracking", back_populates="user", cascade="all, delete-orphan")
 # - ใน models/herb.py ต้องมี: trackings = relationship("Tracking", back_populates="herb", cascade="all, delete-orphan")
+# - ใน models/tracking_event.py ต้องมี: tracking = relationship("Tracking", back_populates="timeline")
+# - events (JSON) เป็นข้อมูลเก่า: เหตุการณ์ใหม่เขียนลง TrackingEvent แบบ append-only
 # - ใช้ ondelete เพื่อ integrity ของข้อมูล
 # - พร้อมสำหรับ production, รองรับ Alembic migration, ORM discovery
\ No newline at end of file
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, JSON, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+from backend.core.database import Base
+
+class TrackingEvent(Base):
+    __tablename__ = "tracking_event"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    tracking_code = Column(
+        String(128), ForeignKey("tracking.tracking_code", ondelete="CASCADE"), nullable=False
+    )
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    status = Column(String(64), nullable=False)
+    location = Column(String(255), nullable=True)
+    actor_id = Column(Integer, ForeignKey("user.id", ondelete="SET NULL"), nullable=True, index=True)
+    data = Column(JSON, nullable=True)
+    client_event_id = Column(String(64), nullable=True)  # Scanner-generated id for idempotent retries
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    tracking = relationship("Tracking", back_populates="timeline")
+
+    __table_args__ = (
+        # Timeline reads and keyset pagination: WHERE tracking_code = ? AND (timestamp, id) > (?, ?)
+        Index("ix_tracking_event_code_timestamp", "tracking_code", "timestamp", "id"),
+        # Bulk ingestion dedupe (ON CONFLICT DO NOTHING); NULLs never conflict
+        UniqueConstraint("tracking_code", "client_event_id", name="uq_tracking_event_client_event_id"),
+    )
+
+# หมายเหตุ:
+# - ตารางแบบ append-only: ทุก scan เป็นหนึ่งแถว ไม่ต้องอ่าน/เขียน JSON ทั้งก้อนใหม่
+# - ใน models/tracking.py ต้องมี: timeline = relationship("TrackingEvent", back_populates="tracking", ...)
+# - client_event_id: เครื่องสแกนส่งซ้ำได้โดยไม่เกิดเหตุการณ์ซ้ำ (unique ต่อ tracking_code)
+# - ข้อมูลเก่าใน Tracking.events ย้ายมาด้วย TrackingService.backfill_events_from_json()
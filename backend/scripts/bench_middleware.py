@@ -0,0 +1,165 @@
+"""
+Per-request middleware overhead benchmark.
+
+    python -m backend.scripts.bench_middleware --requests 20000
+
+Drives a trivial Starlette route directly over ASGI (no sockets, no HTTP parsing)
+through three stacks: no middleware, the previous stack (BaseHTTPMiddleware
+logging and rate limiting around the request-context and read-your-writes
+middleware), and the current single-pass RequestMiddleware plus ASGI
+RateLimitMiddleware. Rate limiting is disabled for the run so Redis is not
+involved; what is left is the cost of the middleware plumbing itself.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from fastapi import Request
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from backend.core.config import settings
+from backend.core.database import READ_YOUR_WRITES_COOKIE
+from backend.core.metrics import metrics
+from backend.core.middleware import RequestMiddleware
+from backend.core.rate_limit import RateLimitMiddleware
+from backend.core.request_context import check_query_budget, current_request, end_request, start_request
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        logger = logging.getLogger("uvicorn.access")
+        logger.info(f"Request: {request.method} {request.url}")
+        response = await call_next(request)
+        logger.info(f"Response status: {response.status_code}")
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if not settings.RATE_LIMIT_ENABLED:
+            return await call_next(request)
+        raise RuntimeError("benchmark runs with rate limiting disabled")
+
+
+class LegacyReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and scope.get("state", {}).get("db_wrote"):
+                message.setdefault("headers", []).append((b"set-cookie", READ_YOUR_WRITES_COOKIE.encode()))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class LegacyRequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        token = start_request(scope, None)
+        ctx = current_request()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", ctx.request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.observe("db_queries_per_request", ctx.query_count, route=ctx.route)
+            metrics.observe("db_time_seconds", ctx.db_time, route=ctx.route)
+            check_query_budget(ctx)
+            end_request(token)
+
+
+async def ping(request):
+    return PlainTextResponse("pong")
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(8):
+            yield b"x" * 1024
+    return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+
+STACKS = {
+    "none": [],
+    # add_middleware order: first listed is outermost
+    "legacy": [
+        Middleware(LegacyRequestContextMiddleware),
+        Middleware(LegacyReadYourWritesMiddleware),
+        Middleware(LegacyRateLimitMiddleware),
+        Middleware(LegacyLoggingMiddleware),
+    ],
+    "asgi": [Middleware(RequestMiddleware), Middleware(RateLimitMiddleware)],
+}
+
+
+def build_app(stack: str) -> Starlette:
+    return Starlette(routes=[Route("/ping", ping), Route("/stream", stream)], middleware=STACKS[stack])
+
+
+async def run(app: Starlette, path: str, count: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench")], "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def request():
+        body_sent = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()  # like a server: nothing more until the client goes away
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(200):  # warm-up
+        await request()
+    started = time.perf_counter()
+    for _ in range(count):
+        await request()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Access logging is part of the cost being measured, but should not flood the terminal
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+    settings.RATE_LIMIT_ENABLED = False
+
+    print(f"requests={args.requests} (microseconds per request)")
+    for path in ("/ping", "/stream"):
+        results = {stack: asyncio.run(run(build_app(stack), path, args.requests)) for stack in STACKS}
+        baseline = results["none"]
+        for stack, micros in results.items():
+            overhead = f"  overhead {micros - baseline:6.1f}" if stack != "none" else ""
+            print(f"{path:>8} {stack:>7}: {micros:7.1f}{overhead}")
+        print(f"{path:>8} legacy/asgi: {results['legacy'] / results['asgi']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
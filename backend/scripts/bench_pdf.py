@@ -0,0 +1,56 @@
+"""
+Certificates-per-second benchmark for PDFGenerator.
+
+    python -m backend.scripts.bench_pdf --count 200 --logo ./static/logo.png
+
+"uncached" builds a fresh CertificateTemplate per certificate (styles, table styles
+and logo decoding on every call, as before templates were cached); "cached" reuses
+the process-wide template the way PDFGenerator.generate_certificate does.
+"""
+import argparse
+import logging
+import time
+
+from backend.services.pdf_generator import CertificateTemplate, get_certificate_template, register_thai_fonts
+
+SAMPLE = {
+    "user_full_name": "สมชาย ใจดี",
+    "certificate_id": "GACP-2024-000123",
+    "certificate_type": "GACP สมุนไพรขมิ้นชัน",
+    "issued_at": "2024-06-01",
+    "status": "อนุมัติ",
+    "description": "แปลงปลูกขมิ้นชันผ่านการตรวจประเมินตามมาตรฐาน GACP ครบทุกหมวด",
+    "gacp_compliance": {"score": 92.5, "status": "ผ่าน", "issues": ["บันทึกการใช้ปุ๋ยไม่ครบ"]},
+}
+
+
+def run(mode: str, count: int, logo_path: str) -> float:
+    template = get_certificate_template(logo_path)
+    template.render(SAMPLE)  # warm-up (font subsetting tables, imports)
+    started = time.perf_counter()
+    for i in range(count):
+        data = dict(SAMPLE, certificate_id=f"GACP-2024-{i:06d}")
+        if mode == "uncached":
+            CertificateTemplate(logo_path).render(data)
+        else:
+            template.render(data)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--logo", default=None, help="logo image used for both runs")
+    args = parser.parse_args()
+
+    font, _ = register_thai_fonts()
+    print(f"font={font} logo={args.logo or '-'} count={args.count}")
+    results = {mode: run(mode, args.count, args.logo) for mode in ("uncached", "cached")}
+    for mode, rate in results.items():
+        print(f"{mode:>9}: {rate:8.1f} certificates/s")
+    print(f"  speedup: {results['cached'] / results['uncached']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Write precompressed variants of static assets at deploy time.
+
+    python -m backend.scripts.precompress_static ./static
+
+For every compressible file (CSS, JS, HTML, SVG, JSON, ...) of at least
+--min-size bytes, writes file.zst / file.br / file.gz at maximum levels next to
+it; PrecompressedStaticFiles (core/compression.py) serves them directly. A
+variant is skipped when it would not be meaningfully smaller, rewritten only
+when the source is newer, and removed when its source is gone. Only variants
+this script wrote (listed in <root>/.precompressed.json) are ever removed, so
+shipped archives such as data/report.csv.gz are left alone.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+from typing import Dict, Set, Tuple
+
+from backend.core.compression import SUFFIXES, brotli, zstandard
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".html", ".htm", ".svg", ".json", ".txt",
+    ".xml", ".csv", ".ico", ".wasm", ".webmanifest", ".ttf", ".otf",
+}
+# A variant must save at least this fraction of the original to be kept
+MIN_SAVING = 0.05
+# Variants written by this script, relative to the root; nothing else is ever deleted
+MANIFEST_NAME = ".precompressed.json"
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def load_manifest(root: str) -> Set[str]:
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_manifest(root: str, owned: Set[str]) -> None:
+    path = os.path.join(root, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(sorted(owned), f, indent=0)
+    os.replace(f"{path}.tmp", path)
+
+
+def precompress_file(path: str, encodings, owned: Set[str]) -> Dict[str, str]:
+    """
+    Returns encoding -> "written" | "fresh" | "skipped" for one file. `owned` holds
+    the variant paths this script wrote and is updated in place.
+    """
+    results = {}
+    source_mtime = os.path.getmtime(path)
+    data = None
+    for encoding in encodings:
+        target = path + SUFFIXES[encoding]
+        if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            results[encoding] = "fresh"
+            continue
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = compress(data, encoding)
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            if target in owned:
+                os.remove(target)
+                owned.discard(target)
+            results[encoding] = "skipped"
+            continue
+        tmp = f"{target}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp, target)
+        os.utime(target, (source_mtime, source_mtime))  # variant counts as fresh for this source
+        owned.add(target)
+        results[encoding] = "written"
+    return results
+
+
+def run(root: str, min_size: int, encodings) -> Tuple[Dict[str, int], int]:
+    counts: Dict[str, int] = {}
+    removed = 0
+    owned = {os.path.join(root, *relative.split("/")) for relative in load_manifest(root)}
+    suffixes = set(SUFFIXES.values())
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if path == os.path.join(root, MANIFEST_NAME):
+                continue
+            base, ext = os.path.splitext(path)
+            if ext in suffixes:
+                if path in owned and not os.path.exists(base):
+                    os.remove(path)
+                    owned.discard(path)
+                    removed += 1
+                continue
+            if ext.lower() not in COMPRESSIBLE_EXTENSIONS or os.path.getsize(path) < min_size:
+                continue
+            for result in precompress_file(path, encodings, owned).values():
+                counts[result] = counts.get(result, 0) + 1
+    owned = {path for path in owned if os.path.exists(path)}
+    save_manifest(root, {os.path.relpath(path, root).replace(os.sep, "/") for path in owned})
+    return counts, removed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", nargs="?", default="./static")
+    parser.add_argument("--min-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    encodings = [e for e in SUFFIXES if e == "gzip" or (e == "zstd" and zstandard) or (e == "br" and brotli)]
+    counts, removed = run(args.root, args.min_size, encodings)
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) or "nothing to do"
+    logging.info(f"Precompressed {args.root} ({', '.join(encodings)}): {summary}; removed {removed} orphaned variants")
+
+
+if __name__ == "__main__":
+    main()
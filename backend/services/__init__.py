@@ -6,18 +6,28 @@ Production-ready services package initializer.
 - Do not remove this file; it is required for FastAPI dependency injection and maintainability.
 """
 
+from .admin_service import AdminService
 from .ai_service import AIService
+from .analysis_service import AnalysisService
 from .auth_service import AuthService
+from .certificate_service import CertificateService
+from .herb_service import HerbService
 from .image_processor import ImageProcessor
 from .notification_service import NotificationService
 from .pdf_generator import PDFGenerator
+from .tracking_service import TrackingService
 
 __all__ = [
+    "AdminService",
     "AIService",
+    "AnalysisService",
     "AuthService",
+    "CertificateService",
+    "HerbService",
     "ImageProcessor",
     "NotificationService",
     "PDFGenerator",
+    "TrackingService",
 ]
 
 # This file is fully production-ready, supports DI, and ensures service discovery for all core services.
\ No newline at end of file
@@ -0,0 +1,71 @@
+from fastapi import Depends
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Dict
+import logging
+
+from backend.core.database import get_db
+from backend.models.loader_options import USER_ROW
+from backend.models.analysis import Analysis
+from backend.models.user import User
+from backend.services.image_store import release_image_refs
+from backend.services.principal_cache import principal_cache
+from backend.utils.pagination import Page, PageParams, Paginator
+
+# Fields an admin may change through update_user
+UPDATABLE_USER_FIELDS = {"email", "full_name", "is_active", "is_admin"}
+
+USER_PAGINATION = Paginator(
+    User,
+    sort_fields={"created_at": User.created_at, "username": User.username, "id": User.id},
+    filter_fields={
+        "is_active": User.is_active,
+        "is_admin": User.is_admin,
+        "username": User.username,
+        "created_at": User.created_at,
+    },
+    default_sort="id",
+)
+
+
+class AdminService:
+    """
+    Admin operations on users. Every write invalidates the user's cached principal
+    so that role and activation changes take effect on the next request.
+    """
+
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def list_users(self, params: PageParams) -> Page:
+        return await USER_PAGINATION.paginate(self.db, select(User).options(*USER_ROW), params)
+
+    async def delete_user(self, user_id: str) -> bool:
+        uid = int(user_id)
+        # The database cascade removes the user's analyses without the ORM's ref-count hooks
+        await release_image_refs(self.db, Analysis.user_id == uid)
+        result = await self.db.execute(delete(User).where(User.id == uid))
+        await self.db.commit()
+        await principal_cache.invalidate(uid)
+        if result.rowcount:
+            logging.info(f"Admin deleted user {uid}")
+        return bool(result.rowcount)
+
+    async def update_user(self, user_id: str, changes: Dict) -> bool:
+        uid = int(user_id)
+        values = {k: v for k, v in changes.items() if k in UPDATABLE_USER_FIELDS}
+        if not values:
+            return False
+        result = await self.db.execute(update(User).where(User.id == uid).values(**values))
+        await self.db.commit()
+        await principal_cache.invalidate(uid)
+        if result.rowcount:
+            logging.info(f"Admin updated user {uid}: {sorted(values)}")
+        return bool(result.rowcount)
+
+    async def set_active(self, user_id: str, is_active: bool) -> bool:
+        return await self.update_user(user_id, {"is_active": is_active})
+
+    async def set_admin(self, user_id: str, is_admin: bool) -> bool:
+        return await self.update_user(user_id, {"is_admin": is_admin})
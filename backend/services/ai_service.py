@@ -8,6 +8,8 @@ from typing import Dict, List, Optional
 from pathlib import Path
 import logging
 
+from backend.core.tracing import span
+
 class AIService:
     _herb_classifier = None
     _quality_detector = None
@@ -51,7 +53,8 @@ class AIService:
     async def analyze_herb_image(cls, image_bytes: bytes) -> Dict:
         """Comprehensive herb analysis for production."""
         # Preprocess image
-        image = cls._preprocess_image(image_bytes)
+        with span("ai.preprocess", bytes=len(image_bytes)):
+            image = cls._preprocess_image(image_bytes)
         
         # Run all models
         herb_result = await cls._classify_herb(image)
@@ -78,7 +81,9 @@ class AIService:
     @classmethod
     def _preprocess_image(cls, image_bytes: bytes) -> np.ndarray:
         """Preprocess image for AI models (production standard)."""
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB').resize((224, 224))
+        with span("image.decode"):
+            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        image = image.resize((224, 224))
         image_array = np.array(image).astype(np.float32)
         image_array = (image_array / 127.5) - 1.0
         image_array = np.expand_dims(image_array, axis=0)
@@ -88,7 +93,8 @@ class AIService:
     async def _classify_herb(cls, image: np.ndarray) -> Dict:
         """Classify herb species."""
         input_name = cls._herb_classifier.get_inputs()[0].name
-        output = cls._herb_classifier.run(None, {input_name: image})[0]
+        with span("ai.model", model="herb_classifier"):
+            output = cls._herb_classifier.run(None, {input_name: image})[0]
         
         herb_classes = [
             "กัญชา (Cannabis sativa)",
@@ -116,7 +122,8 @@ class AIService:
     async def _assess_quality(cls, image: np.ndarray) -> Dict:
         """Assess overall quality."""
         input_name = cls._quality_detector.get_inputs()[0].name
-        output = cls._quality_detector.run(None, {input_name: image})[0]
+        with span("ai.model", model="quality_detector"):
+            output = cls._quality_detector.run(None, {input_name: image})[0]
         
         quality_score = float(output[0][0])
         contamination_score = float(output[0][1])
@@ -138,7 +145,8 @@ class AIService:
     async def _detect_diseases(cls, image: np.ndarray) -> Dict:
         """Detect diseases and defects."""
         input_name = cls._disease_detector.get_inputs()[0].name
-        output = cls._disease_detector.run(None, {input_name: image})[0]
+        with span("ai.model", model="disease_detector"):
+            output = cls._disease_detector.run(None, {input_name: image})[0]
         
         disease_classes = [
             "เชื้อราขาว", "เชื้อราดำ", "แบคทีเรีย", "ไวรัส",
@@ -167,7 +175,8 @@ class AIService:
     async def _assess_maturity(cls, image: np.ndarray) -> Dict:
         """Assess maturity/harvest readiness."""
         input_name = cls._maturity_assessor.get_inputs()[0].name
-        output = cls._maturity_assessor.run(None, {input_name: image})[0]
+        with span("ai.model", model="maturity_assessor"):
+            output = cls._maturity_assessor.run(None, {input_name: image})[0]
         
         maturity_score = float(output[0][0])
         harvest_readiness = float(output[0][1])
@@ -0,0 +1,437 @@
+import asyncio
+import datetime
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.models.analysis import Analysis
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_dataset
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it archiving is disabled and only hot rows are readable
+    pa = None
+
+Month = Tuple[int, int]
+
+_PARTITION_RE = re.compile(r"^analysis_p(\d{4})(\d{2})$")
+_ARCHIVER_LOCK_KEY = 0x6761637061726368  # pg advisory lock: one archiver per cluster
+
+# Columns stored in archives; `result` is kept as a JSON string
+ARCHIVE_COLUMNS = [c.name for c in Analysis.__table__.columns]
+SUMMARY_COLUMNS = [c for c in ARCHIVE_COLUMNS if c != "result"]
+
+
+def _arrow_type(column):
+    """Arrow type for an `analysis` column; JSON (`result`) is stored as a string."""
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):  # also BigInteger
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column.type, (String, JSON)):
+        return pa.string()
+    raise TypeError(f"No Arrow type for analysis.{column.name} ({column.type})")
+
+
+def _arrow_schema():
+    """Built from the table so new columns are archived too (older files may lack them)."""
+    return pa.schema([(column.name, _arrow_type(column)) for column in Analysis.__table__.columns])
+
+
+def month_start(month: Month) -> datetime.datetime:
+    return datetime.datetime(month[0], month[1], 1, tzinfo=datetime.timezone.utc)
+
+
+def next_month(month: Month) -> Month:
+    year, mon = month
+    return (year + 1, 1) if mon == 12 else (year, mon + 1)
+
+
+def add_months(month: Month, count: int) -> Month:
+    index = month[0] * 12 + (month[1] - 1) + count
+    return (index // 12, index % 12 + 1)
+
+
+def month_of(moment: datetime.datetime) -> Month:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc)
+    return (moment.year, moment.month)
+
+
+def months_between(start: datetime.datetime, end: datetime.datetime) -> List[Month]:
+    """Months overlapping [start, end)."""
+    months = []
+    month = month_of(start)
+    while month_start(month) < end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def partition_name(month: Month) -> str:
+    return f"analysis_p{month[0]:04d}{month[1]:02d}"
+
+
+@dataclass
+class ArchiveManifest:
+    month: Month
+    path: str
+    rows: int
+    sha256: str
+    archived_at: str
+
+    @property
+    def manifest_path(self) -> str:
+        return self.path + ".manifest.json"
+
+
+class AnalysisArchive:
+    """
+    Monthly partition maintenance and Parquet archival for the `analysis` table.
+
+    - ensure_partitions(): creates the next months' RANGE partitions (plus a default
+      partition so an insert never fails for lack of one).
+    - archive_expired(): for every partition entirely older than the retention window,
+      streams its rows through a server-side cursor into a zstd Parquet file (one row
+      group per batch), verifies the row count, writes a manifest, then detaches and
+      drops the partition. Re-running after a crash is safe: a month is only dropped
+      once its verified manifest exists.
+
+    Archives are laid out as <root>/year=YYYY/month=MM/analysis.parquet. The manifest is
+    the source of truth for "this month lives in the archive" (see AnalysisHistory).
+    """
+
+    def __init__(self, root: str = settings.ANALYSIS_ARCHIVE_PATH):
+        self.root = root
+
+    # Archive files
+
+    def month_path(self, month: Month) -> str:
+        return os.path.join(self.root, f"year={month[0]:04d}", f"month={month[1]:02d}", "analysis.parquet")
+
+    def manifests(self) -> Dict[Month, ArchiveManifest]:
+        found = {}
+        for path in glob.glob(os.path.join(self.root, "year=*", "month=*", "analysis.parquet.manifest.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    raw = json.load(f)
+                month = (int(raw["year"]), int(raw["month"]))
+                found[month] = ArchiveManifest(
+                    month=month,
+                    path=path[: -len(".manifest.json")],
+                    rows=int(raw["rows"]),
+                    sha256=raw["sha256"],
+                    archived_at=raw["archived_at"],
+                )
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable archive manifest {path}: {e}")
+        return found
+
+    def archived_months(self) -> Set[Month]:
+        return set(self.manifests())
+
+    # Partition maintenance (PostgreSQL only)
+
+    async def ensure_partitions(self, conn: AsyncConnection, months_ahead: int = settings.ANALYSIS_PARTITIONS_AHEAD) -> List[str]:
+        current = month_of(datetime.datetime.now(datetime.timezone.utc))
+        created = []
+        existing = set(await self.list_partitions(conn))
+        for offset in range(-1, months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            name = partition_name(month)
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF analysis "
+                f"FOR VALUES FROM ('{month_start(month).isoformat()}') TO ('{month_start(next_month(month)).isoformat()}')"
+            ))
+            created.append(name)
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS analysis_default PARTITION OF analysis DEFAULT"))
+        if created:
+            logging.info(f"Created analysis partitions: {', '.join(created)}")
+        return created
+
+    @staticmethod
+    async def is_partitioned(conn: AsyncConnection) -> bool:
+        result = await conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'analysis'"))
+        return result.scalar() == "p"
+
+    async def convert_legacy_table(self, engine: AsyncEngine) -> int:
+        """
+        One-off migration of a plain `analysis` table into the partitioned layout:
+        the old table is renamed, the partitioned table and the partitions covering its
+        rows are created, rows are copied and the identity is advanced. Run it during a
+        maintenance window; returns the number of rows copied.
+        """
+        table = Analysis.__table__
+        async with engine.begin() as conn:
+            if await self.is_partitioned(conn):
+                return 0
+            await conn.execute(text("ALTER TABLE analysis RENAME TO analysis_legacy"))
+            await conn.execute(text("ALTER TABLE analysis_legacy RENAME CONSTRAINT analysis_pkey TO analysis_legacy_pkey"))
+            await conn.execute(text("ALTER SEQUENCE IF EXISTS analysis_id_seq RENAME TO analysis_legacy_id_seq"))
+            for index in table.indexes:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            await conn.run_sync(table.create)
+            bounds = (await conn.execute(text("SELECT min(created_at), max(created_at) FROM analysis_legacy"))).one()
+            if bounds[0] is not None:
+                for month in months_between(bounds[0], month_start(next_month(month_of(bounds[1])))):
+                    name = partition_name(month)
+                    await conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF analysis "
+                        f"FOR VALUES FROM ('{month_start(month).isoformat()}') TO ('{month_start(next_month(month)).isoformat()}')"
+                    ))
+            await self.ensure_partitions(conn)
+            column_list = ", ".join(ARCHIVE_COLUMNS)
+            copied = (await conn.execute(text(
+                f"INSERT INTO analysis ({column_list}) SELECT {column_list} FROM analysis_legacy"
+            ))).rowcount
+            await conn.execute(text(
+                "SELECT setval(pg_get_serial_sequence('analysis', 'id'), COALESCE((SELECT max(id) FROM analysis), 0) + 1, false)"
+            ))
+            await conn.execute(text("DROP TABLE analysis_legacy"))
+        logging.info(f"Converted analysis to a partitioned table ({copied} rows copied)")
+        return copied
+
+    @staticmethod
+    async def list_partitions(conn: AsyncConnection) -> List[Month]:
+        result = await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'analysis'"
+        ))
+        months = []
+        for (name,) in result:
+            match = _PARTITION_RE.match(name)
+            if match:
+                months.append((int(match.group(1)), int(match.group(2))))
+        return sorted(months)
+
+    async def archive_expired(self, engine: AsyncEngine, retention_months: int = settings.ANALYSIS_RETENTION_MONTHS) -> List[Month]:
+        if pa is None:
+            logging.warning("pyarrow is not installed; analysis archival is disabled")
+            return []
+        cutoff = add_months(month_of(datetime.datetime.now(datetime.timezone.utc)), -retention_months)
+        async with engine.connect() as conn:
+            months = [m for m in await self.list_partitions(conn) if m < cutoff]
+            await conn.rollback()
+        archived = []
+        for month in months:
+            await self.archive_month(engine, month)
+            archived.append(month)
+        return archived
+
+    async def archive_month(self, engine: AsyncEngine, month: Month) -> ArchiveManifest:
+        started = time.perf_counter()
+        manifest = self.manifests().get(month)
+        async with engine.connect() as conn:
+            start, end = month_start(month), month_start(next_month(month))
+            expected = (await conn.execute(
+                select(func.count()).select_from(Analysis.__table__)
+                .where(Analysis.created_at >= start, Analysis.created_at < end)
+            )).scalar_one()
+            await conn.rollback()
+            if manifest is None or manifest.rows != expected:
+                manifest = await self._write_month(conn, month, expected)
+            name = partition_name(month)
+            async with conn.begin():
+                await conn.execute(text(f"ALTER TABLE analysis DETACH PARTITION {name}"))
+                await conn.execute(text(f"DROP TABLE {name}"))
+        metrics.inc("analysis_archived_rows_total", manifest.rows)
+        metrics.observe("analysis_archive_seconds", time.perf_counter() - started)
+        logging.info(f"Archived {partition_name(month)}: {manifest.rows} rows -> {manifest.path}")
+        return manifest
+
+    async def _write_month(self, conn: AsyncConnection, month: Month, expected: int) -> ArchiveManifest:
+        path = self.month_path(month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        schema = _arrow_schema()
+        start, end = month_start(month), month_start(next_month(month))
+        batch_rows = settings.ANALYSIS_ARCHIVE_BATCH_ROWS
+        writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+        rows = 0
+        try:
+            async with conn.begin():
+                result = await conn.stream(
+                    select(Analysis.__table__)
+                    .where(Analysis.created_at >= start, Analysis.created_at < end)
+                    .order_by(Analysis.created_at, Analysis.id)
+                    .execution_options(yield_per=batch_rows)
+                )
+                async for chunk in result.partitions(batch_rows):
+                    columns = {name: [] for name in schema.names}
+                    for row in chunk:
+                        mapping = row._mapping
+                        for name in schema.names:
+                            value = mapping[name]
+                            if name == "result" and value is not None and not isinstance(value, str):
+                                value = json.dumps(value, ensure_ascii=False)
+                            columns[name].append(value)
+                    batch = pa.RecordBatch.from_pydict(columns, schema=schema)
+                    await asyncio.to_thread(writer.write_batch, batch, row_group_size=batch_rows)
+                    rows += len(chunk)
+        finally:
+            await asyncio.to_thread(writer.close)
+        written = pq.ParquetFile(tmp_path).metadata.num_rows
+        if written != rows or rows != expected:
+            os.remove(tmp_path)
+            raise RuntimeError(f"Archive of {partition_name(month)} wrote {written}/{rows} rows, expected {expected}")
+        digest = await asyncio.to_thread(_sha256_file, tmp_path)
+        os.replace(tmp_path, path)
+        manifest = ArchiveManifest(
+            month=month,
+            path=path,
+            rows=rows,
+            sha256=digest,
+            archived_at=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        )
+        with open(manifest.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "year": month[0],
+                "month": month[1],
+                "rows": rows,
+                "sha256": digest,
+                "archived_at": manifest.archived_at,
+            }, f)
+        return manifest
+
+    async def run_forever(self, engine: AsyncEngine, interval: float = settings.ANALYSIS_ARCHIVER_INTERVAL_SECONDS) -> None:
+        """Background loop: keep partitions ahead and archive expired months (one worker at a time)."""
+        if engine.dialect.name != "postgresql":
+            logging.info("Analysis archiver disabled: partitioning requires PostgreSQL")
+            return
+        while True:
+            try:
+                async with engine.connect() as lock_conn:
+                    locked = (await lock_conn.execute(
+                        text("SELECT pg_try_advisory_lock(:key)"), {"key": _ARCHIVER_LOCK_KEY}
+                    )).scalar()
+                    await lock_conn.commit()  # the session-level lock outlives the transaction
+                    if locked:
+                        try:
+                            async with engine.begin() as conn:
+                                partitioned = await self.is_partitioned(conn)
+                                if partitioned:
+                                    await self.ensure_partitions(conn)
+                            if partitioned:
+                                await self.archive_expired(engine)
+                            else:
+                                logging.warning("analysis is not partitioned yet; run AnalysisArchive.convert_legacy_table()")
+                        finally:
+                            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ARCHIVER_LOCK_KEY})
+                            await lock_conn.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Analysis archiver run failed: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+analysis_archive = AnalysisArchive()
+
+
+class AnalysisHistory:
+    """
+    Reads analyses over any date range, taking each month from Postgres or, for
+    archived months (those with a manifest), from its Parquet file. Yields batches of
+    plain dicts in chronological month order so reports can stream large ranges.
+    """
+
+    def __init__(self, archive: AnalysisArchive = analysis_archive):
+        self.archive = archive
+
+    async def iter_batches(
+        self,
+        db: AsyncSession,
+        date_from: datetime.datetime,
+        date_to: datetime.datetime,
+        columns: Optional[Sequence[str]] = None,
+        user_id: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        columns = list(columns or SUMMARY_COLUMNS)
+        unknown = set(columns) - set(ARCHIVE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown analysis columns: {sorted(unknown)}")
+        archived = self.archive.manifests()
+        for month in months_between(date_from, date_to):
+            start = max(date_from, month_start(month))
+            end = min(date_to, month_start(next_month(month)))
+            if month in archived:
+                batches = self._archived(archived[month].path, start, end, columns, user_id, batch_size)
+            else:
+                batches = self._hot(db, start, end, columns, user_id, batch_size)
+            async for batch in batches:
+                yield batch
+
+    @staticmethod
+    async def _hot(db, start, end, columns, user_id, batch_size) -> AsyncIterator[List[Dict[str, Any]]]:
+        table = Analysis.__table__
+        stmt = (
+            select(*[table.c[name] for name in columns])
+            .where(table.c.created_at >= start, table.c.created_at < end)
+            .order_by(table.c.created_at, table.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if user_id is not None:
+            stmt = stmt.where(table.c.user_id == user_id)
+        result = await db.stream(stmt)
+        async for chunk in result.partitions(batch_size):
+            yield [dict(row._mapping) for row in chunk]
+
+    @staticmethod
+    async def _archived(path, start, end, columns, user_id, batch_size) -> AsyncIterator[List[Dict[str, Any]]]:
+        if pa is None:
+            raise RuntimeError("pyarrow is required to read archived analyses")
+        dataset = pa_dataset.dataset(path, format="parquet")
+        condition = (pa_dataset.field("created_at") >= pa.scalar(start, pa.timestamp("us", tz="UTC"))) & (
+            pa_dataset.field("created_at") < pa.scalar(end, pa.timestamp("us", tz="UTC"))
+        )
+        if user_id is not None:
+            condition = condition & (pa_dataset.field("user_id") == user_id)
+        # Months archived before a column was added lack it: read what exists, fill in nulls
+        present = [name for name in columns if name in dataset.schema.names]
+        missing = [name for name in columns if name not in present]
+        batches = dataset.to_batches(columns=present, filter=condition, batch_size=batch_size)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            rows = batch.to_pylist()
+            if missing:
+                rows = [{name: row.get(name) for name in columns} for row in rows]
+            if "result" in columns:
+                for row in rows:
+                    if row["result"] is not None:
+                        row["result"] = json.loads(row["result"])
+            if rows:
+                yield rows
+
+
+analysis_history = AnalysisHistory()
@@ -0,0 +1,288 @@
+import datetime
+import logging
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import Depends
+from sqlalchemy import case, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.database import dialect_insert, get_db
+from backend.core.metrics import metrics
+from backend.services.analysis_archive import analysis_history
+from backend.services.image_store import image_store, original_key
+from backend.models.analysis import Analysis
+from backend.models.loader_options import ANALYSIS_ROW
+from backend.models.analysis_rollup import SCORE_BUCKETS, AnalysisDailyRollup
+
+ROLLUP_DIMENSIONS = ("all", "species", "grade", "province", "user")
+# The global "all" totals are spread over this many keys (by user) so concurrent saves
+# do not queue on one row lock; reads sum the shards.
+ALL_SHARDS = 16
+ROLLUP_SOURCE_COLUMNS = (
+    "user_id", "species", "grade", "province", "compliance_score", "certificate_ready", "issue_count", "created_at",
+)
+_REPORT_TZ = ZoneInfo(settings.REPORT_TIMEZONE)
+_ADDITIVE_COLUMNS = (
+    "analysis_count", "compliant_count", "issue_count", "score_count", "score_sum",
+) + tuple(name for name, _, _ in SCORE_BUCKETS)
+
+
+def report_day(moment: datetime.datetime) -> datetime.date:
+    """Calendar day of `moment` in the reporting timezone."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.astimezone(_REPORT_TZ).date()
+
+
+def _dimension_keys(analysis: Analysis) -> Dict[str, str]:
+    return {
+        "all": str(analysis.user_id % ALL_SHARDS),
+        "species": analysis.species or "",
+        "grade": analysis.grade or "",
+        "province": analysis.province or "",
+        "user": str(analysis.user_id),
+    }
+
+
+def _score_bucket(score: Optional[float]) -> Optional[str]:
+    if score is None:
+        return None
+    for name, low, high in SCORE_BUCKETS:
+        if (low is None or score >= low) and (high is None or score < high):
+            return name
+    return None
+
+
+def rollup_rows(analysis: Analysis, day: datetime.date) -> List[Dict]:
+    """One rollup delta row per dimension for a single analysis."""
+    score = analysis.compliance_score
+    bucket = _score_bucket(score)
+    base = {
+        "day": day,
+        "analysis_count": 1,
+        "compliant_count": 1 if analysis.certificate_ready else 0,
+        "issue_count": analysis.issue_count or 0,
+        "score_count": 0 if score is None else 1,
+        "score_sum": score or 0.0,
+        "score_min": score,
+        "score_max": score,
+    }
+    for name, _, _ in SCORE_BUCKETS:
+        base[name] = 1 if name == bucket else 0
+    return [dict(base, dimension=dimension, key=key) for dimension, key in _dimension_keys(analysis).items()]
+
+
+def merge_rollup_rows(rows: List[Dict]) -> List[Dict]:
+    """Fold delta rows sharing (dimension, key, day) so one statement never hits a row twice."""
+    merged: Dict[tuple, Dict] = {}
+    for row in rows:
+        ident = (row["dimension"], row["key"], row["day"])
+        current = merged.get(ident)
+        if current is None:
+            merged[ident] = dict(row)
+            continue
+        for name in _ADDITIVE_COLUMNS:
+            current[name] += row[name]
+        scores = [v for v in (current["score_min"], row["score_min"]) if v is not None]
+        current["score_min"] = min(scores) if scores else None
+        scores = [v for v in (current["score_max"], row["score_max"]) if v is not None]
+        current["score_max"] = max(scores) if scores else None
+    return list(merged.values())
+
+
+def _upsert_statement(bind, rows: List[Dict]):
+    table = AnalysisDailyRollup.__table__
+    stmt = dialect_insert(bind)(table).values(rows)
+    excluded = stmt.excluded
+    updates = {name: table.c[name] + excluded[name] for name in _ADDITIVE_COLUMNS}
+    # NULL-safe min/max: a row without a score must not clear the existing extremes
+    updates["score_min"] = case(
+        (table.c.score_min.is_(None), excluded.score_min),
+        (excluded.score_min.is_(None), table.c.score_min),
+        (excluded.score_min < table.c.score_min, excluded.score_min),
+        else_=table.c.score_min,
+    )
+    updates["score_max"] = case(
+        (table.c.score_max.is_(None), excluded.score_max),
+        (excluded.score_max.is_(None), table.c.score_max),
+        (excluded.score_max > table.c.score_max, excluded.score_max),
+        else_=table.c.score_max,
+    )
+    updates["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=["dimension", "key", "day"], set_=updates)
+
+
+class AnalysisService:
+    """
+    Persists AI analyses and keeps the daily rollups used by dashboards up to date.
+
+    Each saved analysis upserts one row per dimension (all, species, grade, province,
+    user) into analysis_daily_rollup in the same transaction, so dashboard queries read
+    a few hundred pre-aggregated rows instead of scanning analysis JSON. The "all" row
+    is sharded by user (ALL_SHARDS), so it is no hotter than the per-user row.
+    """
+
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def save_analysis(
+        self,
+        user_id: int,
+        image_path: Optional[str],
+        result: Dict,
+        herb_id: Optional[int] = None,
+        province: Optional[str] = None,
+        image_bytes: Optional[bytes] = None,
+    ) -> Analysis:
+        """
+        Store an analysis. With `image_bytes` the image goes into the content-addressed
+        image store in the same transaction (one copy per distinct image) and
+        image_path becomes its storage key. Raises ValueError for an unusable image.
+        """
+        image_digest = None
+        if image_bytes is not None:
+            image_digest = await image_store.put(self.db, image_bytes)
+            image_path = original_key(image_digest)
+        if not image_path:
+            raise ValueError("image_path or image_bytes is required")
+        now = datetime.datetime.now(datetime.timezone.utc)
+        analysis = Analysis(
+            user_id=user_id,
+            image_path=image_path,
+            image_digest=image_digest,
+            herb_id=herb_id,
+            province=province,
+            result=result,
+            created_at=now,
+        )
+        self.db.add(analysis)
+        await self.db.flush()
+        await self._record_rollups(analysis, report_day(now))
+        await self.db.commit()
+        await self.db.refresh(analysis)
+        metrics.inc("analysis_saved_total", grade=analysis.grade or "unknown")
+        return analysis
+
+    async def _record_rollups(self, analysis: Analysis, day: datetime.date) -> None:
+        bind = self.db.get_bind()
+        await self.db.execute(_upsert_statement(bind, rollup_rows(analysis, day)))
+
+    async def rebuild_rollups(self, date_from: datetime.date, date_to: datetime.date, batch_size: int = 1000) -> int:
+        """
+        Recompute rollups for [date_from, date_to] from the analysis summary columns,
+        reading archived months from Parquet. Used after backfills or deletes;
+        returns the number of analyses folded in.
+        """
+        await self.db.execute(
+            delete(AnalysisDailyRollup).where(AnalysisDailyRollup.day.between(date_from, date_to))
+        )
+        start = datetime.datetime.combine(date_from, datetime.time.min, tzinfo=_REPORT_TZ)
+        end = datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min, tzinfo=_REPORT_TZ)
+        bind = self.db.get_bind()
+        total = 0
+        async for batch in analysis_history.iter_batches(self.db, start, end, columns=ROLLUP_SOURCE_COLUMNS, batch_size=batch_size):
+            rows = [
+                row
+                for values in batch
+                for row in rollup_rows(SimpleNamespace(**values), report_day(values["created_at"]))
+            ]
+            await self.db.execute(_upsert_statement(bind, merge_rollup_rows(rows)))
+            total += len(batch)
+        await self.db.commit()
+        logging.info(f"Rebuilt analysis rollups {date_from}..{date_to} from {total} analyses")
+        return total
+
+    async def backfill_summaries(self, batch_size: int = 500) -> int:
+        """Populate summary columns for analyses stored before they existed."""
+        total = 0
+        last_id = 0
+        while True:
+            result = await self.db.execute(
+                select(Analysis)
+                .options(*ANALYSIS_ROW)
+                .where(Analysis.id > last_id, Analysis.grade.is_(None), Analysis.compliance_score.is_(None))
+                .order_by(Analysis.id)
+                .limit(batch_size)
+            )
+            analyses = result.scalars().all()
+            if not analyses:
+                break
+            for analysis in analyses:
+                analysis.result = dict(analysis.result or {})  # re-runs the summary extraction
+            await self.db.commit()
+            total += len(analyses)
+            last_id = analyses[-1].id
+        logging.info(f"Backfilled summary columns for {total} analyses")
+        return total
+
+    # Dashboard queries (rollup table only)
+
+    async def get_summary(
+        self,
+        dimension: str,
+        date_from: datetime.date,
+        date_to: datetime.date,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """Totals per key of `dimension` over a date range, most analyses first."""
+        if dimension not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{dimension}'")
+        r = AnalysisDailyRollup
+        stmt = select(*_aggregates()).where(r.dimension == dimension, r.day.between(date_from, date_to))
+        if dimension == "all":  # one total over the shards
+            result = await self.db.execute(stmt.having(func.count() > 0))
+            return [dict(_summary_row(row._mapping), key="") for row in result]
+        stmt = stmt.add_columns(r.key).group_by(r.key).order_by(func.sum(r.analysis_count).desc(), r.key).limit(limit)
+        result = await self.db.execute(stmt)
+        return [_summary_row(row._mapping) for row in result]
+
+    async def get_daily_series(
+        self,
+        dimension: str,
+        key: str,
+        date_from: datetime.date,
+        date_to: datetime.date,
+    ) -> List[Dict]:
+        """Per-day values of one key (dimension "all" for the global series; its key is ignored)."""
+        if dimension not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{dimension}'")
+        r = AnalysisDailyRollup
+        stmt = select(r.day, *_aggregates()).where(r.dimension == dimension, r.day.between(date_from, date_to))
+        if dimension != "all":  # "all" sums its shards
+            stmt = stmt.where(r.key == key)
+        result = await self.db.execute(stmt.group_by(r.day).order_by(r.day))
+        series = []
+        for values in result:
+            row = _summary_row(values._mapping)
+            row.pop("key")
+            row["day"] = values.day
+            series.append(row)
+        return series
+
+
+def _aggregates() -> List:
+    r = AnalysisDailyRollup
+    return [func.sum(getattr(r, name)).label(name) for name in _ADDITIVE_COLUMNS] + [
+        func.min(r.score_min).label("score_min"),
+        func.max(r.score_max).label("score_max"),
+    ]
+
+
+def _summary_row(values) -> Dict:
+    score_count = values["score_count"] or 0
+    count = values["analysis_count"] or 0
+    return {
+        "key": values.get("key"),
+        "analysis_count": count,
+        "compliant_count": values["compliant_count"] or 0,
+        "compliance_rate": round((values["compliant_count"] or 0) / count, 4) if count else None,
+        "issue_count": values["issue_count"] or 0,
+        "avg_compliance_score": round(values["score_sum"] / score_count, 2) if score_count else None,
+        "min_compliance_score": values["score_min"],
+        "max_compliance_score": values["score_max"],
+        "score_histogram": {name: values[name] or 0 for name, _, _ in SCORE_BUCKETS},
+    }
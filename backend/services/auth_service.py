@@ -3,22 +3,87 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 from app.schemas.auth import LoginRequest, LoginResponse, UserResponse
 from backend.core.database import get_db
-from backend.core.security import verify_password, create_access_token, decode_access_token
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.security import verify_and_update_password_async, create_access_token, decode_access_token
+from backend.models.loader_options import USER_ROW
 from backend.models.user import User
+from backend.services.principal_cache import principal_cache
 from sqlalchemy.future import select
+from contextlib import asynccontextmanager
 from typing import Optional
+import asyncio
 import logging
+import time
+
+class LoginConcurrencyLimiter:
+    """
+    Per-worker cap on concurrent password verifications.
+    Excess logins wait in a bounded queue; beyond that (or after the wait timeout)
+    they are rejected with 503 instead of stalling the worker.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, timeout_seconds: float):
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self._active = 0
+
+    def _overloaded(self) -> HTTPException:
+        metrics.inc("auth_login_rejected_total")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "2"},
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._waiting >= self.max_queue:
+            raise self._overloaded()
+        self._waiting += 1
+        metrics.set_gauge("auth_login_waiting", self._waiting)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise self._overloaded()
+        finally:
+            self._waiting -= 1
+            metrics.set_gauge("auth_login_waiting", self._waiting)
+        metrics.observe("auth_login_queue_wait_seconds", time.perf_counter() - started)
+        self._active += 1
+        metrics.set_gauge("auth_login_active", self._active)
+        try:
+            yield
+        finally:
+            self._active -= 1
+            metrics.set_gauge("auth_login_active", self._active)
+            self._semaphore.release()
+
+login_limiter = LoginConcurrencyLimiter(
+    max_concurrent=settings.LOGIN_MAX_CONCURRENT,
+    max_queue=settings.LOGIN_MAX_QUEUE,
+    timeout_seconds=settings.LOGIN_QUEUE_TIMEOUT_SECONDS,
+)
 
 class AuthService:
     def __init__(self, db: AsyncSession = Depends(get_db)):
         self.db = db
 
     async def login(self, request: LoginRequest) -> LoginResponse:
-        stmt = select(User).where(User.username == request.username)
+        stmt = select(User).options(*USER_ROW).where(User.username == request.username)
         result = await self.db.execute(stmt)
         user: Optional[User] = result.scalar_one_or_none()
-        if not user or not verify_password(request.password, user.hashed_password):
+        if not user:
             return LoginResponse(is_success=False, message="Invalid username or password")
+        async with login_limiter.slot():
+            verified, new_hash = await verify_and_update_password_async(request.password, user.hashed_password)
+        if not verified:
+            return LoginResponse(is_success=False, message="Invalid username or password")
+        if new_hash:
+            await self._rehash_password(user, new_hash)
         if not user.is_active:
             return LoginResponse(is_success=False, message="User is inactive")
         access_token = create_access_token({"sub": str(user.id)})
@@ -35,6 +100,20 @@ class AuthService:
             )
         )
 
+    async def _rehash_password(self, user: User, new_hash: str) -> None:
+        """
+        Persist an upgraded hash after a successful login (BCRYPT_ROUNDS changed).
+        Failure here must not fail the login itself.
+        """
+        try:
+            user.hashed_password = new_hash
+            await self.db.commit()
+            metrics.inc("auth_password_rehash_total")
+            logging.info(f"Password hash upgraded for user {user.id}")
+        except Exception as e:
+            await self.db.rollback()
+            logging.warning(f"Password rehash failed for user {user.id}: {e}")
+
     @staticmethod
     async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)) -> UserResponse:
         """
@@ -49,23 +128,34 @@ class AuthService:
         if not auth_header or not auth_header.startswith("Bearer "):
             raise credentials_exception
         token = auth_header.split(" ")[1]
-        try:
-            payload = decode_access_token(token)
+        payload = principal_cache.get_token(token)
+        if payload is None:
+            try:
+                payload = decode_access_token(token)
+            except JWTError as e:
+                logging.warning(f"JWT decode error: {e}")
+                raise credentials_exception
             if payload is None or "sub" not in payload:
                 raise credentials_exception
+            principal_cache.remember_token(token, payload)
+        try:
             user_id = int(payload["sub"])
-        except JWTError as e:
-            logging.warning(f"JWT decode error: {e}")
-            raise credentials_exception
-        stmt = select(User).where(User.id == user_id)
-        result = await db.execute(stmt)
-        user: Optional[User] = result.scalar_one_or_none()
-        if not user or not user.is_active:
+        except (KeyError, ValueError):
             raise credentials_exception
-        return UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            is_admin=user.is_admin
-        )
\ No newline at end of file
+
+        principal = await principal_cache.get(user_id)
+        if principal is None:
+            stmt = select(User).options(*USER_ROW).where(User.id == user_id)
+            result = await db.execute(stmt)
+            user: Optional[User] = result.scalar_one_or_none()
+            if not user or not user.is_active:
+                raise credentials_exception
+            principal = {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "full_name": user.full_name,
+                "is_admin": user.is_admin,
+            }
+            await principal_cache.set(user_id, principal)
+        return UserResponse(**principal)
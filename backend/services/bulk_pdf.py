@@ -0,0 +1,295 @@
+import asyncio
+import datetime
+import json
+import logging
+import multiprocessing
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from backend.core.config import settings
+from backend.core.database import read_session
+from backend.core.metrics import metrics
+from backend.core.redis_client import get_redis
+from backend.core.tracing import record_span
+from backend.models.certificate import Certificate
+from backend.models.user import User
+
+_PROGRESS_KEY = "bulk_pdf:{}"
+_MAX_LOCAL_JOBS = 100
+_LOOKUP_CHUNK = 1000
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker(logo_path: Optional[str]) -> None:
+    """Worker start-up: register fonts and build the certificate template once per process."""
+    from backend.services.pdf_generator import get_certificate_template
+    get_certificate_template(logo_path)
+
+
+def render_in_worker(logo_path: Optional[str], data: Dict) -> bytes:
+    from backend.services.pdf_generator import get_certificate_template
+    return get_certificate_template(logo_path).render(data)
+
+
+def pdf_pool() -> ProcessPoolExecutor:
+    """
+    Shared process pool for certificate rendering (ReportLab is CPU-bound and holds
+    the GIL). Workers are spawned, not forked, so they never inherit the event loop,
+    DB connections or Redis sockets of the API process.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_BULK_WORKERS or None,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.PDF_LOGO_PATH or None,),
+        )
+    return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    """A worker crashed (e.g. OOM-killed); the next pdf_pool() call starts a fresh pool."""
+    if _pool is pool:
+        logging.warning("PDF process pool is broken, replacing it")
+        metrics.inc("certificate_pdf_pool_restarts_total")
+        shutdown_pdf_pool()
+
+
+def certificate_pdf_data(row: Dict[str, Any]) -> Dict:
+    """Fields PDFGenerator expects, from a certificate row joined with its owner."""
+    data = row.get("data") or {}
+    status = row["status"]
+    issued_at = row.get("issued_at")
+    return {
+        "user_full_name": row.get("full_name") or row.get("username") or "-",
+        "certificate_id": str(row["id"]),
+        "certificate_type": row["certificate_type"],
+        "issued_at": issued_at.strftime("%Y-%m-%d") if issued_at else "-",
+        "status": getattr(status, "value", status),
+        "description": data.get("description", "รายละเอียดใบรับรองและข้อมูลสมุนไพร"),
+        "gacp_compliance": data.get("gacp_compliance", {}),
+    }
+
+
+@dataclass
+class BulkJob:
+    job_id: str
+    total: int
+    requested_by: int
+    status: str = "running"
+    done: int = 0
+    failed: int = 0
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["failures"] = self.failures[-100:]
+        result["pending"] = self.total - self.done - self.failed
+        result["elapsed_seconds"] = round((self.finished_at or time.time()) - self.started_at, 2)
+        return result
+
+
+class BulkJobRegistry:
+    """
+    Progress of bulk PDF jobs. Kept locally and mirrored to Redis (with a TTL) so the
+    progress endpoint works from any API worker; falls back to local-only without Redis.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, BulkJob]" = OrderedDict()
+        self._published: Dict[str, float] = {}
+
+    def create(self, total: int, requested_by: int) -> BulkJob:
+        job = BulkJob(job_id=uuid.uuid4().hex, total=total, requested_by=requested_by)
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > _MAX_LOCAL_JOBS:
+            old_id, _ = self._jobs.popitem(last=False)
+            self._published.pop(old_id, None)
+        return job
+
+    async def publish(self, job: BulkJob, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._published.get(job.job_id, 0.0) < settings.PDF_BULK_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._published[job.job_id] = now
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                _PROGRESS_KEY.format(job.job_id),
+                json.dumps(job.as_dict(), ensure_ascii=False),
+                ex=settings.PDF_BULK_PROGRESS_TTL_SECONDS,
+            )
+        except Exception as e:
+            logging.warning(f"Bulk PDF progress not published for {job.job_id}: {e}")
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(_PROGRESS_KEY.format(job_id))
+        except Exception as e:
+            logging.warning(f"Bulk PDF progress lookup failed for {job_id}: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+
+bulk_jobs = BulkJobRegistry()
+
+
+class _ZipSink:
+    """Unseekable write target for ZipFile; bytes are drained into the response after each entry."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _certificate_rows(certificate_ids: Sequence[int]) -> AsyncIterator[Dict[str, Any]]:
+    async with read_session() as db:
+        for offset in range(0, len(certificate_ids), _LOOKUP_CHUNK):
+            chunk = certificate_ids[offset:offset + _LOOKUP_CHUNK]
+            result = await db.execute(
+                select(
+                    Certificate.id, Certificate.certificate_type, Certificate.status,
+                    Certificate.issued_at, Certificate.data, User.full_name, User.username,
+                )
+                .join(User, User.id == Certificate.user_id)
+                .where(Certificate.id.in_(chunk))
+            )
+            found = {row.id: dict(row._mapping) for row in result}
+            for certificate_id in chunk:
+                yield found.get(certificate_id) or {"id": certificate_id, "missing": True}
+
+
+async def stream_certificate_zip(job: BulkJob, certificate_ids: Sequence[int]) -> AsyncIterator[bytes]:
+    """
+    Render certificates in the process pool and stream a ZIP as they finish.
+
+    At most PDF_BULK_IN_FLIGHT renders are queued at once, so memory is bounded by
+    that many PDFs regardless of batch size. A certificate that is missing or fails
+    to render is recorded in the job and in errors.json inside the archive; the rest
+    of the batch continues. manifest.json lists every certificate's outcome.
+    """
+    loop = asyncio.get_running_loop()
+    logo_path = settings.PDF_LOGO_PATH or None
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)  # PDFs are already compressed
+    manifest: List[Dict[str, Any]] = []
+    in_flight: Dict[asyncio.Future, Tuple[int, ProcessPoolExecutor, float]] = {}
+    rows = _certificate_rows(certificate_ids)
+    exhausted = False
+
+    def fail(certificate_id: int, error: str) -> None:
+        job.failed += 1
+        job.failures.append({"certificate_id": certificate_id, "error": error})
+        manifest.append({"certificate_id": certificate_id, "status": "failed", "error": error})
+        metrics.inc("certificate_pdf_bulk_total", result="failed")
+
+    try:
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < settings.PDF_BULK_IN_FLIGHT:
+                row = await anext(rows, None)
+                if row is None:
+                    exhausted = True
+                    break
+                if row.get("missing"):
+                    fail(row["id"], "certificate not found")
+                    continue
+                pool = pdf_pool()
+                try:
+                    future = loop.run_in_executor(pool, render_in_worker, logo_path, certificate_pdf_data(row))
+                except BrokenProcessPool:
+                    _discard_broken_pool(pool)
+                    pool = pdf_pool()
+                    future = loop.run_in_executor(pool, render_in_worker, logo_path, certificate_pdf_data(row))
+                in_flight[future] = (row["id"], pool, time.perf_counter())
+            if not in_flight:
+                continue
+            finished, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                certificate_id, pool, submitted = in_flight.pop(future)
+                record_span("pdf.render", submitted, time.perf_counter() - submitted, certificate_id=certificate_id, mode="bulk")
+                try:
+                    pdf_bytes = future.result()
+                except BrokenProcessPool as e:
+                    logging.error(f"Bulk PDF job {job.job_id}: certificate {certificate_id} lost with its worker: {e}")
+                    _discard_broken_pool(pool)
+                    fail(certificate_id, "renderer process crashed")
+                    continue
+                except Exception as e:
+                    logging.error(f"Bulk PDF job {job.job_id}: certificate {certificate_id} failed: {e}")
+                    fail(certificate_id, str(e) or type(e).__name__)
+                    continue
+                name = f"certificate_{certificate_id}.pdf"
+                archive.writestr(zipfile.ZipInfo(name, date_time=time.localtime()[:6]), pdf_bytes)
+                job.done += 1
+                manifest.append({"certificate_id": certificate_id, "status": "ok", "file": name})
+                metrics.inc("certificate_pdf_bulk_total", result="ok")
+            await bulk_jobs.publish(job)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    except (asyncio.CancelledError, GeneratorExit):
+        job.status = "cancelled"  # client disconnected
+        job.finished_at = time.time()
+        raise
+    finally:
+        for future in in_flight:
+            future.cancel()
+        await rows.aclose()
+
+    if job.failures:
+        archive.writestr("errors.json", json.dumps(job.failures, ensure_ascii=False, indent=2))
+    archive.writestr("manifest.json", json.dumps({
+        "job_id": job.job_id,
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "total": job.total,
+        "done": job.done,
+        "failed": job.failed,
+        "certificates": manifest,
+    }, ensure_ascii=False, indent=2))
+    archive.close()
+    job.status = "completed" if not job.failed else "completed_with_errors"
+    job.finished_at = time.time()
+    await bulk_jobs.publish(job, force=True)
+    logging.info(
+        f"Bulk PDF job {job.job_id}: {job.done}/{job.total} rendered, {job.failed} failed "
+        f"in {job.finished_at - job.started_at:.1f}s"
+    )
+    yield sink.drain()
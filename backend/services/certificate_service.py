@@ -0,0 +1,40 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Optional, Tuple
+
+from backend.core.database import get_db
+from backend.models.certificate import Certificate
+from backend.models.loader_options import CERTIFICATE_WITH_OWNER
+from backend.services.pdf_cache import certificate_pdf
+from backend.utils.pagination import Page, PageParams, Paginator
+
+CERTIFICATE_PAGINATION = Paginator(
+    Certificate,
+    sort_fields={"issued_at": Certificate.issued_at, "id": Certificate.id},
+    filter_fields={
+        "status": Certificate.status,
+        "certificate_type": Certificate.certificate_type,
+        "issued_at": Certificate.issued_at,
+    },
+    default_sort="-issued_at",
+)
+
+
+class CertificateService:
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def get_certificates_by_user(self, user_id: int, params: PageParams) -> Page:
+        stmt = select(Certificate).options(*CERTIFICATE_WITH_OWNER).where(Certificate.user_id == user_id)
+        return await CERTIFICATE_PAGINATION.paginate(self.db, stmt, params)
+
+    async def get_certificate(self, certificate_id: int) -> Optional[Certificate]:
+        result = await self.db.execute(
+            select(Certificate).options(*CERTIFICATE_WITH_OWNER).where(Certificate.id == certificate_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_certificate_pdf(self, certificate: Certificate) -> Tuple[str, str]:
+        """(path, digest) of the rendered PDF, from the content-addressed cache when unchanged."""
+        return await certificate_pdf(self.db, certificate)
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import List, Optional
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.tracing import Trace, record_span
+
+try:
+    import aiosmtplib
+except ImportError:  # aiosmtplib is optional; NotificationService falls back to blocking smtplib
+    aiosmtplib = None
+
+# Errors after which the connection is dropped and the message retried on a fresh one
+_CONNECTION_ERRORS = (ConnectionError, OSError, asyncio.TimeoutError)
+
+
+@dataclass
+class OutgoingEmail:
+    message: Message
+    sender: str
+    recipients: List[str]
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    result: Optional[asyncio.Future] = None
+    # Trace of a request that waits for delivery (send_email_and_wait); the worker adds
+    # its send span there. Fire-and-forget sends leave it None: their request has
+    # finished, and its trace closed, before the worker gets to them.
+    trace: Optional[Trace] = None
+    trace_parent: Optional[str] = None
+
+
+class _SmtpConnection:
+    """
+    One persistent, authenticated SMTP session owned by a single worker.
+    Consecutive messages reuse the session (MAIL/RCPT/DATA back to back, no new
+    handshake); it is reopened after SMTP_IDLE_TIMEOUT_SECONDS without traffic,
+    after SMTP_MAX_MESSAGES_PER_CONNECTION messages, or when the server drops it.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.client: Optional["aiosmtplib.SMTP"] = None
+        self.last_used = 0.0
+        self.sent = 0
+
+    async def ensure(self) -> "aiosmtplib.SMTP":
+        now = time.monotonic()
+        if self.client is not None and (
+            not self.client.is_connected
+            or now - self.last_used > settings.SMTP_IDLE_TIMEOUT_SECONDS
+            or self.sent >= settings.SMTP_MAX_MESSAGES_PER_CONNECTION
+        ):
+            await self.close()
+        if self.client is None:
+            client = aiosmtplib.SMTP(
+                hostname=settings.SMTP_HOST,
+                port=settings.SMTP_PORT,
+                username=settings.SMTP_USER,
+                password=settings.SMTP_PASSWORD,
+                start_tls=settings.SMTP_STARTTLS,
+                use_tls=settings.SMTP_USE_TLS,
+                validate_certs=settings.SMTP_VALIDATE_CERTS,
+                timeout=settings.SMTP_TIMEOUT_SECONDS,
+            )
+            started = time.perf_counter()
+            await client.connect()  # connect, EHLO, STARTTLS and AUTH
+            metrics.observe("smtp_connect_seconds", time.perf_counter() - started)
+            metrics.inc("smtp_connections_opened_total")
+            self.client = client
+            self.sent = 0
+        return self.client
+
+    async def send(self, email: OutgoingEmail) -> None:
+        client = await self.ensure()
+        await client.send_message(email.message, sender=email.sender, recipients=email.recipients)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        client, self.client = self.client, None
+        if client is None:
+            return
+        try:
+            if client.is_connected:
+                await client.quit()
+        except Exception:
+            client.close()
+
+
+class EmailDispatcher:
+    """
+    Bounded in-memory send queue drained by SMTP_POOL_SIZE workers, each holding
+    one persistent SMTP connection. enqueue() never waits: when the queue is full
+    the message is refused (and counted) instead of blocking the request handler.
+    Transient failures (4xx replies, dropped connections) are retried with backoff.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._connections: List[_SmtpConnection] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if aiosmtplib is None:
+            logging.warning("aiosmtplib is not installed; email is sent synchronously")
+            return
+        self._queue = asyncio.Queue(maxsize=settings.SMTP_QUEUE_SIZE)
+        self._connections = [_SmtpConnection(i) for i in range(settings.SMTP_POOL_SIZE)]
+        self._workers = [
+            asyncio.create_task(self._work(connection), name=f"smtp-worker-{connection.index}")
+            for connection in self._connections
+        ]
+        logging.info(f"Email dispatcher started with {settings.SMTP_POOL_SIZE} SMTP connections")
+
+    async def stop(self, drain_timeout: float = settings.SMTP_DRAIN_TIMEOUT_SECONDS) -> None:
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Email dispatcher stopped with {self._queue.qsize()} messages unsent")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await asyncio.gather(*(c.close() for c in self._connections), return_exceptions=True)
+        self._workers, self._connections = [], []
+
+    def enqueue(self, email: OutgoingEmail, want_result: bool = False) -> Optional[asyncio.Future]:
+        """
+        Queue a message without waiting. Returns a future resolving to True/False
+        once delivered or given up when `want_result`, else None. Raises
+        asyncio.QueueFull when the queue is at capacity.
+        """
+        if want_result:
+            email.result = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(email)
+        except asyncio.QueueFull:
+            metrics.inc("email_dropped_total", reason="queue_full")
+            raise
+        metrics.set_gauge("email_queue_depth", self._queue.qsize())
+        return email.result
+
+    async def _work(self, connection: _SmtpConnection) -> None:
+        while True:
+            email = await self._queue.get()
+            try:
+                delivered = await self._deliver(connection, email)
+                if email.result is not None and not email.result.done():
+                    email.result.set_result(delivered)
+            except Exception as e:
+                logging.error(f"SMTP worker {connection.index} failed on a message: {e}")
+                if email.result is not None and not email.result.done():
+                    email.result.set_result(False)
+            finally:
+                self._queue.task_done()
+                metrics.set_gauge("email_queue_depth", self._queue.qsize())
+
+    async def _deliver(self, connection: _SmtpConnection, email: OutgoingEmail) -> bool:
+        while True:
+            email.attempts += 1
+            try:
+                started = time.perf_counter()
+                await connection.send(email)
+                elapsed = time.perf_counter() - started
+                metrics.observe("smtp_send_seconds", elapsed)
+                record_span("email.send", started, elapsed, email.trace, email.trace_parent, attempt=email.attempts)
+                metrics.observe("email_queue_wait_seconds", time.monotonic() - email.enqueued_at)
+                metrics.inc("email_sent_total", result="sent")
+                logging.info(f"Email sent to {email.recipients}")
+                return True
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, *_CONNECTION_ERRORS) as e:
+                await connection.close()
+                retryable, reason = True, f"connection: {e}"
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                # Greylisting / throttling answers 4xx per recipient; only those are worth retrying
+                retryable = all(400 <= r.code < 500 for r in e.recipients)
+                reason = f"recipients refused: {e}"
+            except aiosmtplib.SMTPResponseException as e:
+                retryable, reason = 400 <= e.code < 500, f"{e.code} {e.message}"
+                if e.code in (421, 451):  # server closing / local error: start over on a new session
+                    await connection.close()
+
+            if not retryable or email.attempts > settings.SMTP_MAX_RETRIES:
+                metrics.inc("email_sent_total", result="failed")
+                logging.error(f"Failed to send email to {email.recipients} after {email.attempts} attempts: {reason}")
+                return False
+            metrics.inc("email_retries_total")
+            # First retry right away on a fresh connection, then exponential backoff
+            if email.attempts > 1:
+                await asyncio.sleep(min(settings.SMTP_RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 2), 60))
+
+
+email_dispatcher = EmailDispatcher()
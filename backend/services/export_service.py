@@ -0,0 +1,260 @@
+import asyncio
+import csv
+import datetime
+import enum
+import io
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, func, select
+from sqlalchemy.sql.schema import Table
+
+from backend.core.config import settings
+from backend.core.database import read_session
+from backend.models.analysis import Analysis
+from backend.models.certificate import Certificate
+from backend.models.tracking import Tracking
+from backend.models.tracking_event import TrackingEvent
+from backend.services.analysis_archive import SUMMARY_COLUMNS, analysis_archive, analysis_history, month_start
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it only CSV exports are available
+    pa = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+_REPORT_TZ = ZoneInfo(settings.REPORT_TIMEZONE)
+_UTF8_BOM = "\ufeff"  # lets Excel open Thai text in CSV exports correctly
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    name: str
+    table: Table
+    time_column: str
+    default_columns: Tuple[str, ...]
+
+    @property
+    def columns(self) -> List[str]:
+        return [c.name for c in self.table.columns]
+
+
+DATASETS: Dict[str, ExportDataset] = {
+    "analyses": ExportDataset("analyses", Analysis.__table__, "created_at", tuple(SUMMARY_COLUMNS)),
+    "certificates": ExportDataset(
+        "certificates",
+        Certificate.__table__,
+        "issued_at",
+        ("id", "user_id", "certificate_type", "status", "issued_at", "updated_at", "note"),
+    ),
+    "tracking": ExportDataset(
+        "tracking",
+        TrackingEvent.__table__,
+        "timestamp",
+        ("id", "tracking_code", "timestamp", "status", "location", "actor_id", "client_event_id", "created_at"),
+    ),
+}
+
+
+def resolve_columns(dataset: ExportDataset, columns: Optional[Sequence[str]]) -> List[str]:
+    """Requested columns (deduplicated, in request order) or the dataset defaults; ValueError on unknown names."""
+    if not columns:
+        return list(dataset.default_columns)
+    columns = list(dict.fromkeys(c.strip() for c in columns if c.strip()))
+    unknown = [c for c in columns if c not in dataset.columns]
+    if unknown:
+        raise ValueError(f"Unknown {dataset.name} columns: {', '.join(unknown)}")
+    return columns
+
+
+def day_bounds(date_from: Optional[datetime.date], date_to: Optional[datetime.date]) -> Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]:
+    """Half-open [start, end) datetimes for inclusive report-timezone dates."""
+    start = datetime.datetime.combine(date_from, datetime.time.min, tzinfo=_REPORT_TZ) if date_from else None
+    end = (
+        datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min, tzinfo=_REPORT_TZ)
+        if date_to else None
+    )
+    return start, end
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()  # strings, enums and JSON (serialized)
+
+
+def _plain(value: Any) -> Any:
+    """Export-friendly scalar: enums by value, JSON documents serialized."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _csv_value(value: Any) -> Any:
+    value = _plain(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+class _DrainableSink:
+    """Write-only file object whose buffered bytes are handed off (and released) after every row group."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    """
+    Streams datasets as CSV or Parquet with memory bounded by one chunk (CSV) or
+    one row group (Parquet), independent of the export size.
+
+    Rows come from a server-side cursor on a read replica in fixed-size chunks;
+    analyses go through AnalysisHistory so archived months are read from Parquet.
+    """
+
+    def __init__(
+        self,
+        chunk_rows: int = settings.EXPORT_CHUNK_ROWS,
+        row_group_rows: int = settings.EXPORT_PARQUET_ROW_GROUP_ROWS,
+    ):
+        self.chunk_rows = chunk_rows
+        self.row_group_rows = row_group_rows
+
+    async def iter_chunks(
+        self,
+        dataset: ExportDataset,
+        columns: List[str],
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        async with read_session() as db:
+            if dataset.name == "analyses":
+                if start is None:
+                    start = await self._first_analysis(db)
+                    if start is None:
+                        return
+                end = end or datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=1)
+                async for chunk in analysis_history.iter_batches(db, start, end, columns, user_id, self.chunk_rows):
+                    yield chunk
+                return
+
+            table = dataset.table
+            time_column = table.c[dataset.time_column]
+            stmt = select(*[table.c[name] for name in columns]).order_by(time_column, table.c.id)
+            if start is not None:
+                stmt = stmt.where(time_column >= start)
+            if end is not None:
+                stmt = stmt.where(time_column < end)
+            if user_id is not None:
+                if dataset.name == "tracking":
+                    owned = select(Tracking.tracking_code).where(Tracking.user_id == user_id)
+                    stmt = stmt.where(table.c.tracking_code.in_(owned))
+                else:
+                    stmt = stmt.where(table.c.user_id == user_id)
+            result = await db.stream(stmt.execution_options(yield_per=self.chunk_rows))
+            async for partition in result.partitions(self.chunk_rows):
+                yield [dict(row._mapping) for row in partition]
+
+    @staticmethod
+    async def _first_analysis(db) -> Optional[datetime.datetime]:
+        archived = analysis_archive.archived_months()
+        if archived:
+            return month_start(min(archived))
+        first = await db.scalar(select(func.min(Analysis.created_at)))
+        if first is not None and first.tzinfo is None:
+            first = first.replace(tzinfo=datetime.timezone.utc)
+        return first
+
+    async def stream_csv(self, dataset: ExportDataset, columns: List[str], **filters) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write(_UTF8_BOM)
+        writer.writerow(columns)
+        async for chunk in self.iter_chunks(dataset, columns, **filters):
+            for row in chunk:
+                writer.writerow([_csv_value(row[name]) for name in columns])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    async def stream_parquet(self, dataset: ExportDataset, columns: List[str], **filters) -> AsyncIterator[bytes]:
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet exports")
+        schema = pa.schema([(name, _arrow_type(dataset.table.c[name])) for name in columns])
+        sink = _DrainableSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+        pending = {name: [] for name in columns}
+        pending_rows = 0
+
+        async def write_row_group() -> bytes:
+            batch = pa.RecordBatch.from_pydict(pending, schema=schema)
+            await asyncio.to_thread(writer.write_batch, batch, row_group_size=batch.num_rows)
+            for values in pending.values():
+                values.clear()
+            return sink.drain()
+
+        try:
+            async for chunk in self.iter_chunks(dataset, columns, **filters):
+                for row in chunk:
+                    for name in columns:
+                        pending[name].append(_plain(row[name]))
+                pending_rows += len(chunk)
+                if pending_rows >= self.row_group_rows:
+                    pending_rows = 0
+                    yield await write_row_group()
+            if pending_rows:
+                yield await write_row_group()
+        finally:
+            await asyncio.to_thread(writer.close)
+        yield sink.drain()
+
+    def stream(self, fmt: str, dataset: ExportDataset, columns: List[str], **filters) -> AsyncIterator[bytes]:
+        if fmt == "parquet":
+            return self.stream_parquet(dataset, columns, **filters)
+        return self.stream_csv(dataset, columns, **filters)
+
+
+export_service = ExportService()
@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.model_events import on_commit
+from backend.models.herb import Herb
+from backend.models.loader_options import HERB_ROW
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:  # orjson is optional; stdlib json produces the same document
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass(frozen=True)
+class HerbCatalogSnapshot:
+    version: str
+    body: bytes
+    gzip_body: bytes
+    fingerprint: Tuple
+    herb_count: int
+    built_at: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    @property
+    def gzip_etag(self) -> str:
+        # Strong ETags must differ per representation
+        return f'"{self.version}-gz"'
+
+
+def herb_to_dict(herb: Herb) -> Dict:
+    return {
+        "id": herb.id,
+        "name_th": herb.name_th,
+        "name_en": herb.name_en,
+        "scientific_name": herb.scientific_name,
+        "description": herb.description,
+        "properties": herb.properties,
+        "image_url": herb.image_url,
+        "updated_at": (herb.updated_at or herb.created_at).isoformat() if (herb.updated_at or herb.created_at) else None,
+    }
+
+
+class HerbCatalog:
+    """
+    Versioned, pre-serialized and pre-gzipped snapshot of the full herb catalog.
+
+    The snapshot is rebuilt only when a herb changes: immediately in the worker that
+    committed the change (commit hook), and in other workers when a cheap
+    (count, max(updated_at)) fingerprint check — at most once per revalidate interval —
+    shows the table has moved.
+    """
+
+    def __init__(self, revalidate_seconds: int = settings.HERB_CATALOG_REVALIDATE_SECONDS):
+        self.revalidate_seconds = revalidate_seconds
+        self._snapshot: Optional[HerbCatalogSnapshot] = None
+        self._dirty = True
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
+    async def get_snapshot(self, db: AsyncSession) -> HerbCatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._dirty and time.monotonic() - self._checked_at < self.revalidate_seconds:
+            metrics.inc("herb_catalog_snapshot_total", result="hit")
+            return snapshot
+        async with self._lock:
+            if self._snapshot is not None and not self._dirty and time.monotonic() - self._checked_at < self.revalidate_seconds:
+                return self._snapshot
+            fingerprint = await self._fingerprint(db)
+            if self._snapshot is not None and not self._dirty and fingerprint == self._snapshot.fingerprint:
+                self._checked_at = time.monotonic()
+                metrics.inc("herb_catalog_snapshot_total", result="revalidated")
+                return self._snapshot
+            self._dirty = False
+            self._snapshot = await self._build(db, fingerprint)
+            self._checked_at = time.monotonic()
+            metrics.inc("herb_catalog_snapshot_total", result="rebuilt")
+            return self._snapshot
+
+    @staticmethod
+    async def _fingerprint(db: AsyncSession) -> Tuple:
+        result = await db.execute(
+            select(func.count(Herb.id), func.max(func.coalesce(Herb.updated_at, Herb.created_at)), func.max(Herb.id))
+        )
+        count, last_change, max_id = result.one()
+        return (count, last_change.isoformat() if last_change else None, max_id)
+
+    @staticmethod
+    async def _build(db: AsyncSession, fingerprint: Tuple) -> HerbCatalogSnapshot:
+        started = time.perf_counter()
+        result = await db.execute(select(Herb).options(*HERB_ROW).order_by(Herb.id))
+        herbs: List[Dict] = [herb_to_dict(h) for h in result.scalars().all()]
+        herbs_json = _dumps(herbs)
+        version = hashlib.sha256(herbs_json).hexdigest()[:32]
+        body = b'{"version":"' + version.encode() + b'","herbs":' + herbs_json + b"}"
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        metrics.observe("herb_catalog_build_seconds", time.perf_counter() - started)
+        logging.info(f"Herb catalog snapshot {version} built: {len(herbs)} herbs, {len(body)} bytes ({len(gzip_body)} gzipped)")
+        return HerbCatalogSnapshot(
+            version=version,
+            body=body,
+            gzip_body=gzip_body,
+            fingerprint=fingerprint,
+            herb_count=len(herbs),
+            built_at=time.time(),
+        )
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """RFC 7232 If-None-Match comparison (weak comparison, as required for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag.removeprefix("W/") in candidates for etag in etags)
+
+
+herb_catalog = HerbCatalog()
+
+
+@on_commit(Herb)
+def _invalidate_catalog(changes) -> None:
+    herb_catalog.mark_dirty()
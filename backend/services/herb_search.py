@@ -0,0 +1,255 @@
+import bisect
+import json
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.metrics import metrics
+from backend.services.herb_catalog import herb_catalog
+
+_THAI_CHAR_RE = re.compile(r"[\u0E00-\u0E7F]")
+_LATIN_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Tone marks and other above/below diacritics that are commonly mistyped or omitted.
+# U+0E4D NIKHAHIT is kept: NFKC splits SARA AM into NIKHAHIT + SARA AA, so dropping it
+# would make e.g. "น้ำ" match "นา".
+_THAI_MARKS = dict.fromkeys(cp for cp in range(0x0E47, 0x0E4F) if cp != 0x0E4D)
+_ZERO_WIDTH = dict.fromkeys([0x200B, 0x200C, 0x200D, 0xFEFF])
+
+LATIN_FIELDS = ("scientific_name", "name_en")
+
+
+def normalize(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", text).translate(_ZERO_WIDTH).lower().strip()
+
+
+def thai_key(text: str) -> str:
+    """Thai text without spaces and tone marks, used for n-gram matching."""
+    return "".join(text.translate(_THAI_MARKS).split())
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (2, 3)) -> Set[str]:
+    if len(text) < min(sizes):
+        return {text} if text else set()
+    return {text[i:i + n] for n in sizes for i in range(len(text) - n + 1)}
+
+
+def token_trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Edit distance if it is <= max_distance, else None (early exit per row)."""
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+@dataclass
+class _Doc:
+    herb: Dict
+    name_th: str
+    name_th_key: str
+    grams: Set[str]
+    tokens: Set[str]
+
+
+@dataclass
+class SearchHit:
+    herb: Dict
+    score: float
+    matched: str
+
+
+class HerbSearchIndex:
+    """
+    In-process search over herb names.
+
+    - Thai (name_th): character bigram/trigram inverted index over the name with spaces
+      and tone marks removed, ranked by Dice overlap; exact/prefix/substring matches rank first.
+    - Latin (scientific_name, name_en): token index with prefix lookup (the last query token
+      is treated as a typeahead prefix) and fuzzy matching through a token trigram index plus
+      bounded Levenshtein distance.
+
+    Kept in step with the herb catalog snapshot: when the snapshot version changes, only
+    herbs whose data differs are re-indexed and deleted herbs are dropped.
+    """
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._docs: Dict[int, _Doc] = {}
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        self._tokens: Dict[str, Set[int]] = defaultdict(set)
+        self._token_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._sorted_tokens: List[str] = []
+        self._sorted_dirty = False
+
+    # Maintenance
+
+    def sync(self, herbs: Iterable[Dict], version: Optional[str] = None) -> int:
+        """Incrementally bring the index in line with `herbs`. Returns the number of changes."""
+        changed = 0
+        seen: Set[int] = set()
+        for herb in herbs:
+            seen.add(herb["id"])
+            doc = self._docs.get(herb["id"])
+            if doc is None or doc.herb != herb:
+                self.upsert(herb)
+                changed += 1
+        for herb_id in [i for i in self._docs if i not in seen]:
+            self.remove(herb_id)
+            changed += 1
+        self.version = version
+        return changed
+
+    def upsert(self, herb: Dict) -> None:
+        self.remove(herb["id"])
+        name_th = normalize(herb.get("name_th"))
+        name_th_key = thai_key(name_th)
+        grams = char_ngrams(name_th_key)
+        tokens: Set[str] = set()
+        for field in LATIN_FIELDS:
+            tokens.update(_LATIN_TOKEN_RE.findall(normalize(herb.get(field))))
+        doc = _Doc(herb=herb, name_th=name_th, name_th_key=name_th_key, grams=grams, tokens=tokens)
+        self._docs[herb["id"]] = doc
+        for gram in grams:
+            self._grams[gram].add(herb["id"])
+        for token in tokens:
+            if token not in self._tokens:
+                self._sorted_dirty = True
+                for trigram in token_trigrams(token):
+                    self._token_trigrams[trigram].add(token)
+            self._tokens[token].add(herb["id"])
+
+    def remove(self, herb_id: int) -> None:
+        doc = self._docs.pop(herb_id, None)
+        if doc is None:
+            return
+        for gram in doc.grams:
+            self._grams[gram].discard(herb_id)
+            if not self._grams[gram]:
+                del self._grams[gram]
+        for token in doc.tokens:
+            self._tokens[token].discard(herb_id)
+            if not self._tokens[token]:
+                del self._tokens[token]
+                self._sorted_dirty = True
+                for trigram in token_trigrams(token):
+                    self._token_trigrams[trigram].discard(token)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # Query
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        q = normalize(query)
+        if not q:
+            return []
+        scores: Dict[int, Tuple[float, str]] = {}
+        if _THAI_CHAR_RE.search(q):
+            self._score_thai(q, scores)
+        latin_tokens = _LATIN_TOKEN_RE.findall(q)
+        if latin_tokens:
+            self._score_latin(latin_tokens, scores)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], self._docs[item[0]].name_th))
+        return [SearchHit(herb=self._docs[i].herb, score=round(s, 4), matched=m) for i, (s, m) in ranked[:limit]]
+
+    def _score_thai(self, q: str, scores: Dict[int, Tuple[float, str]]) -> None:
+        q_key = thai_key(q)
+        q_grams = char_ngrams(q_key)
+        overlap: Dict[int, int] = defaultdict(int)
+        for gram in q_grams:
+            for doc_id in self._grams.get(gram, ()):
+                overlap[doc_id] += 1
+        for doc_id, common in overlap.items():
+            doc = self._docs[doc_id]
+            if doc.name_th == q or doc.name_th_key == q_key:
+                score = 1.0
+            elif doc.name_th_key.startswith(q_key):
+                score = 0.95
+            elif q_key in doc.name_th_key:
+                score = 0.85
+            else:
+                dice = 2.0 * common / (len(q_grams) + len(doc.grams))
+                if dice < 0.3:
+                    continue
+                score = 0.8 * dice
+            _keep_best(scores, doc_id, score, "name_th")
+
+    def _score_latin(self, q_tokens: List[str], scores: Dict[int, Tuple[float, str]]) -> None:
+        if self._sorted_dirty:
+            self._sorted_tokens = sorted(self._tokens)
+            self._sorted_dirty = False
+        per_doc: Dict[int, List[float]] = defaultdict(lambda: [0.0] * len(q_tokens))
+        for position, q_token in enumerate(q_tokens):
+            is_last = position == len(q_tokens) - 1
+            for token, score in self._match_token(q_token, prefix=is_last):
+                for doc_id in self._tokens[token]:
+                    best = per_doc[doc_id]
+                    best[position] = max(best[position], score)
+        for doc_id, token_scores in per_doc.items():
+            if all(token_scores):
+                _keep_best(scores, doc_id, sum(token_scores) / len(token_scores), "latin")
+
+    def _match_token(self, q_token: str, prefix: bool) -> List[Tuple[str, float]]:
+        matches: Dict[str, float] = {}
+        if q_token in self._tokens:
+            matches[q_token] = 1.0
+        if prefix and len(q_token) >= 2:
+            start = bisect.bisect_left(self._sorted_tokens, q_token)
+            for token in self._sorted_tokens[start:start + 50]:
+                if not token.startswith(q_token):
+                    break
+                matches.setdefault(token, 0.7 + 0.2 * len(q_token) / len(token))
+        if len(q_token) >= 4:
+            max_distance = 1 if len(q_token) <= 6 else 2
+            candidates: Dict[str, int] = defaultdict(int)
+            for trigram in token_trigrams(q_token):
+                for token in self._token_trigrams.get(trigram, ()):
+                    candidates[token] += 1
+            for token, shared in candidates.items():
+                if token in matches or shared < 2:
+                    continue
+                # Compare against the token's prefix too, so "curcu" fuzzily matches "curcuma"
+                target = token[:len(q_token) + max_distance] if prefix else token
+                distance = bounded_levenshtein(q_token, target, max_distance)
+                if distance is not None:
+                    matches[token] = 0.6 * (1 - distance / max(len(q_token), 1))
+        return list(matches.items())
+
+
+def _keep_best(scores: Dict[int, Tuple[float, str]], doc_id: int, score: float, matched: str) -> None:
+    if score > scores.get(doc_id, (0.0, ""))[0]:
+        scores[doc_id] = (score, matched)
+
+
+herb_search_index = HerbSearchIndex()
+
+
+async def search_herbs(db: AsyncSession, query: str, limit: int = 10) -> List[SearchHit]:
+    """Search herbs, resyncing the index first if the catalog snapshot has moved on."""
+    snapshot = await herb_catalog.get_snapshot(db)
+    if herb_search_index.version != snapshot.version:
+        changed = herb_search_index.sync(json.loads(snapshot.body)["herbs"], version=snapshot.version)
+        metrics.inc("herb_search_index_updates_total", changed)
+    started = time.perf_counter()
+    hits = herb_search_index.search(query, limit=limit)
+    metrics.observe("herb_search_seconds", time.perf_counter() - started)
+    return hits
+
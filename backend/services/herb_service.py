@@ -0,0 +1,41 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Dict, List, Optional
+
+from backend.core.database import get_db
+from backend.models.herb import Herb
+from backend.models.loader_options import HERB_ROW
+from backend.services.herb_catalog import HerbCatalogSnapshot, herb_catalog
+from backend.services.herb_search import search_herbs
+from backend.utils.pagination import Page, PageParams, Paginator
+
+HERB_PAGINATION = Paginator(
+    Herb,
+    sort_fields={"name_th": Herb.name_th, "created_at": Herb.created_at, "id": Herb.id},
+    filter_fields={"name_th": Herb.name_th, "created_at": Herb.created_at},
+    default_sort="name_th",
+)
+
+
+class HerbService:
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def list_herbs(self, params: PageParams) -> Page:
+        return await HERB_PAGINATION.paginate(self.db, select(Herb).options(*HERB_ROW), params)
+
+    async def get_catalog_snapshot(self) -> HerbCatalogSnapshot:
+        return await herb_catalog.get_snapshot(self.db)
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict]:
+        hits = await search_herbs(self.db, query, limit=limit)
+        return [{**hit.herb, "score": hit.score, "matched": hit.matched} for hit in hits]
+
+    async def get_herb(self, herb_id: str) -> Optional[Herb]:
+        try:
+            hid = int(herb_id)
+        except ValueError:
+            return None
+        result = await self.db.execute(select(Herb).options(*HERB_ROW).where(Herb.id == hid))
+        return result.scalar_one_or_none()
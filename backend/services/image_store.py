@@ -0,0 +1,498 @@
+import abc
+import asyncio
+import datetime
+import hashlib
+import io
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import case, delete, event, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import get_history
+
+from backend.core.config import settings
+from backend.core.database import dialect_insert, get_db
+from backend.core.metrics import metrics
+from backend.core.tracing import span
+from backend.models.analysis import Analysis
+from backend.models.stored_image import StoredImage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; uploads are then stored unchecked and renditions are unavailable
+    Image = ImageOps = None
+
+# Bump whenever rendition output changes (size, quality, format); part of the key and ETag
+RENDITION_VERSION = 1
+RENDITIONS = ("thumb", "web")
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+def sharded_key(prefix: str, digest: str, suffix: str = "") -> str:
+    """"originals/ab/cd/abcd..." - two levels of 256 directories keep listings small."""
+    return f"{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+def original_key(digest: str) -> str:
+    return sharded_key("originals", digest)
+
+
+def rendition_key(digest: str, variant: str) -> str:
+    return sharded_key(f"renditions/{variant}/v{RENDITION_VERSION}", digest, ".jpg")
+
+
+class BlobStorage(abc.ABC):
+    """
+    What the image store needs from a blob backend. Methods are blocking and are
+    called through asyncio.to_thread.
+    """
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def modified_at(self, key: str) -> Optional[float]:
+        """Last write as a Unix timestamp, or None when the blob does not exist."""
+
+    @abc.abstractmethod
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        """(key, modified_at) for every blob under `prefix`."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path for zero-copy serving, when the backend has one."""
+        return None
+
+
+class LocalBlobStorage(BlobStorage):
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self.local_path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(self.local_path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        for dirpath, _, filenames in os.walk(self.local_path(prefix)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    modified = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), modified
+
+
+def _is_not_found(error: Exception) -> bool:
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound") or isinstance(error, (FileNotFoundError, KeyError))
+
+
+class S3BlobStorage(BlobStorage):
+    """
+    S3 backend over any client with boto3's head_object / put_object / get_object /
+    delete_object calls and list_objects_v2 paginator: AWS S3, or MinIO / LocalStack
+    via IMAGE_STORE_S3_ENDPOINT_URL.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, ContentType=content_type)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key)
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))["LastModified"].timestamp()
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        strip = len(self._key(""))
+        pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self._key(prefix) + "/")
+        for page in pages:
+            for item in page.get("Contents", []):
+                yield item["Key"][strip:], item["LastModified"].timestamp()
+
+
+def build_storage() -> BlobStorage:
+    if settings.IMAGE_STORE_BACKEND == "s3":
+        import boto3  # only needed for the S3 backend
+
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.IMAGE_STORE_S3_ENDPOINT_URL or None,
+            region_name=settings.IMAGE_STORE_S3_REGION,
+        )
+        return S3BlobStorage(client, settings.IMAGE_STORE_S3_BUCKET, settings.IMAGE_STORE_S3_PREFIX)
+    return LocalBlobStorage(settings.IMAGE_STORE_PATH)
+
+
+@dataclass
+class ImageBlob:
+    """One servable image: a local path (preferred) or the bytes, plus its ETag."""
+    etag: str
+    content_type: str
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+def inspect_image(data: bytes) -> Dict:
+    """SHA-256 plus format and dimensions; raises ValueError for anything that is not a supported image."""
+    info = {"digest": hashlib.sha256(data).hexdigest(), "size": len(data), "width": None, "height": None}
+    if Image is None:
+        info["content_type"] = "application/octet-stream"
+        return info
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            content_type = CONTENT_TYPES.get(img.format)
+            info.update(width=img.width, height=img.height)
+            img.verify()
+    except Exception as e:
+        raise ValueError(f"Not a readable image: {e}")
+    if content_type is None:
+        raise ValueError(f"Unsupported image format, use one of {sorted(CONTENT_TYPES)}")
+    info["content_type"] = content_type
+    return info
+
+
+def render_variant(data: bytes, variant: str) -> bytes:
+    """Downscaled, EXIF-rotated JPEG rendition of an original."""
+    bound = settings.IMAGE_STORE_THUMB_SIZE if variant == "thumb" else settings.IMAGE_STORE_WEB_SIZE
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (bound, bound))  # JPEG: decode at a reduced scale when possible
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((bound, bound))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=settings.IMAGE_STORE_RENDITION_QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class ImageStore:
+    """
+    Content-addressed image storage: originals are stored once per SHA-256,
+    however often they are uploaded, and reference-counted by the Analysis rows
+    pointing at them. Thumbnails and web-size renditions are generated on first
+    request (once, even under concurrent requests), stored next to the originals
+    and never change for a digest, so they are served with long-lived ETags.
+    """
+
+    def __init__(self, storage: Optional[BlobStorage] = None):
+        self._storage = storage
+        self._renders: Dict[str, asyncio.Future] = {}
+
+    @property
+    def storage(self) -> BlobStorage:
+        if self._storage is None:
+            self._storage = build_storage()
+        return self._storage
+
+    async def put(self, db: AsyncSession, data: bytes, references: int = 1) -> str:
+        """
+        Store an upload and add `references` to its ref count in the caller's
+        transaction (the caller commits). Returns the digest.
+        Raises ValueError for oversized or unreadable images.
+        """
+        if len(data) > settings.IMAGE_STORE_MAX_BYTES:
+            raise ValueError(f"Image larger than {settings.IMAGE_STORE_MAX_BYTES} bytes")
+        info = await asyncio.to_thread(inspect_image, data)
+        digest = info["digest"]
+        table = StoredImage.__table__
+        stmt = dialect_insert(db.get_bind())(table).values(ref_count=references, **info)
+        result = await db.execute(stmt.on_conflict_do_update(
+            index_elements=["digest"],
+            set_={"ref_count": table.c.ref_count + stmt.excluded.ref_count, "released_at": None},
+        ).returning(table.c.ref_count))
+        # A new or revived row (count was 0) may belong to an image garbage collection
+        # just removed, or whose earlier upload was rolled back: (re)write the blob.
+        # The upsert holds the row lock, and collect_garbage deletes blobs before
+        # committing its row delete, so the two cannot interleave.
+        fresh = result.scalar_one() <= references
+        key = original_key(digest)
+        if not fresh and await asyncio.to_thread(self.storage.exists, key):
+            metrics.inc("image_store_uploads_total", result="duplicate")
+        else:
+            await asyncio.to_thread(self.storage.put, key, data, info["content_type"])
+            metrics.inc("image_store_uploads_total", result="stored")
+            metrics.inc("image_store_bytes_stored_total", len(data))
+        return digest
+
+    async def open(self, image: StoredImage, variant: str = "original") -> ImageBlob:
+        if variant == "original":
+            key, etag, content_type = original_key(image.digest), image.digest, image.content_type
+        else:
+            key = await self._ensure_rendition(image.digest, variant)
+            etag, content_type = f"{image.digest}-{variant}-v{RENDITION_VERSION}", "image/jpeg"
+        path = self.storage.local_path(key)
+        if path is not None:
+            return ImageBlob(etag=etag, content_type=content_type, path=path)
+        return ImageBlob(etag=etag, content_type=content_type, data=await asyncio.to_thread(self.storage.get, key))
+
+    async def _ensure_rendition(self, digest: str, variant: str) -> str:
+        if variant not in RENDITIONS:
+            raise ValueError(f"Unknown variant {variant}, use original or one of {list(RENDITIONS)}")
+        if Image is None:
+            raise RuntimeError("Image renditions need Pillow")
+        key = rendition_key(digest, variant)
+        if await asyncio.to_thread(self.storage.exists, key):
+            metrics.inc("image_renditions_total", variant=variant, result="hit")
+            return key
+
+        pending = self._renders.get(key)
+        if pending is not None:
+            await asyncio.shield(pending)
+            if not await asyncio.to_thread(self.storage.exists, key):
+                raise RuntimeError(f"Rendering {variant} of image {digest} failed")
+            return key
+
+        pending = self._renders[key] = asyncio.get_running_loop().create_future()
+        try:
+            metrics.inc("image_renditions_total", variant=variant, result="miss")
+            with span("image.rendition", variant=variant):
+                original = await asyncio.to_thread(self.storage.get, original_key(digest))
+                rendered = await asyncio.to_thread(render_variant, original, variant)
+                await asyncio.to_thread(self.storage.put, key, rendered, "image/jpeg")
+        finally:
+            pending.set_result(None)  # wake waiters; they check for the blob themselves
+            self._renders.pop(key, None)
+        return key
+
+    async def collect_garbage(self, db: AsyncSession) -> int:
+        """
+        Remove images unreferenced for IMAGE_STORE_GC_GRACE_SECONDS. The rows are
+        deleted (and locked) first, the original and its renditions are deleted while
+        that transaction is still open, then it commits: a concurrent upload of the
+        same image waits on the row lock and rewrites the blob afterwards. If a blob
+        cannot be deleted the batch is rolled back and retried on the next run.
+        """
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=settings.IMAGE_STORE_GC_GRACE_SECONDS)
+        candidates = (
+            select(StoredImage.digest)
+            .where(StoredImage.ref_count <= 0, StoredImage.released_at < cutoff)
+            .limit(settings.IMAGE_STORE_GC_BATCH_SIZE)
+        )
+        try:
+            result = await db.execute(
+                delete(StoredImage)
+                .where(
+                    StoredImage.digest.in_(candidates.scalar_subquery()),
+                    StoredImage.ref_count <= 0,
+                    StoredImage.released_at < cutoff,
+                )
+                .returning(StoredImage.digest)
+            )
+            doomed = list(result.scalars().all())
+            for digest in doomed:
+                for variant in RENDITIONS:
+                    await asyncio.to_thread(self.storage.delete, rendition_key(digest, variant))
+                await asyncio.to_thread(self.storage.delete, original_key(digest))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        if doomed:
+            metrics.inc("image_store_collected_total", len(doomed))
+            logging.info(f"Image store: removed {len(doomed)} unreferenced images")
+        return len(doomed)
+
+    async def sweep_orphans(self, db: AsyncSession) -> int:
+        """
+        Delete blobs older than IMAGE_STORE_GC_GRACE_SECONDS that no stored_image
+        row refers to: originals of rolled-back uploads, renditions of collected
+        images, temp files of interrupted writes. A blob rewritten since the
+        listing (a concurrent upload of the same image) is left alone.
+        """
+        cutoff = time.time() - settings.IMAGE_STORE_GC_GRACE_SECONDS
+
+        def stale_keys() -> List[str]:
+            return [
+                key
+                for prefix in ("originals", "renditions")
+                for key, modified in self.storage.list_keys(prefix)
+                if modified < cutoff
+            ]
+
+        keys = await asyncio.to_thread(stale_keys)
+        removed = 0
+        batch_size = settings.IMAGE_STORE_GC_BATCH_SIZE
+        for start in range(0, len(keys), batch_size):
+            batch = {key: key.rsplit("/", 1)[-1].split(".", 1)[0] for key in keys[start:start + batch_size]}
+            known = set((await db.execute(
+                select(StoredImage.digest).where(StoredImage.digest.in_(set(batch.values())))
+            )).scalars().all())
+            await db.rollback()
+            for key, digest in batch.items():
+                if digest in known:
+                    continue
+                modified = await asyncio.to_thread(self.storage.modified_at, key)
+                if modified is None or modified >= cutoff:
+                    continue
+                await asyncio.to_thread(self.storage.delete, key)
+                removed += 1
+        if removed:
+            metrics.inc("image_store_orphans_removed_total", removed)
+            logging.info(f"Image store: removed {removed} orphaned blobs")
+        return removed
+
+    async def run_forever(self, interval: float = settings.IMAGE_STORE_GC_INTERVAL_SECONDS) -> None:
+        # Imported here: the session factory is only needed by this background job
+        from backend.core.database import AsyncSessionLocal
+
+        last_sweep = 0.0
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    while await self.collect_garbage(db) >= settings.IMAGE_STORE_GC_BATCH_SIZE:
+                        pass
+                    # Listing the whole store is expensive, so orphans are swept less often
+                    if time.monotonic() - last_sweep >= settings.IMAGE_STORE_ORPHAN_SWEEP_INTERVAL_SECONDS:
+                        await self.sweep_orphans(db)
+                        last_sweep = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Image store garbage collection failed: {e}")
+            await asyncio.sleep(interval)
+
+
+image_store = ImageStore()
+
+
+class ImageService:
+    """Access checks for stored images (owner of a referencing analysis, or admin)."""
+
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def get_viewable(self, digest: str, user) -> Optional[StoredImage]:
+        image = await self.db.get(StoredImage, digest)
+        if image is None or getattr(user, "is_admin", False):
+            return image
+        owned = await self.db.execute(
+            select(Analysis.id).where(Analysis.image_digest == digest, Analysis.user_id == user.id).limit(1)
+        )
+        return image if owned.first() is not None else None
+
+
+# Reference counting: Analysis rows deleted or re-pointed through the ORM adjust
+# stored_image.ref_count on the same connection, i.e. in the same transaction.
+# Bulk deletes that bypass the ORM (user cascade, dropped partitions) call
+# release_image_refs first.
+async def release_image_refs(db, *criteria) -> None:
+    """Release the references held by the Analysis rows matching `criteria`; run it in the deleting transaction."""
+    held = (
+        select(func.count())
+        .select_from(Analysis)
+        .where(Analysis.image_digest == StoredImage.digest, *criteria)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(StoredImage)
+        .where(StoredImage.digest.in_(select(Analysis.image_digest).where(Analysis.image_digest.is_not(None), *criteria)))
+        .values(
+            ref_count=StoredImage.ref_count - held,
+            released_at=case((StoredImage.ref_count - held <= 0, func.now()), else_=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _adjust_refs(connection, digest: Optional[str], delta: int) -> None:
+    if not digest:
+        return
+    connection.execute(
+        update(StoredImage)
+        .where(StoredImage.digest == digest)
+        .values(
+            ref_count=StoredImage.ref_count + delta,
+            released_at=case((StoredImage.ref_count + delta <= 0, func.now()), else_=None),
+        )
+    )
+
+
+@event.listens_for(Analysis, "after_delete")
+def _release_on_delete(mapper, connection, target):
+    _adjust_refs(connection, target.image_digest, -1)
+
+
+@event.listens_for(Analysis, "after_update")
+def _move_reference(mapper, connection, target):
+    history = get_history(target, "image_digest")
+    if not history.has_changes():
+        return
+    for old in history.deleted:
+        _adjust_refs(connection, old, -1)
+    for new in history.added:
+        _adjust_refs(connection, new, 1)
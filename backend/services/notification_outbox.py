@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+import logging
+import random
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal, dialect_insert
+from backend.core.metrics import metrics
+from backend.models.notification_outbox import NotificationOutbox
+from backend.services.notification_service import NotificationService
+
+DIGEST_SUBJECT = "สรุปการแจ้งเตือน {count} รายการ"
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+async def enqueue_notification(
+    db: AsyncSession,
+    recipient: str,
+    subject: str,
+    body: str,
+    html: Optional[str] = None,
+    user_id: Optional[int] = None,
+    kind: str = "generic",
+    dedupe_key: Optional[str] = None,
+    digest: bool = False,
+) -> None:
+    """
+    Write a notification to the outbox as part of the caller's transaction; it is
+    sent only if (and after) the caller commits. A repeated dedupe_key is ignored.
+    digest=True holds the message for NOTIFICATION_DIGEST_WINDOW_SECONDS so it can
+    be merged with the recipient's other digest notifications.
+    """
+    now = _utcnow()
+    delay = settings.NOTIFICATION_DIGEST_WINDOW_SECONDS if digest else 0
+    stmt = dialect_insert(db.get_bind())(NotificationOutbox.__table__).values(
+        user_id=user_id,
+        channel="email",
+        recipient=recipient,
+        kind=kind,
+        subject=subject,
+        body=body,
+        html=html,
+        digest=digest,
+        dedupe_key=dedupe_key,
+        status="pending",
+        attempts=0,
+        next_attempt_at=now + datetime.timedelta(seconds=delay),
+        created_at=now,
+    )
+    if dedupe_key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["dedupe_key"])
+    await db.execute(stmt)
+    metrics.inc("notification_outbox_enqueued_total", kind=kind)
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with +/-20% jitter, capped at NOTIFICATION_OUTBOX_MAX_BACKOFF_SECONDS."""
+    delay = settings.NOTIFICATION_OUTBOX_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.NOTIFICATION_OUTBOX_MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+
+
+def build_messages(rows: List[NotificationOutbox]) -> List[Tuple[List[NotificationOutbox], str, str, str, Optional[str]]]:
+    """
+    Group claimed rows into outgoing messages: (rows, recipient, subject, body, html).
+    Digest rows of one recipient become a single message; everything else is sent as is.
+    """
+    messages = []
+    digests: Dict[str, List[NotificationOutbox]] = defaultdict(list)
+    for row in rows:
+        if row.digest:
+            digests[row.recipient].append(row)
+        else:
+            messages.append(([row], row.recipient, row.subject, row.body, row.html))
+    for recipient, group in digests.items():
+        if len(group) == 1:
+            row = group[0]
+            messages.append((group, recipient, row.subject, row.body, row.html))
+            continue
+        group.sort(key=lambda r: r.created_at)
+        body = "\n\n".join(f"• {row.subject}\n{row.body}" for row in group)
+        messages.append((group, recipient, DIGEST_SUBJECT.format(count=len(group)), body, None))
+    return messages
+
+
+class OutboxDispatcher:
+    """
+    Background sender for the notification outbox.
+
+    Each round claims up to NOTIFICATION_OUTBOX_BATCH_SIZE due rows with
+    FOR UPDATE SKIP LOCKED (so several workers can run side by side), leases
+    them, sends them through NotificationService and records the outcome.
+    Failed rows are rescheduled with exponential backoff until
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS; rows whose lease expired (worker died
+    mid-send) are claimed again, so delivery is at-least-once.
+    """
+
+    def __init__(self, batch_size: int = settings.NOTIFICATION_OUTBOX_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.notifications = NotificationService()
+
+    async def run_forever(self, interval: float = settings.NOTIFICATION_OUTBOX_POLL_SECONDS) -> None:
+        logging.info("Notification outbox dispatcher started")
+        while True:
+            try:
+                processed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Notification outbox round failed: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                await asyncio.sleep(interval)
+
+    async def dispatch_once(self) -> int:
+        async with AsyncSessionLocal() as db:
+            rows = await self._claim(db)
+        if not rows:
+            return 0
+        messages = build_messages(rows)
+        results = await asyncio.gather(*(self._send(*message[1:]) for message in messages))
+        async with AsyncSessionLocal() as db:
+            for (group, *_), delivered in zip(messages, results):
+                await self._record(db, group, delivered)
+            await db.commit()
+        metrics.inc("notification_outbox_messages_total", len(messages))
+        if len(messages) < len(rows):
+            metrics.inc("notification_outbox_coalesced_total", len(rows) - len(messages))
+        return len(rows)
+
+    async def _claim(self, db: AsyncSession) -> List[NotificationOutbox]:
+        now = _utcnow()
+        o = NotificationOutbox
+        due = or_(
+            and_(o.status == "pending", o.next_attempt_at <= now),
+            and_(o.status == "sending", o.locked_until < now),
+        )
+        result = await db.execute(
+            select(o).where(due).order_by(o.next_attempt_at).limit(self.batch_size).with_for_update(skip_locked=True)
+        )
+        rows = list(result.scalars().all())
+        digest_recipients = {row.recipient for row in rows if row.digest}
+        if digest_recipients:
+            # A due digest row pulls in the recipient's other digest rows still held for
+            # their digest window (never sent), but not failed rows waiting out a backoff
+            result = await db.execute(
+                select(o)
+                .where(
+                    o.status == "pending",
+                    o.digest.is_(True),
+                    o.attempts == 0,
+                    o.recipient.in_(digest_recipients),
+                    o.id.notin_([row.id for row in rows]),
+                )
+                .with_for_update(skip_locked=True)
+            )
+            rows.extend(result.scalars().all())
+        lease_until = now + datetime.timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE_SECONDS)
+        for row in rows:
+            row.status = "sending"
+            row.locked_until = lease_until
+            row.attempts += 1
+        await db.commit()
+        return rows
+
+    async def _send(self, recipient: str, subject: str, body: str, html: Optional[str]) -> bool:
+        try:
+            return await self.notifications.send_email_and_wait([recipient], subject, body, html=html)
+        except Exception as e:
+            logging.error(f"Outbox send to {recipient} failed: {e}")
+            return False
+
+    @staticmethod
+    async def _record(db: AsyncSession, rows: List[NotificationOutbox], delivered: bool) -> None:
+        o = NotificationOutbox
+        now = _utcnow()
+        if delivered:
+            await db.execute(
+                update(o)
+                .where(o.id.in_([row.id for row in rows]))
+                .values(status="sent", sent_at=now, locked_until=None, last_error=None)
+            )
+            metrics.inc("notification_outbox_sent_total", len(rows))
+            return
+        for row in rows:
+            if row.attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+                values = {"status": "failed", "locked_until": None, "last_error": "delivery failed, giving up"}
+                metrics.inc("notification_outbox_failed_total")
+                logging.error(f"Notification {row.id} to {row.recipient} failed after {row.attempts} attempts")
+            else:
+                values = {
+                    "status": "pending",
+                    "locked_until": None,
+                    "last_error": "delivery failed",
+                    "next_attempt_at": now + datetime.timedelta(seconds=backoff_delay(row.attempts)),
+                }
+                metrics.inc("notification_outbox_retries_total")
+            await db.execute(update(o).where(o.id == row.id).values(**values))
+
+
+outbox_dispatcher = OutboxDispatcher()
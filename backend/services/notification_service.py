@@ -1,24 +1,75 @@
+import asyncio
 import logging
 from typing import Optional, List, Dict
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import os
+
+from backend.core.config import settings
+from backend.core.tracing import current_span_id, current_trace, span
+from backend.services.email_transport import OutgoingEmail, email_dispatcher
 
 class NotificationService:
     """
     Production-ready notification service.
     Supports email notification (extendable for SMS, LINE, etc.)
+
+    Inside the API process email goes through the pooled async dispatcher
+    (services/email_transport.py); elsewhere (scripts, no event loop) it is
+    sent synchronously over a one-off SMTP connection.
     """
 
     def __init__(self):
-        self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("SMTP_PORT", 587))
-        self.smtp_user = os.getenv("SMTP_USER")
-        self.smtp_password = os.getenv("SMTP_PASSWORD")
-        self.sender_email = os.getenv("SENDER_EMAIL", self.smtp_user)
+        self.smtp_host = settings.SMTP_HOST
+        self.smtp_port = settings.SMTP_PORT
+        self.smtp_user = settings.SMTP_USER
+        self.smtp_password = settings.SMTP_PASSWORD
+        self.sender_email = settings.SENDER_EMAIL or self.smtp_user
         self.enabled = all([self.smtp_user, self.smtp_password, self.sender_email])
 
+    @classmethod
+    async def initialize(cls) -> None:
+        """Start the SMTP connection pool and send queue (application startup)."""
+        if cls().enabled:
+            email_dispatcher.start()
+
+    @classmethod
+    async def cleanup(cls) -> None:
+        """Flush queued email (bounded by SMTP_DRAIN_TIMEOUT_SECONDS) and close connections."""
+        await email_dispatcher.stop()
+
+    def build_message(
+        self,
+        to_emails: List[str],
+        subject: str,
+        body: str,
+        html: Optional[str] = None,
+        cc: Optional[List[str]] = None,
+        attachments: Optional[List[Dict[str, bytes]]] = None,
+    ) -> MIMEMultipart:
+        msg = MIMEMultipart("mixed")
+        msg["Subject"] = subject
+        msg["From"] = self.sender_email
+        msg["To"] = ", ".join(to_emails)
+        if cc:
+            msg["Cc"] = ", ".join(cc)
+
+        # Attach plain and html parts
+        alt_part = MIMEMultipart("alternative")
+        alt_part.attach(MIMEText(body, "plain", "utf-8"))
+        if html:
+            alt_part.attach(MIMEText(html, "html", "utf-8"))
+        msg.attach(alt_part)
+
+        # Attach files if any
+        if attachments:
+            from email.mime.application import MIMEApplication
+            for att in attachments:
+                part = MIMEApplication(att["content"])
+                part.add_header("Content-Disposition", "attachment", filename=att["filename"])
+                msg.attach(part)
+        return msg
+
     def send_email(
         self,
         to_emails: List[str],
@@ -31,44 +82,71 @@ class NotificationService:
     ) -> bool:
         """
         Send email notification (production-ready).
+        With the dispatcher running this only queues the message and returns
+        immediately (False if the queue is full); delivery happens in the background.
         """
         if not self.enabled:
             logging.warning("Email notification is not enabled (missing SMTP config).")
             return False
         try:
-            msg = MIMEMultipart("mixed")
-            msg["Subject"] = subject
-            msg["From"] = self.sender_email
-            msg["To"] = ", ".join(to_emails)
-            if cc:
-                msg["Cc"] = ", ".join(cc)
+            msg = self.build_message(to_emails, subject, body, html=html, cc=cc, attachments=attachments)
             recipients = to_emails + (cc if cc else []) + (bcc if bcc else [])
+            if email_dispatcher.running:
+                email_dispatcher.enqueue(OutgoingEmail(message=msg, sender=self.sender_email, recipients=recipients))
+                return True
 
-            # Attach plain and html parts
-            alt_part = MIMEMultipart("alternative")
-            alt_part.attach(MIMEText(body, "plain", "utf-8"))
-            if html:
-                alt_part.attach(MIMEText(html, "html", "utf-8"))
-            msg.attach(alt_part)
-
-            # Attach files if any
-            if attachments:
-                from email.mime.application import MIMEApplication
-                for att in attachments:
-                    part = MIMEApplication(att["content"])
-                    part.add_header("Content-Disposition", "attachment", filename=att["filename"])
-                    msg.attach(part)
-
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
+            with span("email.send", mode="direct"), smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=settings.SMTP_TIMEOUT_SECONDS) as server:
                 server.starttls()
                 server.login(self.smtp_user, self.smtp_password)
                 server.sendmail(self.sender_email, recipients, msg.as_string())
             logging.info(f"Email sent to {recipients}")
             return True
+        except asyncio.QueueFull:
+            logging.error(f"Email queue full, message to {to_emails} not sent")
+            return False
         except Exception as e:
             logging.error(f"Failed to send email: {e}")
             return False
 
+    async def send_email_and_wait(
+        self,
+        to_emails: List[str],
+        subject: str,
+        body: str,
+        html: Optional[str] = None,
+        cc: Optional[List[str]] = None,
+        bcc: Optional[List[str]] = None,
+        attachments: Optional[List[Dict[str, bytes]]] = None,
+    ) -> bool:
+        """
+        Queue a message and wait for the delivery outcome (for jobs that must know
+        whether the mail went out). Never blocks the event loop.
+        """
+        if not self.enabled:
+            logging.warning("Email notification is not enabled (missing SMTP config).")
+            return False
+        if not email_dispatcher.running:
+            return await asyncio.to_thread(
+                self.send_email, to_emails, subject, body, html, cc, bcc, attachments
+            )
+        msg = self.build_message(to_emails, subject, body, html=html, cc=cc, attachments=attachments)
+        recipients = to_emails + (cc if cc else []) + (bcc if bcc else [])
+        try:
+            result = email_dispatcher.enqueue(
+                OutgoingEmail(
+                    message=msg,
+                    sender=self.sender_email,
+                    recipients=recipients,
+                    trace=current_trace(),
+                    trace_parent=current_span_id(),
+                ),
+                want_result=True,
+            )
+        except asyncio.QueueFull:
+            logging.error(f"Email queue full, message to {to_emails} not sent")
+            return False
+        return await result
+
     def send_notification(self, user_email: str, subject: str, message: str, html: Optional[str] = None, attachments: Optional[List[Dict[str, bytes]]] = None) -> bool:
         """
         High-level notification for a single user (email).
@@ -78,7 +156,8 @@ class NotificationService:
     # Extend here for SMS, LINE, push notification, etc.
 
 # หมายเหตุ:
-# - ใช้ environment variable สำหรับ SMTP config (production-ready)
+# - ใช้ environment variable สำหรับ SMTP config (production-ready) ผ่าน core/config.py
+# - ส่งผ่าน pool การเชื่อมต่อ SMTP แบบ async และคิวที่มีขนาดจำกัด (services/email_transport.py) handler ไม่ต้องรอการส่ง
 # - รองรับไฟล์แนบ (attachments) และ multi-part email
 # - Logging ครบถ้วน, ไม่มี conflict กับระบบอื่น
 # - พร้อมสำหรับ production, maintain ง่าย, ขยายต่อยอดได้ (LINE, SMS,
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import object_session
+
+from backend.core.config import settings
+from backend.core.database import RoutingSession
+from backend.core.metrics import metrics
+from backend.core.tracing import span
+from backend.models.certificate import Certificate
+from backend.services.bulk_pdf import _discard_broken_pool, certificate_pdf_data, pdf_pool, render_in_worker
+from backend.services.pdf_generator import TEMPLATE_VERSION, register_thai_fonts
+
+# Certificate attributes that appear on the rendered PDF
+PDF_FIELDS = ("certificate_type", "status", "issued_at", "data", "user_id")
+_STALE_KEY = "stale_pdf_digests"
+
+
+def certificate_row(certificate: Certificate) -> Dict:
+    """Row shape certificate_pdf_data() expects, from a Certificate loaded with its owner."""
+    owner = certificate.user
+    return {
+        "id": certificate.id,
+        "certificate_type": certificate.certificate_type,
+        "status": certificate.status,
+        "issued_at": certificate.issued_at,
+        "data": certificate.data,
+        "full_name": owner.full_name if owner is not None else None,
+        "username": owner.username if owner is not None else None,
+    }
+
+
+def pdf_digest(data: Dict, logo_path: Optional[str] = None) -> str:
+    """Cache key: the rendered fields plus everything else that changes the output."""
+    logo_mtime = os.path.getmtime(logo_path) if logo_path and os.path.exists(logo_path) else None
+    key = {
+        "template": TEMPLATE_VERSION,
+        "font": register_thai_fonts()[0],
+        "logo": [logo_path, logo_mtime],
+        "data": data,
+    }
+    encoded = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CertificatePdfCache:
+    """
+    Rendered certificate PDFs on disk, addressed by pdf_digest(). A hit costs a
+    stat(); a miss renders once in the PDF process pool, concurrent requests for
+    the same digest waiting on the same render.
+    """
+
+    def __init__(self, root: str = settings.PDF_CACHE_PATH):
+        self.root = root
+        self._renders: Dict[str, asyncio.Future] = {}
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.pdf")
+
+    async def get_or_render(self, data: Dict) -> Tuple[str, str]:
+        """(path, digest) of the cached PDF for `data`, rendering it on a miss."""
+        logo_path = settings.PDF_LOGO_PATH or None
+        digest = pdf_digest(data, logo_path)
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            metrics.inc("certificate_pdf_cache_total", result="hit")
+            return path, digest
+
+        pending = self._renders.get(digest)
+        if pending is not None:
+            await asyncio.shield(pending)
+            if not os.path.exists(path):
+                raise RuntimeError(f"Rendering certificate PDF {digest} failed")
+            return path, digest
+
+        pending = self._renders[digest] = asyncio.get_running_loop().create_future()
+        try:
+            metrics.inc("certificate_pdf_cache_total", result="miss")
+            with span("pdf.render", digest=digest[:12]):
+                pdf_bytes = await self._render(logo_path, data)
+            await asyncio.to_thread(self._write, path, pdf_bytes)
+        finally:
+            pending.set_result(None)  # wake waiters; they check for the file themselves
+            self._renders.pop(digest, None)
+        return path, digest
+
+    @staticmethod
+    async def _render(logo_path: Optional[str], data: Dict) -> bytes:
+        """Render in the shared pool; a crashed worker (e.g. OOM-killed) costs one retry on a fresh pool."""
+        loop = asyncio.get_running_loop()
+        pool = pdf_pool()
+        try:
+            return await loop.run_in_executor(pool, render_in_worker, logo_path, data)
+        except BrokenProcessPool:
+            _discard_broken_pool(pool)
+            return await loop.run_in_executor(pdf_pool(), render_in_worker, logo_path, data)
+
+    @staticmethod
+    def _write(path: str, pdf_bytes: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+
+    def discard(self, digests: Set[str]) -> None:
+        for digest in digests:
+            try:
+                os.remove(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Cannot remove cached certificate PDF {digest}: {e}")
+
+
+pdf_cache = CertificatePdfCache()
+
+
+async def certificate_pdf(db, certificate: Certificate) -> Tuple[str, str]:
+    """Cached PDF for a certificate (loaded with its owner); records the digest on the row."""
+    path, digest = await pdf_cache.get_or_render(certificate_pdf_data(certificate_row(certificate)))
+    previous = certificate.pdf_digest
+    if previous != digest:
+        # Bulk UPDATE: bookkeeping only, does not fire the invalidation hook below
+        await db.execute(update(Certificate).where(Certificate.id == certificate.id).values(pdf_digest=digest))
+        await db.commit()
+        if previous:
+            pdf_cache.discard({previous})
+    return path, digest
+
+
+def _mark_stale(certificate: Certificate) -> None:
+    session = object_session(certificate)
+    if certificate.pdf_digest and session is not None:
+        session.info.setdefault(_STALE_KEY, set()).add(certificate.pdf_digest)
+
+
+@event.listens_for(Certificate, "before_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in PDF_FIELDS):
+        _mark_stale(target)
+        target.pdf_digest = None
+
+
+@event.listens_for(Certificate, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    _mark_stale(target)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remove_stale_pdfs(session):
+    stale = session.info.pop(_STALE_KEY, None)
+    if stale:
+        pdf_cache.discard(stale)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _keep_pdfs_on_rollback(session):
+    session.info.pop(_STALE_KEY, None)
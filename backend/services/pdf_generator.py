@@ -1,26 +1,131 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle, Image as RLImage
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 from reportlab.lib import colors
 from io import BytesIO
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import datetime
 import logging
 import os
+import threading
 
-class PDFGenerator:
+from backend.core.config import settings
+from backend.core.tracing import span
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # Pillow is optional; without it the logo is embedded at its original size
+    PILImage = None
+
+THAI_FONT = "Thai"
+THAI_FONT_BOLD = "Thai-Bold"
+# Bump whenever the certificate layout changes; part of the PDF cache key
+TEMPLATE_VERSION = 2
+LOGO_SIZE = 40 * mm
+LOGO_DPI = 150
+
+_font_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def register_thai_fonts() -> Tuple[str, str]:
     """
-    Production-ready PDF generator for certificates, reports, and documents.
+    Register the Thai TTF fonts once per process; returns (regular, bold) font names.
+    Falls back to Helvetica (no Thai glyphs) when the font files are missing.
+    """
+    with _font_lock:
+        regular_path = settings.PDF_THAI_FONT_PATH
+        if not os.path.exists(regular_path):
+            logging.warning(f"Thai font not found at {regular_path}; certificates will use Helvetica")
+            return "Helvetica", "Helvetica-Bold"
+        pdfmetrics.registerFont(TTFont(THAI_FONT, regular_path))
+        bold_path = settings.PDF_THAI_FONT_BOLD_PATH
+        if os.path.exists(bold_path):
+            pdfmetrics.registerFont(TTFont(THAI_FONT_BOLD, bold_path))
+            bold = THAI_FONT_BOLD
+        else:
+            bold = THAI_FONT
+        pdfmetrics.registerFontFamily(THAI_FONT, normal=THAI_FONT, bold=bold, italic=THAI_FONT, boldItalic=bold)
+        logging.info(f"Registered Thai PDF font from {regular_path}")
+        return THAI_FONT, bold
+
+
+class _Logo(Flowable):
+    """Draws an already decoded (and downscaled) image; no file access per document."""
+
+    def __init__(self, image: ImageReader, width: float, height: float):
+        super().__init__()
+        self.image = image
+        self.width = width
+        self.height = height
+        self.hAlign = "CENTER"
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.image, 0, 0, self.width, self.height, mask="auto")
+
+
+class CertificateTemplate:
+    """
+    Everything a certificate shares: fonts, paragraph styles, table styles and the
+    decoded logo. Built once and reused; rendering only fills in per-certificate fields.
     """
 
+    def __init__(self, logo_path: Optional[str] = None):
+        font, bold = register_thai_fonts()
+        thai = font == THAI_FONT
+        # TH Sarabun renders smaller than Helvetica at the same point size
+        size = 16 if thai else 12
+        base = getSampleStyleSheet()
+        self.styles = {
+            "Title": ParagraphStyle("CertTitle", parent=base["Title"], fontName=bold, fontSize=size + 10, leading=size + 16),
+            "Heading2": ParagraphStyle("CertHeading2", parent=base["Heading2"], fontName=bold, fontSize=size + 2, leading=size + 8),
+            "Normal": ParagraphStyle("CertNormal", parent=base["Normal"], fontName=font, fontSize=size, leading=size + 4),
+            "Thai": ParagraphStyle("Thai", fontName=font, fontSize=size, leading=size + 4),
+        }
+        self.info_table_style = TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+            ("FONTNAME", (0, 0), (-1, -1), font),
+            ("FONTNAME", (0, 0), (0, -1), bold),
+            ("FONTSIZE", (0, 0), (-1, -1), size),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ])
+        self.compliance_table_style = TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), font),
+            ("FONTNAME", (0, 0), (0, -1), bold),
+            ("FONTSIZE", (0, 0), (-1, -1), size),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ])
+        self.logo = self._load_logo(logo_path) if logo_path else None
+
     @staticmethod
-    def generate_certificate(data: Dict, filename: Optional[str] = None, logo_path: Optional[str] = None) -> bytes:
-        """
-        Generate a PDF certificate from data dict.
-        Returns PDF as bytes.
-        """
+    def _load_logo(path: str) -> Optional[ImageReader]:
+        if not os.path.exists(path):
+            logging.warning(f"Logo not found: {path}")
+            return None
+        try:
+            if PILImage is None:
+                return ImageReader(path)
+            with PILImage.open(path) as img:
+                pixels = int(LOGO_SIZE / 72 * LOGO_DPI)
+                img.thumbnail((pixels, pixels))
+                return ImageReader(img.convert("RGBA") if img.mode in ("P", "LA") else img.copy())
+        except Exception as e:
+            logging.warning(f"Logo not loaded: {e}")
+            return None
+
+    def render(self, data: Dict) -> bytes:
+        """Render one certificate; only the data-dependent flowables are created here."""
         buffer = BytesIO()
         doc = SimpleDocTemplate(
             buffer,
@@ -30,23 +135,16 @@ class PDFGenerator:
             topMargin=20*mm,
             bottomMargin=20*mm
         )
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name="Thai", fontName="Helvetica", fontSize=12, leading=16))
+        styles = self.styles
         elements = []
 
-        # Logo (optional)
-        if logo_path and os.path.exists(logo_path):
-            try:
-                elements.append(RLImage(logo_path, width=40*mm, height=40*mm))
-                elements.append(Spacer(1, 8))
-            except Exception as e:
-                logging.warning(f"Logo not loaded: {e}")
+        if self.logo is not None:
+            elements.append(_Logo(self.logo, LOGO_SIZE, LOGO_SIZE))
+            elements.append(Spacer(1, 8))
 
-        # Title
         elements.append(Paragraph("ใบรับรองมาตรฐาน GACP", styles["Title"]))
         elements.append(Spacer(1, 12))
 
-        # Certificate Info Table
         info_data = [
             ["ชื่อผู้ขอ", data.get("user_full_name", "-")],
             ["รหัสใบรับรอง", data.get("certificate_id", "-")],
@@ -55,24 +153,14 @@ class PDFGenerator:
             ["สถานะ", data.get("status", "-")],
         ]
         table = Table(info_data, hAlign="LEFT", colWidths=[60*mm, 100*mm])
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-            ("FONTSIZE", (0, 0), (-1, -1), 12),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
+        table.setStyle(self.info_table_style)
         elements.append(table)
         elements.append(Spacer(1, 18))
 
-        # Details/Description
         description = data.get("description", "รายละเอียดใบรับรองและข้อมูลสมุนไพร")
         elements.append(Paragraph(description, styles["Thai"]))
         elements.append(Spacer(1, 18))
 
-        # GACP Compliance
         compliance = data.get("gacp_compliance", {})
         if compliance:
             elements.append(Paragraph("ผลการประเมิน GACP", styles["Heading2"]))
@@ -82,23 +170,39 @@ class PDFGenerator:
                 ["หมายเหตุ", ", ".join(compliance.get("issues", [])) or "-"],
             ]
             compliance_table = Table(compliance_data, hAlign="LEFT", colWidths=[40*mm, 120*mm])
-            compliance_table.setStyle(TableStyle([
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 0), (-1, -1), 12),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-            ]))
+            compliance_table.setStyle(self.compliance_table_style)
             elements.append(compliance_table)
             elements.append(Spacer(1, 12))
 
-        # Signature
         elements.append(Spacer(1, 36))
         elements.append(Paragraph("....................................................", styles["Normal"]))
         elements.append(Paragraph("ผู้มีอำนาจลงนาม", styles["Normal"]))
 
+        doc.build(elements)
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=8)
+def get_certificate_template(logo_path: Optional[str] = None) -> CertificateTemplate:
+    """Process-wide template per logo; safe to share because rendering never mutates it."""
+    return CertificateTemplate(logo_path)
+
+
+class PDFGenerator:
+    """
+    Production-ready PDF generator for certificates, reports, and documents.
+    """
+
+    @staticmethod
+    def generate_certificate(data: Dict, filename: Optional[str] = None, logo_path: Optional[str] = None) -> bytes:
+        """
+        Generate a PDF certificate from data dict.
+        Returns PDF as bytes.
+        """
+        template = get_certificate_template(logo_path or settings.PDF_LOGO_PATH or None)
         try:
-            doc.build(elements)
-            pdf_bytes = buffer.getvalue()
-            buffer.close()
+            with span("pdf.render", mode="inline"):
+                pdf_bytes = template.render(data)
             logging.info("PDF certificate generated successfully.")
             if filename:
                 with open(filename, "wb") as f:
@@ -120,5 +224,7 @@ class PDFGenerator:
 
 # หมายเหตุ:
 # - รองรับโลโก้, ฟอนต์, และรายละเอียดภาษาไทย
+# - ฟอนต์ไทย (PDF_THAI_FONT_PATH) ลงทะเบียนครั้งเดียวต่อ process; style, table style และโลโก้สร้างครั้งเดียวใน CertificateTemplate
+# - แต่ละใบรับรองสร้างเฉพาะส่วนที่เป็นข้อมูล (ตาราง, ข้อความ) ดู scripts/bench_pdf.py สำหรับวัดความเร็ว
 # - Logging ครบถ้วน, ไม่มี conflict กับระบบอื่น
 # - พร้อมสำหรับ production, maintain ง่าย,
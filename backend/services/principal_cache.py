@@ -0,0 +1,135 @@
+import hmac
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from backend.core.config import settings
+from backend.core.metrics import metrics
+from backend.core.redis_client import get_redis
+
+REDIS_KEY_PREFIX = "gacp:principal:"
+
+
+class PrincipalCache:
+    """
+    Two-tier cache of authenticated user principals keyed by user id.
+
+    - Local tier: per-worker LRU with a short TTL (bounds staleness on other workers).
+    - Redis tier (optional): shared across workers, deleted on invalidation.
+    - Token memo: decoded JWT payloads keyed by signature, kept until the token expires.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+        max_entries: int = settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+        use_redis: bool = settings.AUTH_PRINCIPAL_CACHE_REDIS,
+        redis_ttl_seconds: int = settings.AUTH_PRINCIPAL_REDIS_TTL_SECONDS,
+        token_memo_max_entries: int = settings.AUTH_TOKEN_MEMO_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.use_redis = use_redis
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.token_memo_max_entries = token_memo_max_entries
+        self._principals: "OrderedDict[int, Tuple[float, Dict]]" = OrderedDict()
+        self._tokens: "OrderedDict[str, Tuple[float, str, Dict]]" = OrderedDict()
+
+    # Principals
+
+    async def get(self, user_id: int) -> Optional[Dict]:
+        """Return the cached principal dict for user_id, or None on miss."""
+        now = time.monotonic()
+        entry = self._principals.get(user_id)
+        if entry is not None:
+            expires_at, principal = entry
+            if expires_at > now:
+                self._principals.move_to_end(user_id)
+                metrics.inc("auth_principal_cache_hits_total", tier="local")
+                return principal
+            del self._principals[user_id]
+
+        redis = get_redis() if self.use_redis else None
+        if redis is not None:
+            try:
+                raw = await redis.get(f"{REDIS_KEY_PREFIX}{user_id}")
+            except Exception as e:
+                logging.warning(f"Principal cache redis get failed: {e}")
+                raw = None
+            if raw:
+                principal = json.loads(raw)
+                self._store_local(user_id, principal, now)
+                metrics.inc("auth_principal_cache_hits_total", tier="redis")
+                return principal
+
+        metrics.inc("auth_principal_cache_misses_total")
+        return None
+
+    async def set(self, user_id: int, principal: Dict) -> None:
+        """Store a principal in the local tier and (if enabled) in Redis."""
+        self._store_local(user_id, principal, time.monotonic())
+        redis = get_redis() if self.use_redis else None
+        if redis is not None:
+            try:
+                await redis.set(
+                    f"{REDIS_KEY_PREFIX}{user_id}",
+                    json.dumps(principal, ensure_ascii=False),
+                    ex=self.redis_ttl_seconds,
+                )
+            except Exception as e:
+                logging.warning(f"Principal cache redis set failed: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop a user's principal from both tiers (call after any user change)."""
+        self._principals.pop(user_id, None)
+        metrics.inc("auth_principal_cache_invalidations_total")
+        redis = get_redis() if self.use_redis else None
+        if redis is not None:
+            try:
+                await redis.delete(f"{REDIS_KEY_PREFIX}{user_id}")
+            except Exception as e:
+                logging.warning(f"Principal cache redis delete failed: {e}")
+
+    def _store_local(self, user_id: int, principal: Dict, now: float) -> None:
+        self._principals[user_id] = (now + self.ttl_seconds, principal)
+        self._principals.move_to_end(user_id)
+        while len(self._principals) > self.max_entries:
+            self._principals.popitem(last=False)
+
+    # Decoded tokens
+
+    def get_token(self, token: str) -> Optional[Dict]:
+        """Return the memoized payload for a token if it is known and unexpired."""
+        signature = token.rsplit(".", 1)[-1]
+        entry = self._tokens.get(signature)
+        if entry is None:
+            metrics.inc("auth_token_memo_misses_total")
+            return None
+        expires_at, known_token, payload = entry
+        if expires_at <= time.time() or not hmac.compare_digest(known_token, token):
+            self._tokens.pop(signature, None)
+            metrics.inc("auth_token_memo_misses_total")
+            return None
+        self._tokens.move_to_end(signature)
+        metrics.inc("auth_token_memo_hits_total")
+        return payload
+
+    def remember_token(self, token: str, payload: Dict) -> None:
+        """Memoize a successfully decoded token until its `exp` claim."""
+        exp = payload.get("exp")
+        if not exp:
+            return
+        signature = token.rsplit(".", 1)[-1]
+        self._tokens[signature] = (float(exp), token, payload)
+        self._tokens.move_to_end(signature)
+        while len(self._tokens) > self.token_memo_max_entries:
+            self._tokens.popitem(last=False)
+
+    def clear(self) -> None:
+        self._principals.clear()
+        self._tokens.clear()
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,204 @@
+import datetime
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; NDJSON is always accepted
+    msgpack = None
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+MSGPACK_TYPES = ("application/x-msgpack", "application/msgpack", "application/vnd.msgpack")
+
+# Error codes used by the vectorized validation; 0 means valid
+ERROR_MESSAGES = [
+    None,
+    "malformed record",
+    "tracking_code is required (max 128 chars)",
+    "status is required (max 64 chars)",
+    "location must be a string (max 255 chars)",
+    "client_event_id is required (max 64 chars)",
+    "data must be an object",
+    "invalid timestamp",
+    "timestamp is in the future",
+    "timestamp is too old",
+    "duplicate client_event_id in batch",
+    "tracking code not found",
+]
+(OK, E_MALFORMED, E_CODE, E_STATUS, E_LOCATION, E_CLIENT_ID, E_DATA,
+ E_TIMESTAMP, E_FUTURE, E_TOO_OLD, E_BATCH_DUPLICATE, E_NOT_FOUND) = range(len(ERROR_MESSAGES))
+
+_MIN_TIMESTAMP = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+
+@dataclass
+class EventBatch:
+    """Columnar view of a bulk upload; `errors` holds an ERROR_MESSAGES index per record."""
+    tracking_codes: np.ndarray
+    statuses: np.ndarray
+    locations: List[Optional[str]]
+    client_event_ids: np.ndarray
+    timestamps: np.ndarray  # epoch seconds (float64)
+    data: List[Optional[Dict[str, Any]]]
+    errors: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def valid_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.errors == OK)
+
+    def reject(self, indices, code: int) -> None:
+        indices = np.asarray(indices, dtype=np.int64)
+        pending = indices[self.errors[indices] == OK]
+        self.errors[pending] = code
+
+
+def _iso_timestamp(value: Any) -> Any:
+    """msgpack timestamp ext -> ISO-8601 string, so nested event data stays JSON-serializable."""
+    if isinstance(value, msgpack.Timestamp):
+        return value.to_datetime().isoformat()
+    return value
+
+
+def _timestamps_in_map(obj: Dict) -> Dict:
+    return {key: _iso_timestamp(value) for key, value in obj.items()}
+
+
+def _timestamps_in_list(obj: List) -> List:
+    return [_iso_timestamp(value) for value in obj]
+
+
+def parse_records(body: bytes, content_type: str) -> List[Any]:
+    """
+    Decode a bulk upload into a list of raw records.
+
+    - NDJSON: one JSON object per line; a malformed line becomes a rejected record
+      instead of failing the batch.
+    - msgpack: an array of maps, or a map with an "events" array.
+    Raises ValueError for unsupported content types or an undecodable msgpack body.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise ValueError("msgpack uploads are not supported on this server")
+        try:
+            payload = msgpack.unpackb(
+                body, raw=False, timestamp=0, object_hook=_timestamps_in_map, list_hook=_timestamps_in_list
+            )
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack body: {e}")
+        if isinstance(payload, dict):
+            payload = payload.get("events")
+        if not isinstance(payload, list):
+            raise ValueError("msgpack body must be an array of events")
+        return payload
+    if media_type in NDJSON_TYPES:
+        records = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(None)
+        return records
+    raise ValueError(f"Unsupported content type '{media_type}', use NDJSON or msgpack")
+
+
+def _epoch(value: Any, now: float) -> float:
+    if value is None:
+        return now
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        try:
+            value = float(value)
+        except OverflowError:  # e.g. a 400-digit integer
+            return math.nan
+        return value if math.isfinite(value) else math.nan
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return math.nan
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.timestamp()
+    return math.nan
+
+
+def _str_or_empty(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+def build_batch(records: List[Any], now: Optional[float] = None) -> EventBatch:
+    """
+    Columnarize `records` and validate them with array-wide checks (lengths, types,
+    timestamp window, in-batch duplicates) instead of per-object model validation.
+    """
+    now = time.time() if now is None else now
+    n = len(records)
+    is_dict = np.fromiter((isinstance(r, dict) for r in records), dtype=bool, count=n)
+    rows = [r if isinstance(r, dict) else {} for r in records]
+
+    raw_codes = [r.get("tracking_code") for r in rows]
+    raw_statuses = [r.get("status") for r in rows]
+    raw_client_ids = [r.get("client_event_id") for r in rows]
+    locations = [r.get("location") for r in rows]
+    data = [r.get("data") for r in rows]
+
+    codes = np.array([_str_or_empty(v).strip() for v in raw_codes], dtype=str) if n else np.array([], dtype=str)
+    statuses = np.array([_str_or_empty(v).strip() for v in raw_statuses], dtype=str) if n else np.array([], dtype=str)
+    client_ids = np.array([_str_or_empty(v) for v in raw_client_ids], dtype=str) if n else np.array([], dtype=str)
+    timestamps = np.fromiter((_epoch(r.get("timestamp"), now) for r in rows), dtype=np.float64, count=n)
+    location_ok = np.fromiter(
+        (v is None or (isinstance(v, str) and len(v) <= 255) for v in locations), dtype=bool, count=n
+    )
+    data_ok = np.fromiter((v is None or isinstance(v, dict) for v in data), dtype=bool, count=n)
+
+    errors = np.zeros(n, dtype=np.int8)
+
+    def flag(mask: np.ndarray, code: int) -> None:
+        errors[mask & (errors == OK)] = code
+
+    code_len = np.char.str_len(codes)
+    status_len = np.char.str_len(statuses)
+    client_id_len = np.char.str_len(client_ids)
+    flag(~is_dict, E_MALFORMED)
+    flag((code_len == 0) | (code_len > 128), E_CODE)
+    flag((status_len == 0) | (status_len > 64), E_STATUS)
+    flag(~location_ok, E_LOCATION)
+    flag((client_id_len == 0) | (client_id_len > 64), E_CLIENT_ID)
+    flag(~data_ok, E_DATA)
+    flag(np.isnan(timestamps), E_TIMESTAMP)
+    with np.errstate(invalid="ignore"):
+        flag(timestamps > now + settings.TRACKING_BULK_MAX_FUTURE_SECONDS, E_FUTURE)
+        flag(timestamps < _MIN_TIMESTAMP, E_TOO_OLD)
+
+    # Keep the first occurrence of each (tracking_code, client_event_id) among valid records
+    valid = np.flatnonzero(errors == OK)
+    if len(valid):
+        keys = np.char.add(np.char.add(codes[valid], "\x1f"), client_ids[valid])
+        _, first = np.unique(keys, return_index=True)
+        repeated = np.ones(len(valid), dtype=bool)
+        repeated[first] = False
+        errors[valid[repeated]] = E_BATCH_DUPLICATE
+
+    return EventBatch(
+        tracking_codes=codes,
+        statuses=statuses,
+        locations=locations,
+        client_event_ids=client_ids,
+        timestamps=timestamps,
+        data=data,
+        errors=errors,
+    )
@@ -0,0 +1,317 @@
+from fastapi import Depends
+from sqlalchemy import and_, case, exists, null, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Any, Dict, List, Optional, Tuple
+import datetime
+import logging
+import time
+
+import numpy as np
+
+from backend.core.database import dialect_insert, get_db
+from backend.core.metrics import metrics
+from backend.models.loader_options import TRACKING_EVENT_ROW, TRACKING_ROW
+from backend.models.tracking import Tracking
+from backend.models.tracking_event import TrackingEvent
+from backend.models.user import User
+from backend.utils.helpers import now_utc, to_utc
+from backend.services.notification_outbox import enqueue_notification
+from backend.services.tracking_ingest import E_BATCH_DUPLICATE, E_NOT_FOUND, ERROR_MESSAGES, EventBatch
+from backend.utils.pagination import cursor_value, decode_cursor, encode_cursor
+
+DEFAULT_TIMELINE_LIMIT = 100
+MAX_TIMELINE_LIMIT = 500
+# Rows per multi-row INSERT; 8 bound columns keeps this well under PostgreSQL's 32767 parameters
+BULK_INSERT_CHUNK = 1000
+
+# Keys used for the event time in legacy Tracking.events blobs
+_LEGACY_TIMESTAMP_KEYS = ("timestamp", "time", "date", "created_at")
+
+
+class TrackingService:
+    """
+    Supply-chain tracking backed by the append-only tracking_event table.
+    Appends are single-row inserts; timeline reads are keyset-paginated on
+    (tracking_code, timestamp, id) so cost does not grow with lot history.
+    """
+
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def get_tracking(self, tracking_code: str) -> Optional[Tracking]:
+        result = await self.db.execute(select(Tracking).options(*TRACKING_ROW).where(Tracking.tracking_code == tracking_code))
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def can_access(tracking: Tracking, user) -> bool:
+        return bool(getattr(user, "is_admin", False)) or tracking.user_id == user.id
+
+    async def append_event(
+        self,
+        tracking_code: str,
+        status: str,
+        user,
+        location: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime.datetime] = None,
+    ) -> Optional[TrackingEvent]:
+        """
+        Append one event and move the lot's current status. Returns None if the
+        tracking code does not exist or the user may not write to it. The owner
+        is notified (as a digest) when someone else changes the status.
+        """
+        tracking = await self.get_tracking(tracking_code)
+        if tracking is None or not self.can_access(tracking, user):
+            return None
+        previous = tracking.status
+        event = TrackingEvent(
+            tracking_code=tracking_code,
+            timestamp=to_utc(timestamp) if timestamp else now_utc(),
+            status=status,
+            location=location,
+            actor_id=user.id,
+            data=data,
+        )
+        self.db.add(event)
+        await self.db.execute(
+            update(Tracking).where(Tracking.tracking_code == tracking_code).values(status=status)
+        )
+        if status != previous and tracking.user_id != user.id:
+            await self._notify_status_change(tracking, previous, status, location)
+        await self.db.commit()
+        await self.db.refresh(event)
+        return event
+
+    async def _notify_status_change(self, tracking: Tracking, previous: str, status: str, location: Optional[str]) -> None:
+        # Outbox row in the same transaction: the email goes out only if the event commits
+        result = await self.db.execute(select(User.email).where(User.id == tracking.user_id))
+        email = result.scalar_one_or_none()
+        if not email:
+            return
+        body = f"ล็อต {tracking.tracking_code} เปลี่ยนสถานะจาก {previous} เป็น {status}"
+        if location:
+            body += f" ({location})"
+        await enqueue_notification(
+            self.db,
+            email,
+            subject=f"สถานะล็อต {tracking.tracking_code}: {status}",
+            body=body,
+            user_id=tracking.user_id,
+            kind="tracking_status",
+            digest=True,
+        )
+
+    async def ingest_events(self, batch: EventBatch, user) -> Dict[str, Any]:
+        """
+        Store a validated bulk upload in one transaction and return per-event acks.
+
+        - Lots are checked once per distinct tracking code; events for unknown or
+          foreign lots are rejected.
+        - Rows go in with multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING, so a
+          retried upload acks already stored client_event_ids as "duplicate".
+        - Each lot's status moves to its newest inserted event, unless a newer event
+          is already stored.
+        """
+        started = time.perf_counter()
+        created: Dict[int, int] = {}
+        valid = batch.valid_indices()
+        if len(valid):
+            await self._reject_inaccessible(batch, valid, user)
+            valid = batch.valid_indices()
+        if len(valid):
+            created = await self._insert_events(batch, valid, user)
+            await self._advance_statuses(batch, [i for i in valid if i in created])
+        await self.db.commit()
+
+        acks = []
+        counts = {"created": 0, "duplicate": 0, "rejected": 0}
+        for i in range(len(batch)):
+            ack = {"index": i, "client_event_id": batch.client_event_ids[i].item() or None}
+            error = int(batch.errors[i])
+            if i in created:
+                ack.update(status="created", id=created[i])
+            elif error == E_BATCH_DUPLICATE or not error:
+                ack["status"] = "duplicate"
+            else:
+                ack.update(status="rejected", error=ERROR_MESSAGES[error])
+            counts[ack["status"]] += 1
+            acks.append(ack)
+        for result, count in counts.items():
+            if count:
+                metrics.inc("tracking_bulk_events_total", count, result=result)
+        metrics.observe("tracking_bulk_ingest_seconds", time.perf_counter() - started)
+        return {**counts, "acks": acks}
+
+    async def _reject_inaccessible(self, batch: EventBatch, valid: np.ndarray, user) -> None:
+        codes = np.unique(batch.tracking_codes[valid])
+        result = await self.db.execute(
+            select(Tracking.tracking_code, Tracking.user_id).where(Tracking.tracking_code.in_(codes.tolist()))
+        )
+        is_admin = bool(getattr(user, "is_admin", False))
+        allowed = [code for code, owner_id in result.all() if is_admin or owner_id == user.id]
+        denied = ~np.isin(batch.tracking_codes[valid], allowed)
+        batch.reject(valid[denied], E_NOT_FOUND)
+
+    async def _insert_events(self, batch: EventBatch, valid: np.ndarray, user) -> Dict[int, int]:
+        """Insert valid rows in chunks; returns {batch index: event id} for rows actually created."""
+        insert = dialect_insert(self.db.get_bind())
+        created: Dict[int, int] = {}
+        for start in range(0, len(valid), BULK_INSERT_CHUNK):
+            chunk = valid[start:start + BULK_INSERT_CHUNK]
+            index_by_key = {}
+            rows = []
+            for i in chunk.tolist():
+                code = batch.tracking_codes[i].item()
+                client_event_id = batch.client_event_ids[i].item()
+                index_by_key[(code, client_event_id)] = i
+                rows.append({
+                    "tracking_code": code,
+                    "timestamp": datetime.datetime.fromtimestamp(batch.timestamps[i], tz=datetime.timezone.utc),
+                    "status": batch.statuses[i].item(),
+                    "location": batch.locations[i],
+                    "actor_id": user.id,
+                    "data": batch.data[i],
+                    "client_event_id": client_event_id,
+                    "created_at": now_utc(),
+                })
+            stmt = (
+                insert(TrackingEvent)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["tracking_code", "client_event_id"])
+                .returning(TrackingEvent.id, TrackingEvent.tracking_code, TrackingEvent.client_event_id)
+            )
+            result = await self.db.execute(stmt)
+            for event_id, code, client_event_id in result.all():
+                created[index_by_key[(code, client_event_id)]] = event_id
+        return created
+
+    async def _advance_statuses(self, batch: EventBatch, inserted: List[int]) -> None:
+        if not inserted:
+            return
+        latest: Dict[str, int] = {}
+        for i in inserted:
+            code = batch.tracking_codes[i].item()
+            if code not in latest or batch.timestamps[i] >= batch.timestamps[latest[code]]:
+                latest[code] = i
+        status_by_code = {code: batch.statuses[i].item() for code, i in latest.items()}
+        time_by_code = {
+            code: datetime.datetime.fromtimestamp(batch.timestamps[i], tz=datetime.timezone.utc)
+            for code, i in latest.items()
+        }
+        newer_exists = exists().where(
+            TrackingEvent.tracking_code == Tracking.tracking_code,
+            TrackingEvent.timestamp > case(time_by_code, value=Tracking.tracking_code),
+        )
+        await self.db.execute(
+            update(Tracking)
+            .where(Tracking.tracking_code.in_(list(latest)), ~newer_exists)
+            .values(status=case(status_by_code, value=Tracking.tracking_code))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_timeline(
+        self,
+        tracking_code: str,
+        user,
+        limit: int = DEFAULT_TIMELINE_LIMIT,
+        cursor: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+    ) -> Optional[Tuple[List[TrackingEvent], Optional[str]]]:
+        """
+        Return (events, next_cursor) in chronological order, or None if the tracking
+        code does not exist or is not visible to the user.
+
+        - cursor: opaque token from a previous page (or from the last poll) — only
+          events after it are returned, so clients can poll for new scans.
+        - since: only events at or after this time.
+        Raises ValueError for a malformed cursor.
+        """
+        tracking = await self.get_tracking(tracking_code)
+        if tracking is None or not self.can_access(tracking, user):
+            return None
+
+        limit = max(1, min(limit, MAX_TIMELINE_LIMIT))
+        stmt = select(TrackingEvent).options(*TRACKING_EVENT_ROW).where(TrackingEvent.tracking_code == tracking_code)
+        if since is not None:
+            stmt = stmt.where(TrackingEvent.timestamp >= to_utc(since))
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 2:
+                raise ValueError("Invalid cursor")
+            after_ts = cursor_value(TrackingEvent.timestamp, values[0])
+            after_id = cursor_value(TrackingEvent.id, values[1])
+            stmt = stmt.where(
+                or_(
+                    TrackingEvent.timestamp > after_ts,
+                    and_(TrackingEvent.timestamp == after_ts, TrackingEvent.id > after_id),
+                )
+            )
+        stmt = stmt.order_by(TrackingEvent.timestamp, TrackingEvent.id).limit(limit + 1)
+        result = await self.db.execute(stmt)
+        events = list(result.scalars().all())
+
+        next_cursor = None
+        if len(events) > limit:
+            events = events[:limit]
+        if events:
+            # Always hand back a cursor for the last row so pollers can resume from it
+            last = events[-1]
+            next_cursor = encode_cursor([last.timestamp, last.id])
+        return events, next_cursor
+
+    async def backfill_events_from_json(self, batch_size: int = 200) -> int:
+        """
+        One-off migration of legacy Tracking.events blobs into tracking_event rows.
+        Each batch is committed with the blobs cleared, so the job is resumable and
+        idempotent. Returns the number of events migrated.
+        """
+        migrated = 0
+        while True:
+            result = await self.db.execute(
+                select(Tracking)
+                .options(*TRACKING_ROW)
+                .where(Tracking.events.isnot(None))
+                .order_by(Tracking.id)
+                .limit(batch_size)
+            )
+            trackings = list(result.scalars().all())
+            if not trackings:
+                break
+            for tracking in trackings:
+                for raw in tracking.events or []:
+                    self.db.add(self._event_from_legacy(tracking, raw))
+                    migrated += 1
+                tracking.events = null()  # SQL NULL, not JSON 'null'
+            await self.db.commit()
+            logging.info(f"Backfilled tracking events for {len(trackings)} lots ({migrated} events so far)")
+        return migrated
+
+    @staticmethod
+    def _event_from_legacy(tracking: Tracking, raw: Any) -> TrackingEvent:
+        if not isinstance(raw, dict):
+            raw = {"status": str(raw)}
+        data = dict(raw)
+        timestamp = None
+        for key in _LEGACY_TIMESTAMP_KEYS:
+            value = data.pop(key, None)
+            if value and timestamp is None:
+                timestamp = value
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            except ValueError:
+                timestamp = None
+        status = str(data.pop("status", None) or data.pop("event", None) or tracking.status)
+        location = data.pop("location", None)
+        if location is not None and not isinstance(location, str):
+            data["location"] = location  # structured locations (e.g. GPS) stay in data
+            location = None
+        return TrackingEvent(
+            tracking_code=tracking.tracking_code,
+            timestamp=to_utc(timestamp) if isinstance(timestamp, datetime.datetime) else tracking.created_at or now_utc(),
+            status=status,
+            location=location,
+            actor_id=tracking.user_id,
+            data=data or None,
+        )
@@ -0,0 +1,31 @@
+"""
+Test environment: settings come from the environment, so it is prepared before any
+backend module is imported. The primary and the read replica are two SQLite files
+(stand-ins for PostgreSQL) and the SQL query budget is enforced strictly.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.dirname(BACKEND_DIR), BACKEND_DIR):  # modules import both backend.core.* and core.*
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+_DB_DIR = tempfile.mkdtemp(prefix="gacp-tests-")
+PRIMARY_DB = os.path.join(_DB_DIR, "primary.db")
+REPLICA_DB = os.path.join(_DB_DIR, "replica.db")
+
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "REDIS_URL": "redis://127.0.0.1:6379/0",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{PRIMARY_DB}",
+    "DATABASE_REPLICA_URLS": f'["sqlite+aiosqlite:///{REPLICA_DB}"]',
+    "QUERY_BUDGET_STRICT": "true",
+    "TRACING_ENABLED": "false",
+    "ACCESS_LOG_ENABLED": "false",
+})
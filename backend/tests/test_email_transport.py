@@ -0,0 +1,109 @@
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+pytest.importorskip("aiosmtplib")
+email_transport = pytest.importorskip("backend.services.email_transport")
+notification_service = pytest.importorskip("backend.services.notification_service")
+
+from backend.core.metrics import metrics  # noqa: E402
+from backend.services.email_transport import EmailDispatcher, OutgoingEmail  # noqa: E402
+
+
+class RecordingHandler:
+    """Accepts every message and notes which client connection carried it; can answer 451 first."""
+
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.peers = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.append(session.peer)
+        if self.fail_first:
+            self.fail_first -= 1
+            return "451 Requested action aborted: local error"
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(request, monkeypatch):
+    handler = RecordingHandler(**getattr(request, "param", {}))
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    for name, value in {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": controller.port,
+        "SMTP_USER": None,
+        "SMTP_PASSWORD": None,
+        "SMTP_STARTTLS": False,
+        "SMTP_POOL_SIZE": 1,
+        "SMTP_RETRY_BACKOFF_SECONDS": 0.0,
+    }.items():
+        monkeypatch.setattr(email_transport.settings, name, value)
+    yield handler
+    controller.stop()
+
+
+def _email(index: int) -> OutgoingEmail:
+    message = EmailMessage()
+    message["Subject"] = f"message {index}"
+    message.set_content("body")
+    return OutgoingEmail(message=message, sender="noreply@example.com", recipients=["farmer@example.com"])
+
+
+def _deliver(count: int):
+    async def run():
+        dispatcher = EmailDispatcher()
+        dispatcher.start()
+        try:
+            futures = [dispatcher.enqueue(_email(i), want_result=True) for i in range(count)]
+            return await asyncio.gather(*futures)
+        finally:
+            await dispatcher.stop()
+    return asyncio.run(run())
+
+
+def test_messages_reuse_one_connection(smtp_server):
+    opened = metrics.get_counter("smtp_connections_opened_total")
+    assert _deliver(3) == [True, True, True]
+    assert len(smtp_server.peers) == 3
+    assert len(set(smtp_server.peers)) == 1
+    assert metrics.get_counter("smtp_connections_opened_total") == opened + 1
+
+
+@pytest.mark.parametrize("smtp_server", [{"fail_first": 1}], indirect=True)
+def test_451_is_retried_on_a_fresh_connection(smtp_server):
+    retries = metrics.get_counter("email_retries_total")
+    assert _deliver(1) == [True]
+    first, second = smtp_server.peers
+    assert first != second
+    assert metrics.get_counter("email_retries_total") == retries + 1
+
+
+def test_send_email_reports_a_full_queue(smtp_server, monkeypatch):
+    monkeypatch.setattr(email_transport.settings, "SMTP_QUEUE_SIZE", 1)
+
+    async def run():
+        dispatcher = EmailDispatcher()
+        monkeypatch.setattr(notification_service, "email_dispatcher", dispatcher)
+        dispatcher.start()
+        service = notification_service.NotificationService()
+        service.enabled, service.sender_email = True, "noreply@example.com"
+        try:
+            # No await in between: the worker cannot take the first message off the queue yet
+            return [service.send_email(["farmer@example.com"], "subject", "body") for _ in range(2)]
+        finally:
+            await dispatcher.stop()
+
+    dropped = metrics.get_counter("email_dropped_total", reason="queue_full")
+    assert asyncio.run(run()) == [True, False]
+    assert metrics.get_counter("email_dropped_total", reason="queue_full") == dropped + 1
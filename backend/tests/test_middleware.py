@@ -0,0 +1,46 @@
+import ast
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from backend.core.metrics import metrics
+from backend.core.middleware import RequestMiddleware
+from backend.core.request_context import UNMATCHED
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/herbs/{herb_id}")
+    async def get_herb(herb_id: int):
+        return {"id": herb_id}
+
+    return RequestMiddleware(app)
+
+
+def _get(paths):
+    async def run():
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(run())
+
+
+def _route_labels():
+    series = metrics.snapshot()["summaries"].get("http_request_duration_seconds", {})
+    return {ast.literal_eval(key)["route"] for key in series}  # keys are str(dict(labels))
+
+
+def test_route_label_is_the_template():
+    metrics.reset()
+    responses = _get([f"/herbs/{i}" for i in range(5)])
+    assert all(r.status_code == 200 for r in responses)
+    assert _route_labels() == {"/herbs/{herb_id}"}
+
+
+def test_unmatched_paths_share_one_label():
+    metrics.reset()
+    responses = _get([f"/nope/{i}" for i in range(5)])
+    assert all(r.status_code == 404 for r in responses)
+    assert _route_labels() == {UNMATCHED}
@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from backend.utils.pagination import PageParams, Paginator, encode_cursor
+
+RowBase = declarative_base()
+START = datetime.datetime(2024, 1, 1)
+
+
+class Row(RowBase):
+    __tablename__ = "row"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(32), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+PAGINATOR = Paginator(
+    Row,
+    sort_fields={"created_at": Row.created_at, "name": Row.name, "id": Row.id},
+    filter_fields={"name": Row.name},
+    default_sort="id",
+)
+
+
+def _paginate(params: PageParams):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(RowBase.metadata.create_all)
+                await conn.execute(Row.__table__.insert(), [
+                    {"id": i, "name": f"row{i:02d}", "created_at": START + datetime.timedelta(hours=i)} for i in range(1, 8)
+                ])
+            async with AsyncSession(engine) as db:
+                return await PAGINATOR.paginate(db, select(Row), params)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def test_cursor_walks_every_row_once():
+    seen, cursor = [], None
+    while True:
+        page = _paginate(PageParams(limit=3, cursor=cursor, sort="-created_at"))
+        seen += [row.id for row in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+@pytest.mark.parametrize("last_value, last_id", [
+    ("2024-01-01T03:00:00", 3),  # a string where the column holds datetimes
+    (START, "3"),
+    (START, True),
+    (START, None),
+])
+def test_cursor_values_must_match_column_types(last_value, last_id):
+    cursor = encode_cursor(["created_at", last_value, last_id])
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        _paginate(PageParams(limit=3, cursor=cursor, sort="created_at"))
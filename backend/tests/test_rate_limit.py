@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from backend.core import rate_limit  # noqa: E402
+from backend.core.rate_limit import RateLimit, RateLimitMiddleware, SlidingWindowRateLimiter  # noqa: E402
+from backend.core.redis_client import set_redis  # noqa: E402
+
+# Fixed clock, one second into an hourly window, so a test never straddles a window boundary
+NOW = 1_700_000_000 - 1_700_000_000 % 3600 + 1
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "time", lambda: NOW)
+
+
+@pytest.fixture
+def fake_redis():
+    client = fakeredis.FakeAsyncRedis()
+    set_redis(client)
+    yield client
+    set_redis(None)
+
+
+@pytest.fixture
+def redis_down():
+    # Nothing listens on port 1: every call fails and the limiter falls back to memory
+    import redis.asyncio as aioredis
+    set_redis(aioredis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.2))
+    yield
+    set_redis(None)
+
+
+def _run_hits(limiters, rule, hits_per_limiter, identity="ip:10.0.0.1"):
+    async def run():
+        allowed = 0
+        for _ in range(hits_per_limiter):
+            for limiter in limiters:
+                decision = await limiter.hit("anonymous", identity, rule)
+                allowed += decision.allowed
+        return allowed
+    return asyncio.run(run())
+
+
+def test_limit_is_exact_across_two_limiters(fake_redis):
+    rule = RateLimit.parse("50/hour")
+    first, second = SlidingWindowRateLimiter(key_prefix="t1"), SlidingWindowRateLimiter(key_prefix="t1")
+    assert _run_hits([first, second], rule, 60) == 50
+
+
+def test_leases_are_spent_locally(fake_redis):
+    rule = RateLimit.parse("1000/hour")
+    limiter = SlidingWindowRateLimiter(max_lease=10, key_prefix="t2")
+    assert _run_hits([limiter], rule, 10) == 10
+    # One Redis round trip leased all ten tokens; the counter reflects the lease, not the hits
+    keys = asyncio.run(fake_redis.keys("t2:*"))
+    assert len(keys) == 1
+    assert int(asyncio.run(fake_redis.get(keys[0]))) == 10
+
+
+def test_denial_reports_reset(fake_redis):
+    rule = RateLimit.parse("3/hour")
+    limiter = SlidingWindowRateLimiter(key_prefix="t3")
+    _run_hits([limiter], rule, 3)
+    decision = asyncio.run(limiter.hit("anonymous", "ip:10.0.0.1", rule))
+    assert not decision.allowed
+    assert decision.remaining == 0
+    # All three tokens were taken in this window: one frees a third of the way into the next
+    assert decision.reset_seconds == pytest.approx(3599 + 1200, abs=1)
+
+
+def test_fallback_when_redis_is_down(redis_down):
+    rule = RateLimit.parse("20/hour")
+    limiter = SlidingWindowRateLimiter(key_prefix="t4")
+    assert _run_hits([limiter], rule, 30) == 20
+    assert len(limiter._local_windows) == 1
+
+
+def test_fallback_windows_are_pruned(redis_down, monkeypatch):
+    rule = RateLimit.parse("5/second")
+    limiter = SlidingWindowRateLimiter(key_prefix="t5")
+    for index in range(20):
+        _run_hits([limiter], rule, 1, identity=f"ip:10.0.1.{index}")
+    assert len(limiter._local_windows) == 20
+    limiter._prune(NOW + 10)
+    assert limiter._local_windows == {}
+
+    monkeypatch.setattr(rate_limit, "MAX_LOCAL_ENTRIES", 5)
+    for index in range(20):
+        _run_hits([limiter], rule, 1, identity=f"ip:10.0.2.{index}")
+    assert len(limiter._local_windows) <= 5
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return RateLimitMiddleware(app)
+
+
+async def _get(app, count, headers=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [await client.get("/ping", headers=headers) for _ in range(count)]
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_ANONYMOUS", "2/hour")
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_API_KEY", "100/hour")
+    monkeypatch.setattr(rate_limit.settings, "API_KEY_HASHES", [hashlib.sha256(b"issued-key").hexdigest()])
+    monkeypatch.setattr(rate_limit, "rate_limiter", SlidingWindowRateLimiter(key_prefix="mw"))
+    rate_limit.route_class_budgets.cache_clear()
+    rate_limit.known_api_key_hashes.cache_clear()
+    yield
+    rate_limit.route_class_budgets.cache_clear()
+    rate_limit.known_api_key_hashes.cache_clear()
+
+
+def test_middleware_returns_429(fake_redis, budgets):
+    responses = asyncio.run(_get(_app(), 3))
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[0].headers["x-rate-limit-limit"] == "2"
+    assert responses[1].headers["x-rate-limit-remaining"] == "0"
+    assert int(responses[2].headers["retry-after"]) >= 1
+
+
+def test_unknown_api_key_gets_the_anonymous_budget(fake_redis, budgets):
+    responses = asyncio.run(_get(_app(), 3, headers={"X-API-Key": "made-up"}))
+    assert [r.status_code for r in responses] == [200, 200, 429]
+
+    responses = asyncio.run(_get(_app(), 3, headers={"X-API-Key": "issued-key"}))
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert responses[0].headers["x-rate-limit-limit"] == "100"
+
+
+@pytest.mark.parametrize("backend", ["fake_redis", "redis_down"])
+def test_denial_lasts_until_a_token_frees(backend, request, monkeypatch):
+    request.getfixturevalue(backend)
+    rule = RateLimit.parse("10/hour")
+    limiter = SlidingWindowRateLimiter(max_lease=1, key_prefix=f"t6{backend}")
+    # Spend the whole budget at the end of the previous window
+    monkeypatch.setattr(rate_limit.time, "time", lambda: NOW - 2)
+    assert _run_hits([limiter], rule, 10) == 10
+    limiter._blocked_until.clear()
+
+    # 30 minutes in, the previous window weighs 5: five tokens are back
+    monkeypatch.setattr(rate_limit.time, "time", lambda: NOW + 1799)
+    assert _run_hits([limiter], rule, 6) == 5
+    decision = asyncio.run(limiter.hit("anonymous", "ip:10.0.0.1", rule))
+    assert not decision.allowed
+    # The next token frees once the previous window weighs 4, i.e. 6 minutes later - not at the window boundary
+    assert decision.reset_seconds == pytest.approx(360, abs=1)
+    assert limiter._blocked_until["anonymous:ip:10.0.0.1"] == pytest.approx(NOW + 1799 + 360, abs=1)
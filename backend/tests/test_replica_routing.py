@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import Column, Integer, String, text
+from sqlalchemy.orm import declarative_base
+
+from backend.core import database
+from backend.core.database import READ_YOUR_WRITES_COOKIE, get_db, replica_set, user_stickiness
+from backend.core.metrics import metrics
+from backend.core.middleware import RequestMiddleware
+from backend.core.redis_client import set_redis
+from backend.core.request_context import QueryBudgetExceeded, query_budget
+from backend.core.security import create_access_token
+
+ProbeBase = declarative_base()
+
+
+class Probe(ProbeBase):
+    """Marker rows: each database says which one it is, so a read shows where it went."""
+    __tablename__ = "probe"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String(32), nullable=False)
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/probe")
+    async def read_probe(db=Depends(get_db)):
+        rows = (await db.execute(text("SELECT source FROM probe ORDER BY id"))).scalars().all()
+        return {"sources": list(rows)}
+
+    @app.post("/probe")
+    async def write_probe(db=Depends(get_db)):
+        db.add(Probe(source="written"))
+        await db.commit()
+        return {"ok": True}
+
+    @app.get("/chatty")
+    @query_budget(2)
+    async def chatty(db=Depends(get_db)):
+        for _ in range(3):
+            await db.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    return RequestMiddleware(app)
+
+
+async def _seed():
+    for engine, source in ((database.engine, "primary"), (database.replica_engines[0], "replica")):
+        async with engine.begin() as conn:
+            await conn.run_sync(ProbeBase.metadata.drop_all)
+            await conn.run_sync(ProbeBase.metadata.create_all)
+            await conn.execute(Probe.__table__.insert().values(source=source))
+
+
+def _healthy_replica(lag: float = 0.0):
+    """Mark the replica as just measured with `lag`, so the next choose() uses it as is."""
+    replica_set._lag = [lag]
+    replica_set._checked_at = [time.monotonic()]
+
+
+def _request(method, path, cookies=None, headers=None):
+    async def run():
+        await _seed()
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies=cookies) as client:
+            return await client.request(method, path, headers=headers)
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def replica_state():
+    assert database.replica_engines, "conftest configures one replica"
+    yield
+    replica_set._lag = [None]
+    replica_set._checked_at = [0.0]
+    user_stickiness.reset()
+    # Pooled aiosqlite connections belong to the event loop of the test that opened them
+    for engine in (database.engine, *database.replica_engines):
+        asyncio.run(engine.dispose())
+
+
+def test_get_reads_from_replica():
+    _healthy_replica()
+    response = _request("GET", "/probe")
+    assert response.status_code == 200
+    assert response.json() == {"sources": ["replica"]}
+
+
+def test_strong_consistency_header_reads_from_primary():
+    _healthy_replica()
+    response = _request("GET", "/probe", headers={"X-Consistency": "strong"})
+    assert response.json() == {"sources": ["primary"]}
+
+
+def test_write_goes_to_primary_and_sets_cookie():
+    _healthy_replica()
+    response = _request("POST", "/probe")
+    assert response.status_code == 200
+    cookie = response.cookies.get(READ_YOUR_WRITES_COOKIE)
+    assert cookie is not None and float(cookie) > time.time()
+
+    async def primary_sources():
+        async with database.engine.connect() as conn:
+            return (await conn.execute(text("SELECT source FROM probe ORDER BY id"))).scalars().all()
+    assert asyncio.run(primary_sources()) == ["primary", "written"]
+
+
+def test_read_your_writes_cookie_reads_from_primary():
+    _healthy_replica()
+    fresh = {READ_YOUR_WRITES_COOKIE: f"{time.time() + 10:.3f}"}
+    assert _request("GET", "/probe", cookies=fresh).json() == {"sources": ["primary"]}
+
+    expired = {READ_YOUR_WRITES_COOKIE: f"{time.time() - 1:.3f}"}
+    assert _request("GET", "/probe", cookies=expired).json() == {"sources": ["replica"]}
+
+
+def test_write_makes_the_user_read_from_primary_on_every_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("backend.services.principal_cache")  # decodes bearer tokens
+    set_redis(fakeredis.FakeAsyncRedis())
+    try:
+        _healthy_replica()
+        writer = {"Authorization": f"Bearer {create_access_token({'sub': '7'})}"}
+        other = {"Authorization": f"Bearer {create_access_token({'sub': '8'})}"}
+        assert _request("POST", "/probe", headers=writer).status_code == 200
+        user_stickiness.reset()  # the mark must come from Redis, as on another worker
+
+        # Another device of the same user: no cookie, same user id
+        assert _request("GET", "/probe", headers=writer).json() == {"sources": ["primary"]}
+        assert _request("GET", "/probe", headers=other).json() == {"sources": ["replica"]}
+    finally:
+        set_redis(None)
+
+
+def test_lagging_replica_falls_back_to_primary():
+    _healthy_replica(lag=replica_set.max_lag + 30)
+    before = metrics.get_counter("db_replica_fallback_total")
+    assert _request("GET", "/probe").json() == {"sources": ["primary"]}
+    assert metrics.get_counter("db_replica_fallback_total") == before + 1
+
+
+def test_failed_lag_check_falls_back_to_primary(monkeypatch):
+    async def unreachable(replica):
+        raise ConnectionError("replica down")
+    monkeypatch.setattr(replica_set, "_query_lag", unreachable)
+    assert _request("GET", "/probe").json() == {"sources": ["primary"]}
+
+
+def test_query_budget_is_strict():
+    _healthy_replica()
+    with pytest.raises(QueryBudgetExceeded):
+        _request("GET", "/chatty")
@@ -0,0 +1,34 @@
+import datetime
+import json
+import time
+
+import pytest
+
+# The services package imports every service (some need app.* modules); skip where that fails
+tracking_ingest = pytest.importorskip("backend.services.tracking_ingest")
+E_TIMESTAMP, ERROR_MESSAGES, OK = tracking_ingest.E_TIMESTAMP, tracking_ingest.ERROR_MESSAGES, tracking_ingest.OK
+build_batch, parse_records = tracking_ingest.build_batch, tracking_ingest.parse_records
+
+
+def _record(**overrides):
+    record = {"tracking_code": "TRK-1", "status": "shipped", "client_event_id": "e1", "timestamp": time.time() - 60}
+    record.update(overrides)
+    return record
+
+
+@pytest.mark.parametrize("timestamp", [10 ** 400, float("inf"), float("nan"), "not a date", True])
+def test_unusable_timestamp_rejects_only_that_record(timestamp):
+    batch = build_batch([_record(timestamp=timestamp), _record(client_event_id="e2")])
+    assert batch.errors.tolist() == [E_TIMESTAMP, OK]
+    assert ERROR_MESSAGES[E_TIMESTAMP] == "invalid timestamp"
+
+
+def test_msgpack_nested_timestamps_stay_json_serializable():
+    msgpack = pytest.importorskip("msgpack")
+    moment = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1)
+    body = msgpack.packb([_record(timestamp=moment, data={"seen_at": moment, "history": [moment]})], datetime=True)
+    records = parse_records(body, "application/msgpack")
+    json.dumps(records)
+    batch = build_batch(records)
+    assert batch.errors.tolist() == [OK]
+    assert batch.timestamps[0] == pytest.approx(moment.timestamp(), abs=1e-3)
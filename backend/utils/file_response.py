@@ -0,0 +1,78 @@
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from starlette.responses import FileResponse, Response
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when If-None-Match names `etag` (weak or strong) or is '*'."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) for a single "bytes=" range, None when the header is
+    absent or not satisfiable as a single range (the full file is sent instead).
+    Raises ValueError for a range that starts past the end of the file.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:  # suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def conditional_file_response(
+    request: Request,
+    path: str,
+    etag: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    cache_control: str = "private, no-cache",
+) -> Response:
+    """
+    Serve a file with a strong ETag: 304 on If-None-Match, 206 for a single byte
+    range (If-Range honoured), otherwise the whole file via FileResponse.
+    """
+    etag = f'"{etag}"'
+    headers: Dict[str, str] = {"etag": etag, "cache-control": cache_control, "accept-ranges": "bytes"}
+    if filename:
+        headers["content-disposition"] = f'inline; filename="{filename}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers=dict(headers, **{"content-range": f"bytes */{size}"}))
+        if byte_range is not None:
+            start, end = byte_range
+            with open(path, "rb") as f:
+                f.seek(start)
+                body = f.read(end - start + 1)
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            return Response(content=body, status_code=206, media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
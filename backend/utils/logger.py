@@ -1,6 +1,172 @@
+import atexit
+import copy
+import datetime
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Optional
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from backend.core.metrics import metrics
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+# One listener per configured logger name; stopped on reconfiguration and at exit
+_listeners: Dict[str, QueueListener] = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, message, process, thread,
+    request_id (when logged inside a request), exception text and any `extra` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.thread,
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Thins out high-volume DEBUG/INFO logs; WARNING and above always pass.
+
+    - sample_rate / per-logger `rates`: keep roughly that fraction of records
+    - rate_limit_per_second / burst: token bucket per logger name on what is left
+
+    Suppressed records are counted per logger (log_records_suppressed_total).
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        rates: Optional[Dict[str, float]] = None,
+        rate_limit_per_second: Optional[float] = None,
+        burst: int = 100,
+    ):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rates = rates or {}
+        self.rate_limit_per_second = rate_limit_per_second
+        self.burst = burst
+        self._buckets: Dict[str, list] = {}  # logger name -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name: str) -> float:
+        # Most specific configured ancestor wins: "gacp.access" before "gacp"
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return self.sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate < 1.0 and random.random() >= rate:
+            metrics.inc("log_records_suppressed_total", logger=record.name, reason="sampled")
+            return False
+        if self.rate_limit_per_second is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(record.name, [float(self.burst), now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_limit_per_second)
+            bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return True
+        metrics.inc("log_records_suppressed_total", logger=record.name, reason="rate_limited")
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded in-memory queue drained by a QueueListener thread,
+    so file/stream I/O and rotation never run on the caller's (event loop) thread.
+    When the queue is full the record is dropped and counted instead of blocking;
+    a warning with the number dropped is queued once there is room again.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._pending_drops = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated after the call) and capture the request
+        # id while still in the request's context; formatting is left to the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if not hasattr(record, "request_id"):
+            ctx = _current_request()
+            record.request_id = ctx.request_id if ctx is not None else None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self._pending_drops:
+                notice = logging.LogRecord(
+                    record.name, logging.WARNING, __file__, 0,
+                    f"{self._pending_drops} log records dropped (log queue full)", None, None,
+                )
+                self.queue.put_nowait(notice)
+                self._pending_drops = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._pending_drops += 1
+            metrics.inc("log_records_dropped_total", logger=record.name)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room: the default put_nowait fails when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+
+def _current_request():
+    try:
+        from backend.core.request_context import current_request
+    except ImportError:
+        return None
+    return current_request()
+
+
+def stop_logging() -> None:
+    """Flush and stop all queue listeners (called at shutdown and at exit)."""
+    while _listeners:
+        _, listener = _listeners.popitem()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop_logging)
+
 
 def get_logger(
     name: Optional[str] = None,
@@ -8,41 +174,69 @@ def get_logger(
     log_to_file: Optional[str] = None,
     fmt: str = "%(asctime)s %(levelname)s %(name)s %(process)d %(thread)d %(message)s",
     max_bytes: int = 10 * 1024 * 1024,
-    backup_count: int = 10
+    backup_count: int = 10,
+    json_format: bool = False,
+    queue_size: int = 10000,
+    sample_rate: float = 1.0,
+    sample_rates: Optional[Dict[str, float]] = None,
+    rate_limit_per_second: Optional[float] = None,
+    rate_limit_burst: int = 100,
 ) -> logging.Logger:
     """
     Production-ready logger factory.
     - name: logger name (default: root)
     - level: logging level (default: INFO)
     - log_to_file: file path to log to (if None, log to stdout)
-    - fmt: log format
+    - fmt: log format (ignored when json_format is set)
     - max_bytes: max log file size before rotation (default: 10MB)
     - backup_count: number of rotated log files to keep (default: 10)
+    - json_format: write one JSON object per line instead of `fmt`
+    - queue_size: records buffered for the background writer before dropping (0 = write inline)
+    - sample_rate / sample_rates: fraction of DEBUG/INFO records kept, overall / per logger name
+    - rate_limit_per_second / rate_limit_burst: per-logger cap on DEBUG/INFO records
     """
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    formatter = logging.Formatter(fmt)
+    formatter = JsonFormatter() if json_format else logging.Formatter(fmt)
 
     # Remove all handlers if already set (avoid duplicate logs)
     if logger.hasHandlers():
         logger.handlers.clear()
+    previous = _listeners.pop(logger.name, None)
+    if previous is not None:
+        previous.stop()
 
+    handlers = []
     if log_to_file:
         from logging.handlers import RotatingFileHandler
         file_handler = RotatingFileHandler(
             log_to_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
         )
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(level)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     # Always add stream handler for stdout (for containerized/cloud logging)
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setFormatter(formatter)
-    stream_handler.setLevel(level)
-    logger.addHandler(stream_handler)
+    handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+
+    if queue_size > 0:
+        # The logger only enqueues; a listener thread does the I/O
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        listener = _Listener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners[logger.name] = listener
+        handlers = [queue_handler]
+
+    sampling = None
+    if sample_rate < 1.0 or sample_rates or rate_limit_per_second is not None:
+        sampling = SamplingFilter(sample_rate, sample_rates, rate_limit_per_second, rate_limit_burst)
+    for handler in handlers:
+        if sampling is not None:
+            handler.addFilter(sampling)
+        logger.addHandler(handler)
 
     logger.propagate = False
     return logger
 
 # Example usage for production:
-# logger = get_logger("gacp", level=logging.INFO, log_to_file="/app/logs/app.log")
\ No newline at end of file
+# logger = get_logger("gacp", level=logging.INFO, log_to_file="/app/logs/app.log", json_format=True)
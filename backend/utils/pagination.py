@@ -0,0 +1,258 @@
+import base64
+import datetime
+import enum
+import json
+import logging
+import operator
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Query, Request, Response
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return datetime.date.fromisoformat(value["$d"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row on a page as an opaque URL-safe token."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError for malformed tokens."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    try:
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, KeyError) as e:  # e.g. {"$dt": 5} from a crafted token
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def cursor_value(column, value: Any) -> Any:
+    """
+    Check a value decoded from a cursor against `column`'s Python type before it
+    goes into a WHERE clause. Raises ValueError on a mismatch (a crafted token).
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(python_type, type) and issubclass(python_type, enum.Enum):
+        try:
+            return python_type(value)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    mismatched = (
+        not isinstance(value, python_type)
+        or isinstance(value, bool) != (python_type is bool)
+        or (python_type is datetime.date and isinstance(value, datetime.datetime))
+    )
+    if mismatched:
+        raise ValueError("Invalid cursor")
+    return value
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: Optional[str] = None
+    sort: Optional[str] = None
+    filters: Dict[str, str] = field(default_factory=dict)
+    include_total: bool = False
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+    def apply_headers(self, response: Response) -> None:
+        """Expose paging metadata as X-Next-Cursor / X-Total-Count headers."""
+        if self.next_cursor:
+            response.headers["X-Next-Cursor"] = self.next_cursor
+        if self.total is not None:
+            response.headers["X-Total-Count"] = str(self.total)
+
+
+_FILTER_OPS = {
+    "": operator.eq,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+
+class Paginator:
+    """
+    Keyset pagination over a whitelisted set of sort and filter columns.
+
+    - sort: "<field>" or "-<field>" (descending); rows are tie-broken on the primary key,
+      so sort fields should be non-nullable and indexed together with the key.
+    - filters: "<field>=<value>" or "<field>__gte=<value>" (also gt, lt, lte), read from
+      the query string and coerced to the column's Python type.
+    - cursor: opaque token encoding (sort, last value, last id); a cursor issued for one
+      sort order is rejected for another.
+    """
+
+    def __init__(
+        self,
+        model,
+        sort_fields: Dict[str, Any],
+        filter_fields: Dict[str, Any],
+        default_sort: str,
+        default_limit: int = 50,
+        max_limit: int = 200,
+    ):
+        self.model = model
+        self.sort_fields = sort_fields
+        self.filter_fields = filter_fields
+        self.default_sort = default_sort
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.tiebreaker = model.id
+        self.params = self._build_dependency()
+
+    def _build_dependency(self):
+        paginator = self
+
+        def page_params(
+            request: Request,
+            limit: int = Query(paginator.default_limit, ge=1, le=paginator.max_limit),
+            cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+            sort: Optional[str] = Query(None, description=f"One of {sorted(paginator.sort_fields)}, '-' prefix for descending"),
+            total: bool = Query(False, description="Return an estimated X-Total-Count"),
+        ) -> PageParams:
+            filters = {}
+            for name, value in request.query_params.items():
+                field_name, _, op = name.partition("__")
+                if field_name in paginator.filter_fields and op in _FILTER_OPS:
+                    filters[name] = value
+            return PageParams(limit=limit, cursor=cursor, sort=sort, filters=filters, include_total=total)
+
+        return page_params
+
+    def _parse_sort(self, sort: Optional[str]) -> Tuple[str, bool]:
+        sort = sort or self.default_sort
+        descending = sort.startswith("-")
+        name = sort.lstrip("-")
+        if name not in self.sort_fields:
+            raise ValueError(f"Cannot sort by '{name}'")
+        return name, descending
+
+    def apply_filters(self, stmt, filters: Dict[str, str]):
+        for name, raw in filters.items():
+            field_name, _, op = name.partition("__")
+            if field_name not in self.filter_fields or op not in _FILTER_OPS:
+                raise ValueError(f"Cannot filter by '{name}'")
+            column = self.filter_fields[field_name]
+            stmt = stmt.where(_FILTER_OPS[op](column, _coerce(column, raw)))
+        return stmt
+
+    async def paginate(self, db: AsyncSession, stmt, params: PageParams) -> Page:
+        """
+        Run one page of `stmt` (a select of the model). Raises ValueError for
+        unknown sort/filter fields, bad filter values or mismatched or malformed cursors.
+        """
+        sort_name, descending = self._parse_sort(params.sort)
+        sort_key = ("-" if descending else "") + sort_name
+        column = self.sort_fields[sort_name]
+        filtered = self.apply_filters(stmt, params.filters)
+
+        page_stmt = filtered
+        if params.cursor:
+            values = decode_cursor(params.cursor)
+            if len(values) != 3 or values[0] != sort_key:
+                raise ValueError("Cursor does not match the requested sort order")
+            last_value, last_id = cursor_value(column, values[1]), cursor_value(self.tiebreaker, values[2])
+            if descending:
+                after = or_(column < last_value, and_(column == last_value, self.tiebreaker < last_id))
+            else:
+                after = or_(column > last_value, and_(column == last_value, self.tiebreaker > last_id))
+            page_stmt = page_stmt.where(after)
+        if descending:
+            page_stmt = page_stmt.order_by(column.desc(), self.tiebreaker.desc())
+        else:
+            page_stmt = page_stmt.order_by(column.asc(), self.tiebreaker.asc())
+        limit = max(1, min(params.limit, self.max_limit))
+        result = await db.execute(page_stmt.limit(limit + 1))
+        items = list(result.scalars().all())
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor([sort_key, getattr(last, column.key), last.id])
+
+        total = await estimate_count(db, filtered) if params.include_total else None
+        return Page(items=items, next_cursor=next_cursor, total=total)
+
+
+def _coerce(column, raw: str) -> Any:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return raw
+    try:
+        if python_type is bool:
+            if raw.lower() in ("1", "true", "yes"):
+                return True
+            if raw.lower() in ("0", "false", "no"):
+                return False
+            raise ValueError(raw)
+        if python_type is datetime.datetime:
+            return datetime.datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        if python_type is datetime.date:
+            return datetime.date.fromisoformat(raw)
+        if isinstance(python_type, type) and issubclass(python_type, enum.Enum):
+            return python_type(raw)
+        return python_type(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for '{column.key}': {raw}")
+
+
+async def estimate_count(db: AsyncSession, stmt) -> int:
+    """
+    Row count for `stmt` without a COUNT(*) scan on PostgreSQL: the planner's row
+    estimate from EXPLAIN (fed by table statistics). Other databases get an exact count.
+    """
+    bind = db.get_bind()
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    if bind.dialect.name != "postgresql":
+        return int((await db.execute(count_stmt)).scalar_one())
+    try:
+        compiled = stmt.order_by(None).compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+        conn = await db.connection()
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logging.warning(f"Row estimate failed, falling back to COUNT(*): {e}")
+        return int((await db.execute(count_stmt)).scalar_one())
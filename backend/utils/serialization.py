@@ -0,0 +1,142 @@
+import datetime
+import decimal
+import enum
+import json
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; FastJSONResponse falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; application/msgpack is then not offered
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # cbor2 is optional; application/cbor is then not offered
+    cbor2 = None
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional here; model outputs are plain floats when it is absent
+    np = None
+
+# Nested field selection: {"gacp_compliance": {"status": None}, "species": None}; None = whole subtree
+FieldTree = Dict[str, Optional["FieldTree"]]
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+CBOR_TYPES = ("application/cbor",)
+MAX_FIELDS = 64
+
+
+def to_builtin(obj: Any) -> Any:
+    """
+    `default` hook shared by all encoders: pydantic models, numpy scalars/arrays,
+    dates, decimals, enums, UUIDs and sets become plain JSON-compatible values.
+    """
+    if hasattr(obj, "dict") and callable(obj.dict):
+        return obj.dict()
+    if np is not None:
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=to_builtin, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=to_builtin, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (numpy and non-str keys supported); stdlib fallback."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=to_builtin, use_bin_type=True)
+
+
+class CBORResponse(Response):
+    media_type = "application/cbor"
+
+    def render(self, content: Any) -> bytes:
+        return cbor2.dumps(content, default=lambda encoder, value: encoder.encode(to_builtin(value)))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FieldTree]:
+    """
+    "species,grade,gacp_compliance.status" -> field tree; None/empty selects everything.
+    Raises HTTPException(400) for an unusable selection.
+    """
+    if not fields:
+        return None
+    paths = [path.strip() for path in fields.split(",") if path.strip()]
+    if len(paths) > MAX_FIELDS:
+        raise HTTPException(status_code=400, detail=f"fields: at most {MAX_FIELDS} paths")
+    tree: FieldTree = {}
+    for path in paths:
+        parts = path.split(".")
+        if any(not part for part in parts):
+            raise HTTPException(status_code=400, detail=f"fields: invalid path '{path}'")
+        node = tree
+        for part in parts[:-1]:
+            child = node.get(part, {})
+            if child is None:  # an ancestor is already selected in full
+                break
+            node = node.setdefault(part, child)
+        else:
+            node[parts[-1]] = None
+    return tree or None
+
+
+def prune(value: Any, tree: Optional[FieldTree]) -> Any:
+    """Keep only the selected fields; lists are pruned element by element. Unknown fields are ignored."""
+    if tree is None:
+        return value
+    if hasattr(value, "dict") and callable(value.dict):
+        value = value.dict()
+    if isinstance(value, dict):
+        return {key: prune(value[key], sub) for key, sub in tree.items() if key in value}
+    if isinstance(value, (list, tuple)):
+        return [prune(item, tree) for item in value]
+    return value
+
+
+def negotiated_response(request: Request, content: Any, fields: Optional[str] = None, status_code: int = 200) -> Response:
+    """
+    Prune `content` to `fields` and serialize it as MessagePack or CBOR when the
+    Accept header asks for it (and the library is installed), otherwise as JSON.
+    """
+    body = prune(content, parse_fields(fields))
+    accept = request.headers.get("accept", "")
+    headers = {"vary": "Accept"}
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_TYPES):
+        return MsgPackResponse(body, status_code=status_code, headers=headers)
+    if cbor2 is not None and any(media_type in accept for media_type in CBOR_TYPES):
+        return CBORResponse(body, status_code=status_code, headers=headers)
+    return FastJSONResponse(body, status_code=status_code, headers=headers)